@@ -32,6 +32,26 @@ def main():
         os.path.join(test_dir, "test_schemas.py"),
         os.path.join(test_dir, "test_models.py"),
         os.path.join(test_dir, "test_api_structure.py"),
+        os.path.join(test_dir, "test_progress_stream.py"),
+        os.path.join(test_dir, "test_forecast.py"),
+        os.path.join(test_dir, "test_analytics.py"),
+        os.path.join(test_dir, "test_webhook_client.py"),
+        os.path.join(test_dir, "test_webhook_dispatcher.py"),
+        os.path.join(test_dir, "test_subscription_router.py"),
+        os.path.join(test_dir, "test_adaptive_limiter.py"),
+        os.path.join(test_dir, "test_webhook_retry.py"),
+        os.path.join(test_dir, "test_webhook_signature.py"),
+        os.path.join(test_dir, "test_worker.py"),
+        os.path.join(test_dir, "test_database.py"),
+        os.path.join(test_dir, "test_celery_routing.py"),
+        os.path.join(test_dir, "test_task_status.py"),
+        os.path.join(test_dir, "test_task_dedup.py"),
+        os.path.join(test_dir, "test_minio_cleanup.py"),
+        os.path.join(test_dir, "test_batch_import.py"),
+        os.path.join(test_dir, "test_parquet_export.py"),
+        os.path.join(test_dir, "test_webhook_batching.py"),
+        os.path.join(test_dir, "test_webhook_replay.py"),
+        os.path.join(test_dir, "test_webhook_benchmark.py"),
     ]
 
     print("\n" + "=" * 60)
@@ -0,0 +1,122 @@
+"""
+Convert an existing plain webhook_deliveries table into the partitioned one.
+
+Base.metadata.create_all skips tables that already exist, so deployments created
+before partitioning keep a plain webhook_deliveries table. This script, run once
+with the API and workers stopped:
+
+    1. renames the plain table (with its indexes and id sequence) to *_legacy;
+    2. creates the partitioned table, its default partition and the partitions
+       of the current and next two months;
+    3. creates monthly partitions for the months of the legacy rows and copies
+       the rows, keeping their ids (a legacy JSON payload becomes the body);
+    4. moves the id sequence past the copied ids and drops the legacy table.
+
+Everything runs in one transaction: on any error the plain table is left as it
+was. Running it again on a partitioned table does nothing. Partitions older
+than WEBHOOK_DELIVERY_RETENTION_MONTHS are archived and dropped by the next
+maintain_webhook_partitions run.
+
+Usage:
+    python scripts/partition_webhook_deliveries.py
+"""
+
+import asyncio
+import os
+import sys
+
+from sqlalchemy import text
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+TABLE = "webhook_deliveries"
+LEGACY = "webhook_deliveries_legacy"
+
+
+async def convert(conn) -> int | None:
+    """Convert the plain table on `conn`; rows copied, None if nothing to convert"""
+    from src.models.webhook import WebhookDelivery
+    from src.repositories.webhook import delivery_partition_ddl
+
+    relkind = await conn.scalar(
+        text(f"SELECT relkind FROM pg_class WHERE oid = to_regclass('{TABLE}')")
+    )
+    if relkind != "r":
+        # No table yet (create_all makes it partitioned) or already partitioned
+        return None
+
+    # Index and sequence names of the new table must be free
+    await conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}"))
+    indexes = await conn.execute(
+        text(f"SELECT indexname FROM pg_indexes WHERE tablename = '{LEGACY}'")
+    )
+    for (name,) in indexes.all():
+        await conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:56]}_legacy"'))
+    await conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq RENAME TO {LEGACY}_id_seq"))
+
+    await conn.run_sync(WebhookDelivery.__table__.create)
+
+    months = await conn.execute(
+        text(
+            "SELECT DISTINCT date_trunc('month', COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date "
+            f"FROM {LEGACY}"
+        )
+    )
+    for (month,) in months.all():
+        await conn.execute(text(delivery_partition_ddl(month)))
+
+    legacy_columns = set(
+        (
+            await conn.execute(
+                text(
+                    "SELECT column_name FROM information_schema.columns "
+                    f"WHERE table_name = '{LEGACY}'"
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+    columns, values = [], []
+    for column in WebhookDelivery.__table__.columns:
+        if column.name == "created_at":
+            columns.append("created_at")
+            values.append("COALESCE(created_at, now())")
+        elif column.name in legacy_columns:
+            columns.append(column.name)
+            values.append(column.name)
+        elif column.name == "body" and "payload" in legacy_columns:
+            columns.append("body")
+            values.append("convert_to(payload::text, 'UTF8')")
+
+    result = await conn.execute(
+        text(f"INSERT INTO {TABLE} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {LEGACY}")
+    )
+    await conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}"
+        )
+    )
+    await conn.execute(text(f"DROP TABLE {LEGACY}"))
+    return result.rowcount
+
+
+async def main():
+    from src.database import engine
+
+    async with engine.begin() as conn:
+        copied = await convert(conn)
+    await engine.dispose()
+
+    if copied is None:
+        print(f"✅ {TABLE} is not a plain table, nothing to convert")
+    else:
+        print(f"✅ {TABLE} is partitioned, {copied} deliveries copied")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+#!/bin/bash
+# Запуск Celery worker с профилем, подобранным под очередь
+# Использование: scripts/start_worker.sh <профиль> [дополнительные аргументы celery worker]
+#
+# Профили:
+#   webhooks     - короткие задачи с сетевым ожиданием: много процессов, prefetch 4
+#   aggregation  - запросы пользователей, ждущих результата: prefetch 1
+#   reports      - отчеты и экспорты (минуты): prefetch 1, перезапуск процесса после 20 задач
+#   imports      - импорт файлов (до 20 минут): prefetch 1, перезапуск процесса после 10 задач
+#   scheduled    - задачи Celery Beat и очередь default
+#   all          - все очереди одним worker (локальная разработка)
+#
+# CONCURRENCY переопределяет число процессов профиля.
+
+set -e
+
+PROFILE=${1:-all}
+shift || true
+
+case "$PROFILE" in
+    webhooks)
+        QUEUES=webhooks
+        DEFAULT_CONCURRENCY=16
+        PREFETCH=4
+        EXTRA_ARGS=()
+        ;;
+    aggregation)
+        QUEUES=aggregation
+        DEFAULT_CONCURRENCY=4
+        PREFETCH=1
+        EXTRA_ARGS=()
+        ;;
+    reports)
+        QUEUES=reports
+        DEFAULT_CONCURRENCY=2
+        PREFETCH=1
+        EXTRA_ARGS=(--max-tasks-per-child=20)
+        ;;
+    imports)
+        QUEUES=imports
+        DEFAULT_CONCURRENCY=2
+        PREFETCH=1
+        EXTRA_ARGS=(--max-tasks-per-child=10)
+        ;;
+    scheduled)
+        QUEUES=scheduled,default
+        DEFAULT_CONCURRENCY=2
+        PREFETCH=1
+        EXTRA_ARGS=()
+        ;;
+    all)
+        QUEUES=webhooks,aggregation,reports,imports,scheduled,default
+        DEFAULT_CONCURRENCY=4
+        PREFETCH=1
+        EXTRA_ARGS=()
+        ;;
+    *)
+        echo "❌ Неизвестный профиль: $PROFILE (webhooks, aggregation, reports, imports, scheduled, all)"
+        exit 1
+        ;;
+esac
+
+exec celery -A src.celery_app worker \
+    --loglevel=info \
+    --hostname="$PROFILE@%h" \
+    --queues="$QUEUES" \
+    --concurrency="${CONCURRENCY:-$DEFAULT_CONCURRENCY}" \
+    --prefetch-multiplier="$PREFETCH" \
+    "${EXTRA_ARGS[@]}" \
+    "$@"
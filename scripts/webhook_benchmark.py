@@ -0,0 +1,488 @@
+"""
+Webhook load test against a local receiver stand-in.
+
+Starts an ASGI receiver on localhost with injectable latency, error rate and
+timeouts, fires a synthetic storm of batch_created / product_aggregated events
+to N subscriptions and reports deliveries per second, p50/p99 latency and the
+retry amplification factor (receiver requests per delivery).
+
+Latency is end to end, from the event to the successful attempt (retries
+included). Service mode also reports send latency of single attempts, which
+includes waiting for the per-host concurrency limit.
+
+Modes:
+    service - WebhookService.send_webhook with the production backoff; no
+              database, Redis, MinIO or workers
+    task    - real subscriptions and deliveries in PostgreSQL, events emitted
+              with emit_webhook_event and sent by send_webhook_delivery in a
+              pool of worker processes; retries and parked deliveries are
+              released by the Beat tasks (needs PostgreSQL and Redis)
+
+Usage:
+    python scripts/webhook_benchmark.py --mode service --subscriptions 10 --events 1000
+    python scripts/webhook_benchmark.py --mode task --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+
+import uvicorn
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+EVENT_TYPES = ("batch_created", "product_aggregated")
+SECRET_KEY = "benchmark-secret"
+
+
+class Receiver:
+    """
+    ASGI endpoint standing in for a partner.
+
+    Each request sleeps latency +- jitter and answers 200; a share of requests
+    answers 500 (error_rate) or never answers before the client gives up
+    (timeout_rate).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float,
+        jitter_ms: float,
+        error_rate: float,
+        timeout_rate: float,
+        hang_seconds: float,
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+        self.requests += 1
+        roll = random.random()
+        if roll < self.timeout_rate:
+            self.timeouts += 1
+            await asyncio.sleep(self.hang_seconds)
+        else:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        status = 200
+        if self.timeout_rate <= roll < self.timeout_rate + self.error_rate:
+            self.errors += 1
+            status = 500
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+
+
+class ReceiverServer:
+    """Runs the receiver with uvicorn on a background thread"""
+
+    def __init__(self, receiver: Receiver, host: str = "127.0.0.1"):
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://{host}:{self.port}"
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                receiver,
+                host=host,
+                port=self.port,
+                log_level="warning",
+                lifespan="off",
+                backlog=4096,
+            )
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "ReceiverServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def synthetic_event(index: int) -> tuple[str, dict]:
+    """Alternating batch_created / product_aggregated payloads"""
+    event_type = EVENT_TYPES[index % len(EVENT_TYPES)]
+    if event_type == "batch_created":
+        data = {
+            "batch_id": index,
+            "batch_number": 100_000 + index,
+            "batch_date": datetime.now(UTC).date().isoformat(),
+            "work_center_id": index % 10,
+        }
+    else:
+        data = {
+            "product_id": index,
+            "unique_code": f"BENCH-{index:08d}",
+            "batch_id": index // 100,
+            "aggregated_at": datetime.now(UTC).isoformat(),
+        }
+    return event_type, data
+
+
+def percentile(values: list[float], share: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def build_report(
+    mode: str,
+    deliveries: int,
+    succeeded: int,
+    elapsed: float,
+    latencies: list[float],
+    receiver: Receiver,
+    send_latencies: list[float] | None = None,
+) -> dict:
+    report = {
+        "mode": mode,
+        "deliveries": deliveries,
+        "succeeded": succeeded,
+        "failed": deliveries - succeeded,
+        "elapsed_seconds": round(elapsed, 3),
+        "deliveries_per_second": round(succeeded / elapsed, 1) if elapsed else None,
+        "latency_p50_ms": None,
+        "latency_p99_ms": None,
+        "receiver_requests": receiver.requests,
+        "receiver_errors": receiver.errors,
+        "receiver_timeouts": receiver.timeouts,
+        "retry_amplification": round(receiver.requests / deliveries, 3) if deliveries else None,
+    }
+    if latencies:
+        report["latency_p50_ms"] = round(percentile(latencies, 0.50) * 1000, 1)
+        report["latency_p99_ms"] = round(percentile(latencies, 0.99) * 1000, 1)
+    if send_latencies:
+        report["send_p50_ms"] = round(percentile(send_latencies, 0.50) * 1000, 1)
+        report["send_p99_ms"] = round(percentile(send_latencies, 0.99) * 1000, 1)
+    return report
+
+
+async def run_service_mode(args, receiver: Receiver, url: str) -> dict:
+    """Deliveries retried in process with the production backoff schedule"""
+    from src.services.webhook_service import webhook_service
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    send_latencies: list[float] = []
+
+    async def deliver(subscription_url: str, body: bytes) -> bool:
+        created = time.perf_counter()
+        attempts = 0
+        while True:
+            async with semaphore:
+                started = time.perf_counter()
+                success, *_ = await webhook_service.send_webhook(
+                    subscription_url, body, SECRET_KEY, timeout=args.timeout
+                )
+                send_latencies.append(time.perf_counter() - started)
+            attempts += 1
+            if success:
+                latencies.append(time.perf_counter() - created)
+                return True
+            next_attempt_at = webhook_service.next_attempt_at(attempts, args.retry_count)
+            if next_attempt_at is None:
+                return False
+            await asyncio.sleep((next_attempt_at - datetime.now(UTC)).total_seconds())
+
+    started = time.perf_counter()
+    jobs = []
+    for index in range(args.events):
+        event_type, data = synthetic_event(index)
+        # Serialized once per event like emit_webhook_event does
+        body = webhook_service.serialize_payload(
+            webhook_service.create_webhook_payload(event_type, data)
+        )
+        for subscription in range(args.subscriptions):
+            jobs.append(deliver(f"{url}/hooks/{subscription}", body))
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - started
+    await webhook_service.close()
+
+    return build_report(
+        "service",
+        len(results),
+        sum(results),
+        elapsed,
+        latencies,
+        receiver,
+        send_latencies,
+    )
+
+
+def _run_delivery_task(delivery_id: int):
+    """Runs in a pool process; tasks share its event loop like in a Celery worker"""
+    from src.tasks.webhooks import send_webhook_delivery
+
+    return send_webhook_delivery.apply(args=(delivery_id,)).result
+
+
+async def _create_subscriptions(args, url: str) -> list[int]:
+    from sqlalchemy import func, select
+
+    from src.database import AsyncSessionLocal
+    from src.models.webhook import WebhookSubscription
+    from src.repositories.webhook import WebhookRepository
+    from src.schemas.webhook import WebhookSubscriptionCreate
+
+    async with AsyncSessionLocal() as session:
+        others = await session.scalar(
+            select(func.count())
+            .select_from(WebhookSubscription)
+            .where(WebhookSubscription.is_active.is_(True))
+        )
+        if others and not args.force:
+            raise SystemExit(
+                f"{others} active subscriptions exist and would receive the storm, "
+                "use a dedicated database or pass --force"
+            )
+
+        webhook_repo = WebhookRepository(session)
+        subscription_ids = []
+        for index in range(args.subscriptions):
+            subscription = await webhook_repo.create_subscription(
+                WebhookSubscriptionCreate(
+                    url=f"{url}/hooks/{index}",
+                    events=list(EVENT_TYPES),
+                    secret_key=SECRET_KEY,
+                    retry_count=args.retry_count,
+                    timeout=args.timeout,
+                )
+            )
+            subscription_ids.append(subscription.id)
+        await session.commit()
+    return subscription_ids
+
+
+async def _emit_storm(args):
+    from src.database import AsyncSessionLocal
+    from src.tasks.webhooks import emit_webhook_event
+
+    async with AsyncSessionLocal() as session:
+        for index in range(args.events):
+            event_type, data = synthetic_event(index)
+            await emit_webhook_event(session, event_type, data)
+
+
+async def _pending_ids(subscription_ids: list[int]) -> list[int]:
+    from sqlalchemy import select
+
+    from src.database import AsyncSessionLocal
+    from src.models.webhook import WebhookDelivery
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(WebhookDelivery.id).where(
+                WebhookDelivery.status == "pending",
+                WebhookDelivery.subscription_id.in_(subscription_ids),
+            )
+        )
+        return list(result.scalars().all())
+
+
+async def _status_counts(subscription_ids: list[int]) -> dict[str, int]:
+    from sqlalchemy import func, select
+
+    from src.database import AsyncSessionLocal
+    from src.models.webhook import WebhookDelivery
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(WebhookDelivery.status, func.count())
+            .where(WebhookDelivery.subscription_id.in_(subscription_ids))
+            .group_by(WebhookDelivery.status)
+        )
+        return dict(result.all())
+
+
+async def _delivery_latencies(subscription_ids: list[int]) -> list[float]:
+    from sqlalchemy import func, select
+
+    from src.database import AsyncSessionLocal
+    from src.models.webhook import WebhookDelivery
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                func.extract("epoch", WebhookDelivery.delivered_at - WebhookDelivery.created_at)
+            ).where(
+                WebhookDelivery.status == "success",
+                WebhookDelivery.subscription_id.in_(subscription_ids),
+            )
+        )
+        return [float(value) for value in result.scalars().all()]
+
+
+async def _delete_subscriptions(subscription_ids: list[int]):
+    from src.database import AsyncSessionLocal
+    from src.repositories.webhook import WebhookRepository
+
+    async with AsyncSessionLocal() as session:
+        webhook_repo = WebhookRepository(session)
+        for subscription_id in subscription_ids:
+            # Deliveries go with the subscription (ON DELETE CASCADE)
+            await webhook_repo.delete_subscription(subscription_id)
+        await session.commit()
+
+
+def run_task_mode(args, receiver: Receiver, url: str) -> dict:
+    """
+    Deliveries through PostgreSQL and send_webhook_delivery.
+
+    The harness stands in for the broker: dispatch is switched off
+    (as with the dispatcher enabled) and pending rows are handed to a pool
+    of worker processes, like prefork Celery workers would receive them.
+    """
+    # Inherited by the spawned workers as well
+    os.environ.setdefault("DB_POOL_PROFILE", "worker")
+    os.environ["WEBHOOK_DISPATCHER_ENABLED"] = "true"
+    os.environ["WEBHOOK_RETRY_BASE_SECONDS"] = str(args.retry_base)
+
+    from src.config import settings
+
+    settings.webhook_dispatcher_enabled = True
+    settings.webhook_retry_base_seconds = args.retry_base
+
+    from src.tasks.scheduled import retry_failed_webhooks
+    from src.tasks.webhooks import release_parked_webhooks
+
+    # Same process event loop as the tasks run on, so pooled connections are shared
+    from src.worker import run_async
+
+    subscription_ids = run_async(_create_subscriptions(args, url))
+    open_statuses = ("pending", "processing", "failed", "parked")
+    try:
+        started = time.perf_counter()
+        run_async(_emit_storm(args))
+
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.workers) as pool:
+            while time.perf_counter() - started < args.max_wait:
+                pending = run_async(_pending_ids(subscription_ids))
+                if pending:
+                    pool.map(_run_delivery_task, pending, chunksize=16)
+                retry_failed_webhooks.apply()
+                release_parked_webhooks.apply()
+
+                counts = run_async(_status_counts(subscription_ids))
+                if not any(counts.get(status) for status in open_statuses):
+                    break
+                if not pending:
+                    time.sleep(0.1)
+        elapsed = time.perf_counter() - started
+
+        counts = run_async(_status_counts(subscription_ids))
+        latencies = run_async(_delivery_latencies(subscription_ids))
+    finally:
+        if not args.keep:
+            run_async(_delete_subscriptions(subscription_ids))
+
+    report = build_report(
+        "task",
+        sum(counts.values()),
+        counts.get("success", 0),
+        elapsed,
+        latencies,
+        receiver,
+    )
+    report["statuses"] = counts
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Webhook delivery load test")
+    parser.add_argument("--mode", choices=("service", "task"), default="service")
+    parser.add_argument("--subscriptions", type=int, default=10)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=int, default=2, help="Subscription timeout, seconds")
+    parser.add_argument("--retry-count", type=int, default=3)
+    parser.add_argument(
+        "--retry-base",
+        type=float,
+        default=0.2,
+        help="Backoff base, seconds (scaled down from WEBHOOK_RETRY_BASE_SECONDS)",
+    )
+    parser.add_argument("--concurrency", type=int, default=500, help="service mode")
+    parser.add_argument("--workers", type=int, default=8, help="task mode worker processes")
+    parser.add_argument("--max-wait", type=float, default=300.0, help="task mode, seconds")
+    parser.add_argument("--keep", action="store_true", help="Keep subscriptions and deliveries")
+    parser.add_argument("--force", action="store_true", help="Run with other subscriptions active")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from src.config import settings
+
+    settings.webhook_retry_base_seconds = args.retry_base
+
+    receiver = Receiver(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        # Long enough for the client to give up first
+        hang_seconds=args.timeout + 1,
+    )
+    with ReceiverServer(receiver) as server:
+        if args.mode == "service":
+            report = asyncio.run(run_service_mode(args, receiver, server.url))
+        else:
+            report = run_task_mode(args, receiver, server.url)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 50)
+    print(f"Webhook benchmark ({report['mode']} mode)")
+    print("=" * 50)
+    for key, value in report.items():
+        if key != "mode":
+            print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
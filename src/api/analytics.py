@@ -1,12 +1,17 @@
-from datetime import datetime, timedelta
+from datetime import UTC, date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db
+from src.repositories.analytics import AnalyticsRepository
 from src.repositories.batch import BatchRepository
+from src.repositories.dashboard_snapshot import SNAPSHOT_FIELDS, DashboardSnapshotRepository
 from src.repositories.product import ProductRepository
+from src.repositories.work_center import WorkCenterRepository
 from src.services.cache_service import cache_service
+from src.services.forecast_service import forecast_service
+from src.services.progress_service import format_sse, progress_service, sse_response
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
 
@@ -59,6 +64,53 @@ async def get_dashboard_statistics(db: AsyncSession = Depends(get_db)):
     return stats
 
 
+@router.get("/dashboard/history")
+async def get_dashboard_history(
+    resolution: str | None = Query(None, pattern="^(5m|1h|1d)$"),
+    date_from: datetime | None = Query(None),
+    date_to: datetime | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """История статистики дашборда"""
+    # Snapshots are bucketed in UTC; naive bounds are taken as UTC
+    if date_to:
+        date_to = date_to.astimezone(UTC) if date_to.tzinfo else date_to.replace(tzinfo=UTC)
+    if date_from:
+        date_from = date_from.astimezone(UTC) if date_from.tzinfo else date_from.replace(tzinfo=UTC)
+
+    date_to = date_to or datetime.now(UTC)
+    date_from = date_from or date_to - timedelta(days=1)
+
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+
+    # Pick the finest tier that still covers the requested range
+    if resolution is None:
+        period = date_to - date_from
+        if period <= timedelta(days=1):
+            resolution = "5m"
+        elif period <= timedelta(days=30):
+            resolution = "1h"
+        else:
+            resolution = "1d"
+
+    snapshot_repo = DashboardSnapshotRepository(db)
+    snapshots = await snapshot_repo.get_series(resolution, date_from, date_to)
+
+    return {
+        "resolution": resolution,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "points": [
+            {
+                "timestamp": snapshot.bucket_start.isoformat(),
+                **{field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS},
+            }
+            for snapshot in snapshots
+        ],
+    }
+
+
 @router.get("/batches/{batch_id}/statistics")
 async def get_batch_statistics(batch_id: int, db: AsyncSession = Depends(get_db)):
     """Статистика по партии"""
@@ -83,8 +135,7 @@ async def get_batch_statistics(batch_id: int, db: AsyncSession = Depends(get_db)
     elapsed = (now - batch.shift_start).total_seconds() / 3600 if now > batch.shift_start else 0
 
     products_per_hour = stats["aggregated"] / elapsed if elapsed > 0 else 0
-    remaining_hours = stats["remaining"] / products_per_hour if products_per_hour > 0 else 0
-    estimated_completion = now + timedelta(hours=remaining_hours) if remaining_hours > 0 else None
+    forecast = await forecast_service.get_batch_forecast(db, batch_id, stats["remaining"], now)
 
     result = {
         "batch_info": {
@@ -98,9 +149,10 @@ async def get_batch_statistics(batch_id: int, db: AsyncSession = Depends(get_db)
             "shift_duration_hours": shift_duration,
             "elapsed_hours": elapsed,
             "products_per_hour": products_per_hour,
-            "estimated_completion": estimated_completion.isoformat()
-            if estimated_completion
-            else None,
+            "current_pace_per_hour": forecast["pace_per_hour"],
+            "estimated_completion": forecast["estimated_completion"],
+            "earliest_completion": forecast["earliest_completion"],
+            "latest_completion": forecast["latest_completion"],
         },
         "team_performance": {
             "team": batch.team,
@@ -115,6 +167,22 @@ async def get_batch_statistics(batch_id: int, db: AsyncSession = Depends(get_db)
     return result
 
 
+@router.get("/batches/{batch_id}/forecast")
+async def get_batch_forecast(batch_id: int, db: AsyncSession = Depends(get_db)):
+    """Прогноз завершения партии"""
+    batch_repo = BatchRepository(db)
+    batch = await batch_repo.get_by_id(batch_id)
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    product_repo = ProductRepository(db)
+    stats = await product_repo.get_statistics(batch_id)
+    forecast = await forecast_service.get_batch_forecast(db, batch_id, stats["remaining"])
+
+    return {"batch_id": batch_id, "remaining": stats["remaining"], "forecast": forecast}
+
+
 @router.post("/compare-batches")
 async def compare_batches(batch_ids: list[int], db: AsyncSession = Depends(get_db)):
     """Сравнение партий"""
@@ -159,3 +227,200 @@ async def compare_batches(batch_ids: list[int], db: AsyncSession = Depends(get_d
             "products_per_hour": avg_products_per_hour,
         },
     }
+
+
+async def _progress_stream(request: Request, channel: str, snapshot: dict | None = None):
+    """Generate SSE messages from progress channel"""
+    if snapshot is not None:
+        yield format_sse(snapshot, event="snapshot")
+
+    async for message in progress_service.listen(channel):
+        if await request.is_disconnected():
+            break
+        if message is None:
+            # Heartbeat keeps proxies from closing idle connections
+            yield ": keep-alive\n\n"
+            continue
+        yield format_sse(message, event=message.get("event"))
+
+
+@router.get("/batches/{batch_id}/stream")
+async def stream_batch_progress(
+    batch_id: int, request: Request, db: AsyncSession = Depends(get_db)
+):
+    """Поток прогресса партии (Server-Sent Events)"""
+    batch_repo = BatchRepository(db)
+    batch = await batch_repo.get_by_id(batch_id)
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    product_repo = ProductRepository(db)
+    stats = await product_repo.get_statistics(batch_id)
+    snapshot = {
+        "batch_id": batch.id,
+        "work_center_id": batch.work_center_id,
+        "is_closed": batch.is_closed,
+        **stats,
+    }
+
+    # Release DB connection before the long-lived stream starts
+    await db.close()
+
+    return sse_response(
+        _progress_stream(request, progress_service.batch_channel(batch_id), snapshot)
+    )
+
+
+@router.get("/work-centers/{work_center_id}/stream")
+async def stream_work_center_progress(
+    work_center_id: int, request: Request, db: AsyncSession = Depends(get_db)
+):
+    """Поток прогресса партий рабочего центра (Server-Sent Events)"""
+    work_center_repo = WorkCenterRepository(db)
+    work_center = await work_center_repo.get_by_id(work_center_id)
+
+    if not work_center:
+        raise HTTPException(status_code=404, detail="Work center not found")
+
+    await db.close()
+
+    return sse_response(
+        _progress_stream(request, progress_service.work_center_channel(work_center_id))
+    )
+
+
+def _performance_metrics(row) -> dict:
+    """Throughput and completion metrics of an aggregated shift performance row"""
+    total_products = int(row.total_products or 0)
+    aggregated_products = int(row.aggregated_products or 0)
+    batches = int(row.batches or 0)
+    closed_batches = int(row.closed_batches or 0)
+    hours = float(row.hours or 0)
+
+    return {
+        "batches": batches,
+        "closed_batches": closed_batches,
+        "total_products": total_products,
+        "aggregated_products": aggregated_products,
+        "hours": hours,
+        "throughput_per_hour": aggregated_products / hours if hours > 0 else 0.0,
+        "completion_rate": (aggregated_products / total_products * 100)
+        if total_products > 0
+        else 0.0,
+        "batch_close_rate": (closed_batches / batches * 100) if batches > 0 else 0.0,
+    }
+
+
+def _rank(entries: list[dict]) -> list[dict]:
+    """Add shift-over-shift deltas and rank entries by throughput"""
+    for entry in entries:
+        shifts = sorted(entry.pop("shifts"), key=lambda s: s["shift_start"])
+        last_shift = shifts[-1] if shifts else None
+        previous_shift = shifts[-2] if len(shifts) > 1 else None
+
+        entry["last_shift"] = last_shift
+        entry["shift_over_shift"] = (
+            {
+                "throughput_delta": last_shift["throughput_per_hour"]
+                - previous_shift["throughput_per_hour"],
+                "completion_rate_delta": last_shift["completion_rate"]
+                - previous_shift["completion_rate"],
+            }
+            if previous_shift
+            else None
+        )
+
+    # Rows come from the aggregate in no particular order: ties are ordered by
+    # name and share a rank (1, 1, 3)
+    entries.sort(
+        key=lambda e: (
+            -e.get("throughput_per_hour", 0.0),
+            str(e.get("work_center_name", e.get("team", ""))),
+        )
+    )
+    rank, previous_throughput = 0, None
+    for position, entry in enumerate(entries, start=1):
+        throughput = entry.get("throughput_per_hour", 0.0)
+        if throughput != previous_throughput:
+            rank, previous_throughput = position, throughput
+        entry["rank"] = rank
+    return entries
+
+
+async def _get_leaderboards(db: AsyncSession, days: int) -> dict:
+    """Work center and team leaderboards from the materialized shift aggregate"""
+    cache_key = f"leaderboards:{days}"
+    cached = await cache_service.get(cache_key)
+    if cached:
+        return cached
+
+    date_from = date.today() - timedelta(days=days)
+    analytics_repo = AnalyticsRepository(db)
+    rows = await analytics_repo.get_shift_performance(date_from)
+
+    boards: dict[str, dict] = {"work_centers": {}, "teams": {}}
+    for row in rows:
+        if row.wc_grouped == 0:
+            board = boards["work_centers"]
+            key = row.work_center_id
+            identity = {
+                "work_center_id": row.work_center_id,
+                "work_center_name": row.work_center_name,
+            }
+        else:
+            board = boards["teams"]
+            key = row.team
+            identity = {"team": row.team}
+
+        entry = board.setdefault(key, {**identity, "shifts": []})
+        metrics = _performance_metrics(row)
+        if row.shift_grouped:
+            entry.update(metrics)
+        else:
+            entry["shifts"].append(
+                {
+                    "batch_date": str(row.batch_date),
+                    "shift": row.shift,
+                    "shift_start": row.shift_start.isoformat() if row.shift_start else "",
+                    **metrics,
+                }
+            )
+
+    result = {
+        "work_centers": _rank(list(boards["work_centers"].values())),
+        "teams": _rank(list(boards["teams"].values())),
+        "date_from": str(date_from),
+        "cached_at": datetime.now(UTC).isoformat(),
+    }
+
+    # Cache for 1 minute (aggregate itself is refreshed every 5 minutes)
+    await cache_service.set(cache_key, result, ttl=60)
+
+    return result
+
+
+@router.get("/work-centers")
+async def get_work_center_leaderboard(
+    days: int = Query(30, ge=1, le=365), db: AsyncSession = Depends(get_db)
+):
+    """Рейтинг рабочих центров"""
+    leaderboards = await _get_leaderboards(db, days)
+    return {
+        "items": leaderboards["work_centers"],
+        "date_from": leaderboards["date_from"],
+        "cached_at": leaderboards["cached_at"],
+    }
+
+
+@router.get("/teams")
+async def get_team_leaderboard(
+    days: int = Query(30, ge=1, le=365), db: AsyncSession = Depends(get_db)
+):
+    """Рейтинг бригад"""
+    leaderboards = await _get_leaderboards(db, days)
+    return {
+        "items": leaderboards["teams"],
+        "date_from": leaderboards["date_from"],
+        "cached_at": leaderboards["cached_at"],
+    }
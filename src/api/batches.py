@@ -1,12 +1,12 @@
 from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from celery import Task
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db
 from src.repositories.batch import BatchRepository
 from src.repositories.product import ProductRepository
-from src.repositories.webhook import WebhookRepository
 from src.repositories.work_center import WorkCenterRepository
 from src.schemas.aggregation import AggregateAsyncRequest, AggregateRequest
 from src.schemas.batch import (
@@ -19,11 +19,13 @@ from src.schemas.batch import (
 from src.schemas.export import ExportRequest
 from src.schemas.reports import GenerateReportRequest
 from src.services.cache_service import cache_service
-from src.services.webhook_service import webhook_service
+from src.services.progress_service import progress_service
+from src.services.task_dedup_service import task_dedup_service
+from src.services.task_status_service import task_status_service
 from src.tasks.aggregation import aggregate_products_batch
 from src.tasks.import_export import export_batches_to_file, import_batches_from_file
 from src.tasks.reports import generate_batch_report
-from src.tasks.webhooks import send_webhook_delivery
+from src.tasks.webhooks import emit_webhook_event, emit_webhook_events
 
 router = APIRouter(prefix="/api/v1/batches", tags=["batches"])
 
@@ -59,7 +61,7 @@ async def create_batches(requests: list[BatchCreateRequest], db: AsyncSession =
             )
 
             batch = await batch_repo.create(batch_data)
-            created_batches.append(batch)
+            created_batches.append((batch, work_center.name))
 
         await db.commit()
 
@@ -67,29 +69,23 @@ async def create_batches(requests: list[BatchCreateRequest], db: AsyncSession =
     await cache_service.delete("dashboard_stats")
     await cache_service.delete_pattern("batches_list:*")
 
-    # Send webhook events
-    webhook_repo = WebhookRepository(db)
-    for batch in created_batches:
-        subscriptions = await webhook_repo.get_active_subscriptions_for_event("batch_created")
-        for subscription in subscriptions:
-            payload = webhook_service.create_webhook_payload(
-                "batch_created",
-                {
-                    "id": batch.id,
-                    "batch_number": batch.batch_number,
-                    "batch_date": str(batch.batch_date),
-                    "nomenclature": batch.nomenclature,
-                    "work_center": batch.work_center.name if batch.work_center else "",
-                },
-            )
-            delivery = await webhook_repo.create_delivery(
-                subscription_id=subscription.id,
-                event_type="batch_created",
-                payload=payload,
-            )
-            send_webhook_delivery.delay(delivery.id)
+    # Send webhook events: one route lookup and one commit for all batches
+    await emit_webhook_events(
+        db,
+        "batch_created",
+        [
+            {
+                "id": batch.id,
+                "batch_number": batch.batch_number,
+                "batch_date": str(batch.batch_date),
+                "nomenclature": batch.nomenclature,
+                "work_center": work_center_name,
+            }
+            for batch, work_center_name in created_batches
+        ],
+    )
 
-    return created_batches
+    return [batch for batch, _ in created_batches]
 
 
 @router.get("/{batch_id}", response_model=BatchResponse)
@@ -125,43 +121,39 @@ async def update_batch(batch_id: int, data: BatchUpdate, db: AsyncSession = Depe
     await cache_service.delete_pattern("batches_list:*")
 
     # Send webhook event
-    webhook_repo = WebhookRepository(db)
-    subscriptions = await webhook_repo.get_active_subscriptions_for_event("batch_updated")
-    for subscription in subscriptions:
-        payload = webhook_service.create_webhook_payload(
-            "batch_updated",
+    await emit_webhook_event(
+        db,
+        "batch_updated",
+        {
+            "id": batch.id,
+            "batch_number": batch.batch_number,
+            "changes": data.model_dump(exclude_unset=True),
+        },
+    )
+
+    # Check if batch was closed
+    if data.is_closed and batch.is_closed:
+        product_repo = ProductRepository(db)
+        stats = await product_repo.get_statistics(batch_id)
+
+        await emit_webhook_event(
+            db,
+            "batch_closed",
             {
                 "id": batch.id,
                 "batch_number": batch.batch_number,
-                "changes": data.model_dump(exclude_unset=True),
+                "closed_at": batch.closed_at.isoformat() if batch.closed_at else None,
+                "statistics": stats,
             },
         )
-        delivery = await webhook_repo.create_delivery(
-            subscription_id=subscription.id, event_type="batch_updated", payload=payload
-        )
-        send_webhook_delivery.delay(delivery.id)
 
-    # Check if batch was closed
-    if data.is_closed and batch.is_closed:
-        subscriptions = await webhook_repo.get_active_subscriptions_for_event("batch_closed")
-        for subscription in subscriptions:
-            product_repo = ProductRepository(db)
-            stats = await product_repo.get_statistics(batch_id)
-            payload = webhook_service.create_webhook_payload(
-                "batch_closed",
-                {
-                    "id": batch.id,
-                    "batch_number": batch.batch_number,
-                    "closed_at": batch.closed_at.isoformat() if batch.closed_at else None,
-                    "statistics": stats,
-                },
-            )
-            delivery = await webhook_repo.create_delivery(
-                subscription_id=subscription.id,
-                event_type="batch_closed",
-                payload=payload,
-            )
-            send_webhook_delivery.delay(delivery.id)
+        await progress_service.publish_batch_progress(
+            batch_id=batch.id,
+            work_center_id=batch.work_center_id,
+            event="closed",
+            stats=stats,
+            is_closed=True,
+        )
 
     return batch
 
@@ -225,63 +217,87 @@ async def aggregate_batch(
     await cache_service.delete(f"batch_statistics:{batch_id}")
     await cache_service.delete("dashboard_stats")
 
-    # Send webhook events for aggregated products
-    webhook_repo = WebhookRepository(db)
-    subscriptions = await webhook_repo.get_active_subscriptions_for_event("product_aggregated")
-
-    # Get batch info for webhook
+    # Get batch info for progress stream and webhook
     batch_repo = BatchRepository(db)
     batch = await batch_repo.get_by_id(batch_id)
 
-    if subscriptions and result.get("aggregated", 0) > 0:
-        for subscription in subscriptions:
-            # Send summary event for batch aggregation
-            payload = webhook_service.create_webhook_payload(
-                "product_aggregated",
-                {
-                    "batch_id": batch_id,
-                    "batch_number": batch.batch_number if batch else None,
-                    "total": result.get("total", 0),
-                    "aggregated": result.get("aggregated", 0),
-                    "failed": result.get("failed", 0),
-                    "aggregated_at": datetime.utcnow().isoformat() + "Z",
-                },
-            )
-            delivery = await webhook_repo.create_delivery(
-                subscription_id=subscription.id,
-                event_type="product_aggregated",
-                payload=payload,
-            )
-            send_webhook_delivery.delay(delivery.id)
+    # Send summary webhook event for batch aggregation
+    if result.get("aggregated", 0) > 0:
+        await emit_webhook_event(
+            db,
+            "product_aggregated",
+            {
+                "batch_id": batch_id,
+                "batch_number": batch.batch_number if batch else None,
+                "total": result.get("total", 0),
+                "aggregated": result.get("aggregated", 0),
+                "failed": result.get("failed", 0),
+                "aggregated_at": datetime.utcnow().isoformat() + "Z",
+            },
+        )
+
+    # Publish progress delta
+    if batch and result.get("aggregated", 0) > 0:
+        stats = await product_repo.get_statistics(batch_id)
+        await progress_service.publish_batch_progress(
+            batch_id=batch_id,
+            work_center_id=batch.work_center_id,
+            event="aggregated",
+            stats=stats,
+            aggregated_delta=result["aggregated"],
+            is_closed=batch.is_closed,
+        )
 
     return result
 
 
+async def _submit_task(task: Task, args: list, idempotency_key: str | None, message: str) -> dict:
+    """
+    Start a task unless an identical one (same normalized arguments or the
+    same Idempotency-Key) is already submitted; then its task_id is returned.
+    """
+    task_id, duplicate = await task_dedup_service.submit(task, args, idempotency_key)
+    if not duplicate:
+        return {"task_id": task_id, "status": "PENDING", "message": message}
+
+    status = await task_status_service.get_status(task_id)
+    return {
+        "task_id": task_id,
+        "status": status["status"],
+        "message": "Identical task already submitted",
+        "duplicate": True,
+    }
+
+
 @router.post("/{batch_id}/aggregate-async")
 async def aggregate_batch_async(
-    batch_id: int, data: AggregateAsyncRequest, db: AsyncSession = Depends(get_db)
+    batch_id: int,
+    data: AggregateAsyncRequest,
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
 ):
     """Асинхронная массовая аггрегация продукции"""
-    unique_codes = data.unique_codes
     # Verify batch exists
     batch_repo = BatchRepository(db)
     batch = await batch_repo.get_by_id(batch_id)
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    # Start async task
-    task = aggregate_products_batch.delay(batch_id, unique_codes)
-
-    return {
-        "task_id": task.id,
-        "status": "PENDING",
-        "message": "Aggregation task started",
-    }
+    # Order of codes does not change the work, sorted codes share one lock
+    return await _submit_task(
+        aggregate_products_batch,
+        [batch_id, sorted(data.unique_codes)],
+        idempotency_key,
+        "Aggregation task started",
+    )
 
 
 @router.post("/{batch_id}/reports")
 async def generate_report(
-    batch_id: int, data: GenerateReportRequest, db: AsyncSession = Depends(get_db)
+    batch_id: int,
+    data: GenerateReportRequest,
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
 ):
     """Генерация отчета по партии"""
     if data.format not in ["excel", "pdf"]:
@@ -293,39 +309,41 @@ async def generate_report(
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    # Start async task
-    task = generate_batch_report.delay(batch_id, data.format, data.email)
-
-    return {
-        "task_id": task.id,
-        "status": "PENDING",
-        "message": "Report generation started",
-    }
+    return await _submit_task(
+        generate_batch_report,
+        [batch_id, data.format, data.email],
+        idempotency_key,
+        "Report generation started",
+    )
 
 
 @router.post("/import")
 async def import_batches(
     file_url: str,
     user_id: int = 1,  # In production, get from auth
+    idempotency_key: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
 ):
     """Импорт партий из файла"""
-    task = import_batches_from_file.delay(file_url, user_id)
-
-    return {
-        "task_id": task.id,
-        "status": "PENDING",
-        "message": "File uploaded, import started",
-    }
+    return await _submit_task(
+        import_batches_from_file,
+        [file_url, user_id],
+        idempotency_key,
+        "File uploaded, import started",
+    )
 
 
 @router.post("/export")
-async def export_batches(data: ExportRequest, db: AsyncSession = Depends(get_db)):
+async def export_batches(
+    data: ExportRequest,
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
     """Экспорт партий в файл"""
     if data.format not in ["excel", "csv"]:
         raise HTTPException(status_code=400, detail="Format must be 'excel' or 'csv'")
 
     filters = data.filters or {}
-    task = export_batches_to_file.delay(filters, data.format)
-
-    return {"task_id": task.id, "status": "PENDING", "message": "Export started"}
+    return await _submit_task(
+        export_batches_to_file, [filters, data.format], idempotency_key, "Export started"
+    )
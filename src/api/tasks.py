@@ -1,35 +1,63 @@
-from celery.result import AsyncResult
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 
-from src.celery_app import celery_app
+from src.schemas.task import TaskStatusRequest
+from src.services.progress_service import format_sse, progress_service, sse_response
+from src.services.task_status_service import TERMINAL_STATES, task_status_service
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["tasks"])
 
 
+@router.post("/status")
+async def get_tasks_status(data: TaskStatusRequest):
+    """Статусы нескольких задач одним запросом (до 1000 ID)"""
+    return {"items": await task_status_service.get_statuses(data.task_ids)}
+
+
 @router.get("/{task_id}")
-async def get_task_status(task_id: str):
-    """Получение статуса задачи"""
-    task_result = AsyncResult(task_id, app=celery_app)
-
-    if task_result.state == "PENDING":
-        response = {"task_id": task_id, "status": "PENDING", "result": None}
-    elif task_result.state == "PROGRESS":
-        response = {
-            "task_id": task_id,
-            "status": "PROGRESS",
-            "result": task_result.info,
-        }
-    elif task_result.state == "SUCCESS":
-        response = {
-            "task_id": task_id,
-            "status": "SUCCESS",
-            "result": task_result.result,
-        }
-    else:  # FAILURE
-        response = {
-            "task_id": task_id,
-            "status": "FAILURE",
-            "result": {"error": str(task_result.info)},
-        }
-
-    return response
+async def get_task_status(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=30),
+    state: str | None = None,
+):
+    """
+    Получение статуса задачи.
+
+    С wait > 0 (long-poll) ответ возвращается, как только статус изменится,
+    но не позже чем через wait секунд. state - последний известный клиенту
+    статус: если текущий уже отличается, ответ возвращается сразу.
+    """
+    if wait <= 0:
+        return await task_status_service.get_status(task_id)
+
+    async with progress_service.subscription(task_status_service.task_channel(task_id)) as pubsub:
+        status = await task_status_service.get_status(task_id)
+        if status["status"] in TERMINAL_STATES or (state and state != status["status"]):
+            return status
+
+        message = await progress_service.next_message(pubsub, timeout=wait)
+        return message or await task_status_service.get_status(task_id)
+
+
+async def _task_stream(request: Request, task_id: str):
+    """Generate SSE messages from task channel until the task finishes"""
+    async with progress_service.subscription(task_status_service.task_channel(task_id)) as pubsub:
+        status = await task_status_service.get_status(task_id)
+        yield format_sse(status, event="snapshot")
+        if status["status"] in TERMINAL_STATES:
+            return
+
+        while not await request.is_disconnected():
+            message = await progress_service.next_message(pubsub, timeout=15.0)
+            if message is None:
+                # Heartbeat keeps proxies from closing idle connections
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(message, event=message["status"].lower())
+            if message["status"] in TERMINAL_STATES:
+                return
+
+
+@router.get("/{task_id}/stream")
+async def stream_task_status(task_id: str, request: Request):
+    """Поток статусов и прогресса задачи (Server-Sent Events)"""
+    return sse_response(_task_stream(request, task_id))
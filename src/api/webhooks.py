@@ -1,13 +1,21 @@
+import base64
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db
 from src.repositories.webhook import WebhookRepository
 from src.schemas.webhook import (
+    WebhookDeliveryListResponse,
+    WebhookDeliveryResponse,
+    WebhookDeliverySummary,
+    WebhookReplayRequest,
     WebhookSubscriptionCreate,
     WebhookSubscriptionResponse,
     WebhookSubscriptionUpdate,
 )
+from src.services.subscription_router import subscription_router
 
 router = APIRouter(prefix="/api/v1/webhooks", tags=["webhooks"])
 
@@ -18,9 +26,33 @@ async def create_webhook(data: WebhookSubscriptionCreate, db: AsyncSession = Dep
     webhook_repo = WebhookRepository(db)
     subscription = await webhook_repo.create_subscription(data)
     await db.commit()
+    await subscription_router.notify_changed()
     return subscription
 
 
+@router.post("/deliveries/replay", response_model=dict, status_code=202)
+async def replay_webhook_deliveries(data: WebhookReplayRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Повторная отправка доставок (по умолчанию из dead-letter) по фильтрам.
+    Доставки получают статус "replaying" и новый лимит попыток, затем возвращаются
+    в очередь с ограничением WEBHOOK_REPLAY_RATE_PER_HOST доставок в секунду на хост.
+    """
+    if data.created_from and data.created_to and data.created_from >= data.created_to:
+        raise HTTPException(status_code=400, detail="created_from must be before created_to")
+
+    webhook_repo = WebhookRepository(db)
+    replayed = await webhook_repo.replay_deliveries(
+        statuses=data.statuses,
+        subscription_id=data.subscription_id,
+        event_type=data.event_type,
+        created_from=data.created_from,
+        created_to=data.created_to,
+    )
+    await db.commit()
+
+    return {"replayed": replayed}
+
+
 @router.get("", response_model=dict)
 async def list_webhooks(is_active: bool | None = Query(None), db: AsyncSession = Depends(get_db)):
     """Список webhook подписок"""
@@ -54,6 +86,7 @@ async def update_webhook(
         raise HTTPException(status_code=404, detail="Webhook subscription not found")
 
     await db.commit()
+    await subscription_router.notify_changed()
     return subscription
 
 
@@ -67,16 +100,36 @@ async def delete_webhook(webhook_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Webhook subscription not found")
 
     await db.commit()
+    await subscription_router.notify_changed()
     return None
 
 
-@router.get("/{webhook_id}/deliveries", response_model=dict)
+def _encode_cursor(created_at: datetime, delivery_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{delivery_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, delivery_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        )
+        return datetime.fromisoformat(created_at), int(delivery_id)
+    except (ValueError, UnicodeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+@router.get("/{webhook_id}/deliveries", response_model=WebhookDeliveryListResponse)
 async def get_webhook_deliveries(
     webhook_id: int,
     limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="next_cursor из предыдущей страницы"),
+    status: str | None = Query(None),
+    event_type: str | None = Query(None),
+    include_payload: bool = Query(False, description="Включить payload и response_body"),
     db: AsyncSession = Depends(get_db),
 ):
-    """История доставок webhook"""
+    """История доставок webhook (от новых к старым, постраничная выдача по курсору)"""
     webhook_repo = WebhookRepository(db)
 
     # Verify subscription exists
@@ -84,6 +137,25 @@ async def get_webhook_deliveries(
     if not subscription:
         raise HTTPException(status_code=404, detail="Webhook subscription not found")
 
-    deliveries = await webhook_repo.get_deliveries_by_subscription(webhook_id, limit=limit)
-
-    return {"items": deliveries, "total": len(deliveries)}
+    # One extra row tells whether there is a next page
+    deliveries = await webhook_repo.get_deliveries_page(
+        webhook_id,
+        limit=limit + 1,
+        before=_decode_cursor(cursor) if cursor else None,
+        status=status,
+        event_type=event_type,
+        include_payload=include_payload,
+    )
+
+    next_cursor = None
+    if len(deliveries) > limit:
+        deliveries = deliveries[:limit]
+        last = deliveries[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+
+    schema = WebhookDeliveryResponse if include_payload else WebhookDeliverySummary
+    return WebhookDeliveryListResponse(
+        items=[schema.model_validate(delivery) for delivery in deliveries],
+        limit=limit,
+        next_cursor=next_cursor,
+    )
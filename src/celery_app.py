@@ -1,5 +1,6 @@
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 
 from src.config import settings
 
@@ -23,26 +24,94 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
 )
 
+# Task queues: one per task family, so a long import never delays webhook
+# delivery or aggregation. Workers are started per queue with
+# scripts/start_worker.sh <profile>, which also sets the prefetch multiplier.
+TASK_QUEUES = ("default", "webhooks", "aggregation", "reports", "imports", "scheduled")
+
+# RabbitMQ priorities 0..9, higher first
+TASK_MAX_PRIORITY = 9
+TASK_PRIORITY_DEFAULT = 5
+# Retries and replays yield to fresh deliveries
+TASK_PRIORITY_LOW = 2
+
+celery_app.conf.update(
+    task_queues=[
+        Queue(name, routing_key=name, queue_arguments={"x-max-priority": TASK_MAX_PRIORITY})
+        for name in TASK_QUEUES
+    ],
+    task_default_queue="default",
+    task_default_priority=TASK_PRIORITY_DEFAULT,
+    task_routes={
+        "src.tasks.webhooks.*": {"queue": "webhooks"},
+        "src.tasks.scheduled.retry_failed_webhooks": {"queue": "webhooks"},
+        "src.tasks.aggregation.*": {"queue": "aggregation"},
+        "src.tasks.reports.*": {"queue": "reports"},
+        "src.tasks.import_export.import_batches_from_file": {"queue": "imports"},
+        "src.tasks.import_export.*": {"queue": "reports"},
+        "src.tasks.scheduled.*": {"queue": "scheduled"},
+    },
+    # Overridden per profile by scripts/start_worker.sh
+    worker_prefetch_multiplier=1,
+)
+
 # Celery Beat schedule
 celery_app.conf.beat_schedule = {
-    # Auto-close expired batches - every day at 01:00
+    # Auto-close expired batches - every 5 minutes
     "auto-close-expired-batches": {
-        "task": "src.tasks.auto_close_expired_batches",
-        "schedule": crontab(hour=1, minute=0),
+        "task": "src.tasks.scheduled.auto_close_expired_batches",
+        "schedule": crontab(minute="*/5"),
     },
     # Cleanup old files - every day at 02:00
     "cleanup-old-files": {
-        "task": "src.tasks.cleanup_old_files",
+        "task": "src.tasks.scheduled.cleanup_old_files",
         "schedule": crontab(hour=2, minute=0),
     },
+    # Incremental Parquet export of product events - every day at 03:00
+    "export-product-events": {
+        "task": "src.tasks.import_export.export_product_events_to_parquet",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Create and archive webhook delivery partitions - every day at 04:00
+    "maintain-webhook-partitions": {
+        "task": "src.tasks.scheduled.maintain_webhook_partitions",
+        "schedule": crontab(hour=4, minute=0),
+    },
     # Update statistics - every 5 minutes
     "update-statistics": {
-        "task": "src.tasks.update_cached_statistics",
+        "task": "src.tasks.scheduled.update_cached_statistics",
+        "schedule": crontab(minute="*/5"),
+    },
+    # Refresh leaderboard aggregate - every 5 minutes
+    "refresh-shift-performance": {
+        "task": "src.tasks.scheduled.refresh_shift_performance",
         "schedule": crontab(minute="*/5"),
     },
-    # Retry failed webhooks - every 15 minutes
+    # Send buffered events of batch mode webhook subscriptions - every second;
+    # runs not picked up within a second are dropped instead of piling up
+    # in the queue while workers are down
+    "flush-webhook-buffers": {
+        "task": "src.tasks.webhooks.flush_webhook_buffers",
+        "schedule": 1.0,
+        "options": {"expires": 1},
+    },
+    # Release replayed webhook deliveries at the per-host rate - every second,
+    # stale runs expire like flush-webhook-buffers
+    "release-replayed-webhooks": {
+        "task": "src.tasks.webhooks.release_replayed_webhooks",
+        "schedule": 1.0,
+        "options": {"expires": 1},
+    },
+    # Release parked webhook deliveries of recovered hosts - every 30 seconds
+    "release-parked-webhooks": {
+        "task": "src.tasks.webhooks.release_parked_webhooks",
+        "schedule": 30.0,
+    },
+    # Retry failed webhooks due by next_attempt_at - every 5 seconds,
+    # stale runs expire like flush-webhook-buffers
     "retry-failed-webhooks": {
-        "task": "src.tasks.retry_failed_webhooks",
-        "schedule": crontab(minute="*/15"),
+        "task": "src.tasks.scheduled.retry_failed_webhooks",
+        "schedule": 5.0,
+        "options": {"expires": 5},
     },
 }
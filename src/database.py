@@ -1,13 +1,107 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config import settings
 
+
+class PoolMetricsMixin:
+    """Records how long queue pool checkouts wait for a free connection"""
+
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._checkouts += 1
+            self._waits.append(waited)
+            self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def stats(self) -> dict:
+        """Pool saturation and checkout wait times (waits over the last samples)"""
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            checkouts, timeouts, wait_max = self._checkouts, self._timeouts, self._wait_max
+
+        capacity = self.size() + max(self._max_overflow, 0)
+        checked_out = self.checkedout()
+
+        def wait_ms(share: float) -> float | None:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(share * len(waits)))] * 1000, 3)
+
+        return {
+            "profile": settings.db_pool_profile,
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": checked_out,
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_p50_ms": wait_ms(0.50),
+            "wait_p99_ms": wait_ms(0.99),
+            "wait_max_ms": round(wait_max * 1000, 3),
+        }
+
+
+class InstrumentedPool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    """Async engine queue pool with checkout metrics"""
+
+
+def engine_options(profile: str) -> dict:
+    """create_async_engine arguments of a pool profile ("api" or "worker")"""
+    if profile not in ("api", "worker"):
+        raise ValueError(f"Unknown database pool profile: {profile}")
+
+    server_settings = {"application_name": f"production_control_{profile}"}
+    statement_timeout = getattr(settings, f"db_{profile}_statement_timeout_ms")
+    if statement_timeout:
+        server_settings["statement_timeout"] = str(statement_timeout)
+
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": getattr(settings, f"db_{profile}_pool_size"),
+        "max_overflow": getattr(settings, f"db_{profile}_max_overflow"),
+        "pool_timeout": getattr(settings, f"db_{profile}_pool_timeout"),
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "server_settings": server_settings,
+        },
+    }
+
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     future=True,
+    **engine_options(settings.db_pool_profile),
 )
 
 # Create async session factory
@@ -23,6 +117,11 @@ AsyncSessionLocal = async_sessionmaker(
 Base = declarative_base()
 
 
+def db_pool_stats() -> dict:
+    """Connection pool metrics of this process"""
+    return engine.sync_engine.pool.stats()
+
+
 # Dependency for FastAPI
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
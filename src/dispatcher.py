@@ -0,0 +1,44 @@
+"""
+Webhook dispatcher process.
+
+Usage:
+    python -m src.dispatcher
+
+Requires WEBHOOK_DISPATCHER_ENABLED=true for API and Celery workers,
+so that deliveries are left to the dispatcher instead of Celery tasks.
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+from src.config import settings
+from src.database import engine
+from src.services.webhook_dispatcher import WebhookDispatcher
+
+
+async def main():
+    dispatcher = WebhookDispatcher()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, dispatcher.stop)
+
+    try:
+        await dispatcher.run()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    if not settings.webhook_dispatcher_enabled:
+        # Celery tasks would send the same deliveries
+        print(
+            "❌ WEBHOOK_DISPATCHER_ENABLED is not set, dispatcher would duplicate Celery deliveries"
+        )
+        sys.exit(1)
+
+    asyncio.run(main())
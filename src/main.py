@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api import analytics, batches, products, tasks, webhooks
-from src.database import Base, engine
+from src.database import Base, db_pool_stats, engine
 from src.services.cache_service import cache_service
+from src.services.progress_service import progress_service
+from src.services.subscription_router import subscription_router
+from src.services.task_dedup_service import task_dedup_service
+from src.services.task_status_service import task_status_service
 
 # Rate limiting (optional - can be enabled if needed)
 try:
@@ -62,6 +66,10 @@ async def startup():
 async def shutdown():
     """Cleanup on shutdown"""
     await cache_service.disconnect()
+    await progress_service.disconnect()
+    await task_status_service.disconnect()
+    await task_dedup_service.disconnect()
+    subscription_router.stop()
 
 
 @app.get("/health")
@@ -70,6 +78,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """Метрики пула соединений с БД этого процесса: загрузка и время ожидания соединения"""
+    return db_pool_stats()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
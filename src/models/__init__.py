@@ -1,5 +1,7 @@
 from src.models.batch import Batch
+from src.models.dashboard_snapshot import DashboardSnapshot
 from src.models.product import Product
+from src.models.shift_performance import shift_performance
 from src.models.webhook import WebhookDelivery, WebhookSubscription
 from src.models.work_center import WorkCenter
 
@@ -9,4 +11,6 @@ __all__ = [
     "Product",
     "WebhookSubscription",
     "WebhookDelivery",
+    "DashboardSnapshot",
+    "shift_performance",
 ]
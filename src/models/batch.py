@@ -8,6 +8,7 @@ from sqlalchemy import (
     Integer,
     String,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -54,4 +55,6 @@ class Batch(Base):
         UniqueConstraint("batch_number", "batch_date", name="uq_batch_number_date"),
         Index("idx_batch_closed", "is_closed"),
         Index("idx_batch_shift_times", "shift_start", "shift_end"),
+        # Open batches by shift end for auto-close; closed batches are not indexed
+        Index("idx_batch_open_shift_end", "shift_end", postgresql_where=text("NOT is_closed")),
     )
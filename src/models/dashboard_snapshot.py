@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from src.database import Base
+
+
+class DashboardSnapshot(Base):
+    __tablename__ = "dashboard_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Series tier: "5m", "1h" or "1d"
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+
+    # Statistics
+    total_batches = Column(Integer, nullable=False)
+    active_batches = Column(Integer, nullable=False)
+    total_products = Column(Integer, nullable=False)
+    aggregated_products = Column(Integer, nullable=False)
+    aggregation_rate = Column(Float, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("resolution", "bucket_start", name="uq_dashboard_snapshot_bucket"),
+    )
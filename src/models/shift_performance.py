@@ -0,0 +1,73 @@
+from sqlalchemy import DDL, Date, DateTime, Float, Integer, String, column, event, table
+
+from src.database import Base
+
+# Materialized aggregate of production per work center, team and shift.
+# Not an ORM model: the view is created after tables and refreshed by Celery Beat.
+shift_performance = table(
+    "mv_shift_performance",
+    column("work_center_id", Integer),
+    column("work_center_name", String),
+    column("team", String),
+    column("batch_date", Date),
+    column("shift", String),
+    column("shift_start", DateTime(timezone=True)),
+    column("batches", Integer),
+    column("closed_batches", Integer),
+    column("total_products", Integer),
+    column("aggregated_products", Integer),
+    column("shift_hours", Float),
+)
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS mv_shift_performance AS
+        SELECT
+            b.work_center_id,
+            w.name AS work_center_name,
+            b.team,
+            b.batch_date,
+            b.shift,
+            min(b.shift_start) AS shift_start,
+            count(*) AS batches,
+            count(*) FILTER (WHERE b.is_closed) AS closed_batches,
+            coalesce(sum(p.total_products), 0) AS total_products,
+            coalesce(sum(p.aggregated_products), 0) AS aggregated_products,
+            extract(epoch FROM max(b.shift_end) - min(b.shift_start)) / 3600.0 AS shift_hours
+        FROM batches b
+        JOIN work_centers w ON w.id = b.work_center_id
+        LEFT JOIN (
+            SELECT
+                batch_id,
+                count(*) AS total_products,
+                count(*) FILTER (WHERE is_aggregated) AS aggregated_products
+            FROM products
+            GROUP BY batch_id
+        ) p ON p.batch_id = b.id
+        GROUP BY b.work_center_id, w.name, b.team, b.batch_date, b.shift
+        WITH DATA
+        """
+    ),
+)
+
+# Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY. It must
+# be a plain column index, so NULL team or shift groups are kept unique with
+# NULLS NOT DISTINCT (PostgreSQL 15+) rather than coalesce() expressions
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_shift_performance_key "
+        "ON mv_shift_performance (work_center_id, team, batch_date, shift) "
+        "NULLS NOT DISTINCT"
+    ),
+)
+
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL("DROP MATERIALIZED VIEW IF EXISTS mv_shift_performance"),
+)
@@ -1,4 +1,19 @@
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String
+import json
+from typing import Any
+
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    event,
+    text,
+)
 from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -17,31 +32,159 @@ class WebhookSubscription(Base):
     retry_count = Column(Integer, default=3, nullable=False)
     timeout = Column(Integer, default=10, nullable=False)
 
+    # "single" - one request per event, "batch" - events are buffered and sent
+    # as one array when max_events or max_latency_ms is reached
+    delivery_mode = Column(String, default="single", server_default="single", nullable=False)
+    max_events = Column(Integer, default=100, server_default="100", nullable=False)
+    max_latency_ms = Column(Integer, default=1000, server_default="1000", nullable=False)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
+    # Deliveries are removed by ON DELETE CASCADE, without loading them
     deliveries = relationship(
-        "WebhookDelivery", back_populates="subscription", cascade="all, delete-orphan"
+        "WebhookDelivery",
+        back_populates="subscription",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # events @> ARRAY[...] lookups when the routing cache is rebuilt
+        Index("idx_webhook_subscription_events", "events", postgresql_using="gin"),
+    )
+
+
+def encode_body(payload: Any) -> bytes:
+    """Canonical JSON bytes of a webhook payload: what is stored, signed and sent"""
+    return json.dumps(payload, default=str, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
     )
 
 
 class WebhookDelivery(Base):
+    """
+    Delivery log, range-partitioned by created_at into monthly partitions.
+
+    Partition key is part of the primary key, so load rows by id with
+    WebhookRepository.get_delivery instead of session.get.
+    """
+
     __tablename__ = "webhook_deliveries"
 
-    id = Column(Integer, primary_key=True, index=True)
-    subscription_id = Column(Integer, ForeignKey("webhook_subscriptions.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    subscription_id = Column(
+        Integer, ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"), nullable=False
+    )
     event_type = Column(String, nullable=False)
-    payload = Column(JSON, nullable=False)
+    # Request body, serialized once per event (JSON array for batch deliveries)
+    body = Column(LargeBinary, nullable=False)
 
-    status = Column(String, nullable=False)  # "pending", "success", "failed"
+    # "buffered" -> "batched" for events of batch mode subscriptions,
+    # "pending" -> "processing" -> "success" / "failed" for sent requests,
+    # "dead" once retries are exhausted, "replaying" until released by replay,
+    # "parked" while the circuit of the subscription host is open
+    status = Column(String, nullable=False)
+    # Batch delivery that carried this event (no FK: partitioned tables can only
+    # be referenced by keys that include created_at)
+    batch_delivery_id = Column(Integer, nullable=True)
     attempts = Column(Integer, default=0, nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # Claimed by dispatcher
+    # Set for failed deliveries that still have retries left
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
     response_status = Column(Integer, nullable=True)
-    response_body = Column(String, nullable=True)
+    response_body = Column(String, nullable=True)  # Truncated to WEBHOOK_RESPONSE_BODY_LIMIT
     error_message = Column(String, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
     delivered_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     subscription = relationship("WebhookSubscription", back_populates="deliveries")
+
+    @property
+    def payload(self) -> Any:
+        return json.loads(self.body)
+
+    @payload.setter
+    def payload(self, value: Any):
+        self.body = encode_body(value)
+
+    __table_args__ = (
+        # Delivery history of a subscription, newest first (keyset pagination)
+        Index("idx_webhook_delivery_subscription_created", "subscription_id", "created_at", "id"),
+        # Dispatcher claims pending rows in id order
+        Index(
+            "idx_webhook_delivery_pending",
+            "id",
+            postgresql_where=text("status IN ('pending', 'processing')"),
+        ),
+        # Retry scheduler claims due failed rows in next_attempt_at order
+        Index(
+            "idx_webhook_delivery_next_attempt",
+            "next_attempt_at",
+            postgresql_where=text("status = 'failed' AND next_attempt_at IS NOT NULL"),
+        ),
+        # Buffered events are coalesced per subscription in id order
+        Index(
+            "idx_webhook_delivery_buffered",
+            "subscription_id",
+            "id",
+            postgresql_where=text("status = 'buffered'"),
+        ),
+        # Parked deliveries are released per host when its circuit closes
+        Index(
+            "idx_webhook_delivery_parked",
+            "subscription_id",
+            "id",
+            postgresql_where=text("status = 'parked'"),
+        ),
+        # Replay releases rows per host at a limited rate
+        Index(
+            "idx_webhook_delivery_replaying",
+            "subscription_id",
+            "id",
+            postgresql_where=text("status = 'replaying'"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# Default partition catches rows outside monthly partitions; partitions of the
+# current and next two months (UTC) exist from the start, later ones are created
+# by the maintain_webhook_partitions task
+event.listen(
+    WebhookDelivery.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS webhook_deliveries_default PARTITION OF webhook_deliveries DEFAULT"
+    ),
+)
+
+event.listen(
+    WebhookDelivery.__table__,
+    "after_create",
+    DDL(
+        """
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+            lower_bound date;
+        BEGIN
+            FOR i IN 0..2 LOOP
+                lower_bound := (month_start + i * interval '1 month')::date;
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %%I PARTITION OF webhook_deliveries '
+                    'FOR VALUES FROM (%%L) TO (%%L)',
+                    'webhook_deliveries_p' || to_char(lower_bound, 'YYYYMM'),
+                    lower_bound || ' 00:00:00+00',
+                    (lower_bound + interval '1 month')::date || ' 00:00:00+00'
+                );
+            END LOOP;
+        END $$
+        """
+    ),
+)
@@ -1,11 +1,15 @@
+from src.repositories.analytics import AnalyticsRepository
 from src.repositories.batch import BatchRepository
+from src.repositories.dashboard_snapshot import DashboardSnapshotRepository
 from src.repositories.product import ProductRepository
 from src.repositories.webhook import WebhookRepository
 from src.repositories.work_center import WorkCenterRepository
 
 __all__ = [
+    "AnalyticsRepository",
     "WorkCenterRepository",
     "BatchRepository",
     "ProductRepository",
     "WebhookRepository",
+    "DashboardSnapshotRepository",
 ]
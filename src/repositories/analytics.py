@@ -0,0 +1,58 @@
+from datetime import date
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.shift_performance import shift_performance
+
+
+class AnalyticsRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_shift_performance(self, date_from: date) -> list[Row]:
+        """
+        Work center and team totals plus per-shift rows in one GROUPING SETS query.
+
+        Row kind is told apart by GROUPING() flags:
+            wc_grouped=0, team_grouped=1 -> work center rows
+            wc_grouped=1, team_grouped=0 -> team rows
+            shift_grouped>0 -> totals over the period, 0 -> one shift
+        """
+        mv = shift_performance.c
+        query = (
+            select(
+                mv.work_center_id,
+                mv.work_center_name,
+                mv.team,
+                mv.batch_date,
+                mv.shift,
+                func.grouping(mv.work_center_id).label("wc_grouped"),
+                func.grouping(mv.team).label("team_grouped"),
+                func.grouping(mv.batch_date, mv.shift).label("shift_grouped"),
+                func.min(mv.shift_start).label("shift_start"),
+                func.sum(mv.batches).label("batches"),
+                func.sum(mv.closed_batches).label("closed_batches"),
+                func.sum(mv.total_products).label("total_products"),
+                func.sum(mv.aggregated_products).label("aggregated_products"),
+                func.sum(mv.shift_hours).label("hours"),
+            )
+            .where(mv.batch_date >= date_from)
+            .group_by(
+                func.grouping_sets(
+                    tuple_(mv.work_center_id, mv.work_center_name),
+                    tuple_(mv.work_center_id, mv.work_center_name, mv.batch_date, mv.shift),
+                    tuple_(mv.team),
+                    tuple_(mv.team, mv.batch_date, mv.shift),
+                )
+            )
+        )
+        result = await self.session.execute(query)
+        return list(result.all())
+
+    async def refresh_shift_performance(self):
+        """Refresh materialized aggregate without blocking readers"""
+        await self.session.execute(
+            text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_shift_performance")
+        )
@@ -1,7 +1,9 @@
 import builtins
 from datetime import date, datetime
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -20,6 +22,24 @@ class BatchRepository:
         await self.session.refresh(batch)
         return batch
 
+    async def create_many(self, rows: builtins.list[dict]) -> int:
+        """
+        Insert batches with one multi-row INSERT, skipping those whose
+        (batch_number, batch_date) already exists.
+
+        Returns:
+            Number of inserted batches
+        """
+        if not rows:
+            return 0
+        result = await self.session.execute(
+            insert(Batch)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="uq_batch_number_date")
+            .returning(Batch.id)
+        )
+        return len(result.all())
+
     async def get_by_id(self, batch_id: int, with_products: bool = False) -> Batch | None:
         query = select(Batch).where(Batch.id == batch_id)
         if with_products:
@@ -91,8 +111,29 @@ class BatchRepository:
 
         return list(items), total
 
-    async def get_expired_batches(self) -> builtins.list[Batch]:
-        """Get batches where shift_end < now() and is_closed = False"""
-        query = select(Batch).where(and_(not Batch.is_closed, Batch.shift_end < datetime.utcnow()))
-        result = await self.session.execute(query)
-        return list(result.scalars().all())
+    async def close_expired_batches(self, limit: int = 1000) -> builtins.list[Row]:
+        """
+        Close open batches whose shift has ended, in one UPDATE.
+
+        Rows are picked through the partial index on shift_end of open batches
+        and locked with FOR UPDATE SKIP LOCKED, so a concurrent close from the
+        API is not waited for.
+
+        Returns:
+            (id, batch_number, work_center_id, closed_at) of closed batches
+        """
+        expired = (
+            select(Batch.id)
+            .where(~Batch.is_closed, Batch.shift_end < func.now())
+            .order_by(Batch.shift_end)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(Batch)
+            .where(Batch.id.in_(expired.scalar_subquery()))
+            .values(is_closed=True, closed_at=func.now())
+            .returning(Batch.id, Batch.batch_number, Batch.work_center_id, Batch.closed_at)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.all())
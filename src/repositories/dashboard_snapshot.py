@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.dashboard_snapshot import DashboardSnapshot
+
+# resolution -> (bucket size, retention); None retention keeps points forever
+SNAPSHOT_TIERS: dict[str, tuple[timedelta, timedelta | None]] = {
+    "5m": (timedelta(minutes=5), timedelta(days=1)),
+    "1h": (timedelta(hours=1), timedelta(days=30)),
+    "1d": (timedelta(days=1), None),
+}
+
+SNAPSHOT_FIELDS = (
+    "total_batches",
+    "active_batches",
+    "total_products",
+    "aggregated_products",
+    "aggregation_rate",
+)
+
+
+def bucket_start(moment: datetime, size: timedelta) -> datetime:
+    """Floor datetime to the start of its bucket"""
+    epoch = datetime(1970, 1, 1, tzinfo=moment.tzinfo)
+    return moment - (moment - epoch) % size
+
+
+class DashboardSnapshotRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record(self, stats: dict, moment: datetime):
+        """
+        Store snapshot in every tier.
+
+        Each tier keeps one point per bucket, the latest snapshot in the bucket
+        overwrites the previous one, so coarse tiers are downsampled as we go.
+        """
+        values = {field: stats[field] for field in SNAPSHOT_FIELDS}
+
+        for resolution, (size, _) in SNAPSHOT_TIERS.items():
+            query = insert(DashboardSnapshot).values(
+                resolution=resolution, bucket_start=bucket_start(moment, size), **values
+            )
+            query = query.on_conflict_do_update(
+                constraint="uq_dashboard_snapshot_bucket", set_=values
+            )
+            await self.session.execute(query)
+
+    async def prune(self, moment: datetime) -> int:
+        """Delete points past their tier retention"""
+        deleted = 0
+        for resolution, (_, retention) in SNAPSHOT_TIERS.items():
+            if retention is None:
+                continue
+            result = await self.session.execute(
+                delete(DashboardSnapshot).where(
+                    and_(
+                        DashboardSnapshot.resolution == resolution,
+                        DashboardSnapshot.bucket_start < moment - retention,
+                    )
+                )
+            )
+            deleted += result.rowcount
+        return deleted
+
+    async def get_series(
+        self, resolution: str, date_from: datetime, date_to: datetime
+    ) -> list[DashboardSnapshot]:
+        result = await self.session.execute(
+            select(DashboardSnapshot)
+            .where(
+                and_(
+                    DashboardSnapshot.resolution == resolution,
+                    DashboardSnapshot.bucket_start >= date_from,
+                    DashboardSnapshot.bucket_start <= date_to,
+                )
+            )
+            .order_by(DashboardSnapshot.bucket_start)
+        )
+        return list(result.scalars().all())
@@ -1,7 +1,14 @@
-from sqlalchemy import and_, func, select
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Float, and_, cast, func, select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.models.batch import Batch
 from src.models.product import Product
+from src.models.work_center import WorkCenter
 from src.schemas.product import ProductCreate
 
 
@@ -99,13 +106,107 @@ class ProductRepository:
             ).where(Product.batch_id == batch_id)
         )
         stats = result.first()
+        return self._statistics(stats.total or 0, stats.aggregated or 0)
 
-        total = stats.total or 0
-        aggregated = stats.aggregated or 0
+    async def get_statistics_bulk(self, batch_ids: list[int]) -> dict[int, dict]:
+        """Aggregation statistics of many batches in one GROUP BY query"""
+        if not batch_ids:
+            return {}
 
+        result = await self.session.execute(
+            select(
+                Product.batch_id,
+                func.count(Product.id).label("total"),
+                func.count(Product.id).filter(Product.is_aggregated).label("aggregated"),
+            )
+            .where(Product.batch_id.in_(batch_ids))
+            .group_by(Product.batch_id)
+        )
+        counts = {row.batch_id: (row.total, row.aggregated) for row in result}
+        return {batch_id: self._statistics(*counts.get(batch_id, (0, 0))) for batch_id in batch_ids}
+
+    @staticmethod
+    def _statistics(total: int, aggregated: int) -> dict:
         return {
             "total_products": total,
             "aggregated": aggregated,
             "remaining": total - aggregated,
             "aggregation_rate": (aggregated / total * 100) if total > 0 else 0.0,
         }
+
+    async def get_aggregation_version(self, batch_id: int) -> tuple[int, datetime | None]:
+        """Aggregated count and last aggregation time (changes on every aggregation)"""
+        result = await self.session.execute(
+            select(func.count(Product.id), func.max(Product.aggregated_at)).where(
+                and_(Product.batch_id == batch_id, Product.is_aggregated)
+            )
+        )
+        aggregated, last_aggregated_at = result.one()
+        return aggregated or 0, last_aggregated_at
+
+    async def get_aggregation_timestamps(
+        self, batch_id: int, chunk_size: int = 100_000
+    ) -> np.ndarray:
+        """
+        Sorted aggregation timestamps of a batch as epoch seconds.
+
+        Rows are streamed in chunks straight into float64 arrays, without
+        building a Python list of the whole batch.
+        """
+        result = await self.session.stream(
+            select(cast(func.extract("epoch", Product.aggregated_at), Float))
+            .where(
+                and_(
+                    Product.batch_id == batch_id,
+                    Product.is_aggregated,
+                    Product.aggregated_at.isnot(None),
+                )
+            )
+            .order_by(Product.aggregated_at)
+            .execution_options(yield_per=chunk_size)
+        )
+        chunks = [
+            np.fromiter(chunk, dtype=np.float64, count=len(chunk))
+            async for chunk in result.scalars().partitions()
+        ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+
+    async def stream_aggregation_events(
+        self, since: datetime | None, until: datetime, chunk_size: int = 50_000
+    ) -> AsyncIterator[list[Row]]:
+        """
+        Stream aggregated products with batch and work center attributes.
+
+        Rows with since < aggregated_at <= until are fetched through a
+        server-side cursor in chunks, ordered by batch_date.
+        """
+        conditions = [Product.is_aggregated, Product.aggregated_at <= until]
+        if since is not None:
+            conditions.append(Product.aggregated_at > since)
+
+        query = (
+            select(
+                Product.id.label("product_id"),
+                Product.unique_code,
+                Product.aggregated_at,
+                Product.created_at,
+                Batch.id.label("batch_id"),
+                Batch.batch_number,
+                Batch.batch_date,
+                Batch.shift,
+                Batch.team,
+                Batch.nomenclature,
+                Batch.ekn_code,
+                WorkCenter.identifier.label("work_center_identifier"),
+                WorkCenter.name.label("work_center_name"),
+            )
+            .join(Batch, Batch.id == Product.batch_id)
+            .join(WorkCenter, WorkCenter.id == Batch.work_center_id)
+            .where(and_(*conditions))
+            .order_by(Batch.batch_date, Product.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        result = await self.session.stream(query)
+        async for chunk in result.partitions():
+            yield chunk
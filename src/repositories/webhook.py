@@ -1,9 +1,49 @@
-from sqlalchemy import and_, select
+from collections.abc import AsyncIterator
+from datetime import UTC, date, datetime, timedelta
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.webhook import WebhookDelivery, WebhookSubscription
 from src.schemas.webhook import WebhookSubscriptionCreate, WebhookSubscriptionUpdate
 
+# Monthly partitions of webhook_deliveries: webhook_deliveries_pYYYYMM
+PARTITION_PREFIX = "webhook_deliveries_p"
+# Catches rows of months without a partition
+DEFAULT_PARTITION = "webhook_deliveries_default"
+
+# Host part of a subscription URL, same as urlsplit(url).netloc
+URL_HOST_PATTERN = "^[^:]+://([^/?#]+)"
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` months after `month` (negative goes back)"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def delivery_partition_ddl(month: date) -> str:
+    """CREATE TABLE of the monthly partition starting at `month` (UTC bounds)"""
+    lower = datetime(month.year, month.month, 1, tzinfo=UTC)
+    upper = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=UTC)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}{month:%Y%m} "
+        f"PARTITION OF webhook_deliveries "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    )
+
 
 class WebhookRepository:
     def __init__(self, session: AsyncSession):
@@ -53,31 +93,31 @@ class WebhookRepository:
         await self.session.flush()
         return True
 
-    async def get_active_subscriptions_for_event(
-        self, event_type: str
-    ) -> list[WebhookSubscription]:
-        """Get all active subscriptions that listen to a specific event"""
+    async def get_active_routes_for_event(self, event_type: str) -> list[Row]:
+        """(id, delivery_mode) of active subscriptions listening to an event (GIN index)"""
         result = await self.session.execute(
-            select(WebhookSubscription).where(
+            select(WebhookSubscription.id, WebhookSubscription.delivery_mode)
+            .where(
                 and_(
                     WebhookSubscription.is_active,
                     WebhookSubscription.events.contains([event_type]),
                 )
             )
+            .order_by(WebhookSubscription.id)
         )
-        return list(result.scalars().all())
+        return list(result.all())
 
     async def create_delivery(
         self,
         subscription_id: int,
         event_type: str,
-        payload: dict,
+        body: bytes,
         status: str = "pending",
     ) -> WebhookDelivery:
         delivery = WebhookDelivery(
             subscription_id=subscription_id,
             event_type=event_type,
-            payload=payload,
+            body=body,
             status=status,
         )
         self.session.add(delivery)
@@ -85,14 +125,22 @@ class WebhookRepository:
         await self.session.refresh(delivery)
         return delivery
 
-    async def get_failed_deliveries(self, limit: int = 100) -> list[WebhookDelivery]:
-        """Get failed deliveries for retry"""
+    async def create_deliveries(self, deliveries: list[dict]) -> list[Row]:
+        """
+        Insert many deliveries in one multi-row INSERT.
+
+        Each delivery: {"subscription_id", "event_type", "body", "status"}
+
+        Returns:
+            (id, status) of created deliveries
+        """
+        if not deliveries:
+            return []
         result = await self.session.execute(
-            select(WebhookDelivery)
-            .where(and_(WebhookDelivery.status == "failed", WebhookDelivery.attempts < 3))
-            .limit(limit)
+            insert(WebhookDelivery).returning(WebhookDelivery.id, WebhookDelivery.status),
+            deliveries,
         )
-        return list(result.scalars().all())
+        return list(result.all())
 
     async def update_delivery(
         self,
@@ -101,8 +149,9 @@ class WebhookRepository:
         response_status: int | None = None,
         response_body: str | None = None,
         error_message: str | None = None,
+        next_attempt_at: datetime | None = None,
     ) -> WebhookDelivery | None:
-        delivery = await self.session.get(WebhookDelivery, delivery_id)
+        delivery = await self.get_delivery(delivery_id)
         if not delivery:
             return None
 
@@ -114,23 +163,430 @@ class WebhookRepository:
             delivery.response_body = response_body
         if error_message:
             delivery.error_message = error_message
+        delivery.next_attempt_at = next_attempt_at
 
         if status == "success":
-            from datetime import datetime
-
             delivery.delivered_at = datetime.utcnow()
 
         await self.session.flush()
         await self.session.refresh(delivery)
         return delivery
 
-    async def get_deliveries_by_subscription(
-        self, subscription_id: int, limit: int = 100
-    ) -> list[WebhookDelivery]:
+    async def get_delivery(self, delivery_id: int) -> WebhookDelivery | None:
+        """Delivery by id (primary key also includes the created_at partition key)"""
+        result = await self.session.execute(
+            select(WebhookDelivery).where(WebhookDelivery.id == delivery_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_deliveries_page(
+        self,
+        subscription_id: int,
+        limit: int = 100,
+        before: tuple[datetime, int] | None = None,
+        status: str | None = None,
+        event_type: str | None = None,
+        include_payload: bool = False,
+    ) -> list:
+        """
+        Deliveries of a subscription, newest first, by keyset pagination.
+
+        Args:
+            before: (created_at, id) of the last row of the previous page
+            include_payload: Load full rows; otherwise only summary columns
+                are read (no request/response bodies)
+
+        Served by idx_webhook_delivery_subscription_created; older partitions
+        are pruned by the created_at bound of the cursor.
+        """
+        if include_payload:
+            query = select(WebhookDelivery)
+        else:
+            query = select(
+                WebhookDelivery.id,
+                WebhookDelivery.subscription_id,
+                WebhookDelivery.event_type,
+                WebhookDelivery.status,
+                WebhookDelivery.batch_delivery_id,
+                WebhookDelivery.attempts,
+                WebhookDelivery.response_status,
+                WebhookDelivery.error_message,
+                WebhookDelivery.next_attempt_at,
+                WebhookDelivery.created_at,
+                WebhookDelivery.delivered_at,
+            )
+
+        query = query.where(WebhookDelivery.subscription_id == subscription_id)
+        if before is not None:
+            query = query.where(
+                tuple_(WebhookDelivery.created_at, WebhookDelivery.id) < tuple_(*before)
+            )
+        if status:
+            query = query.where(WebhookDelivery.status == status)
+        if event_type:
+            query = query.where(WebhookDelivery.event_type == event_type)
+
+        query = query.order_by(WebhookDelivery.created_at.desc(), WebhookDelivery.id.desc()).limit(
+            limit
+        )
+        result = await self.session.execute(query)
+        if include_payload:
+            return list(result.scalars().all())
+        return list(result.all())
+
+    async def get_subscriptions_by_ids(
+        self, subscription_ids: list[int]
+    ) -> list[WebhookSubscription]:
+        result = await self.session.execute(
+            select(WebhookSubscription).where(WebhookSubscription.id.in_(subscription_ids))
+        )
+        return list(result.scalars().all())
+
+    async def claim_pending_deliveries(self, limit: int, claim_timeout: int) -> list[Row]:
+        """
+        Claim pending deliveries for sending.
+
+        Rows are locked with FOR UPDATE SKIP LOCKED, so concurrent dispatchers
+        never claim the same delivery. Rows stuck in "processing" longer than
+        claim_timeout seconds (crashed dispatcher) are claimed again.
+        """
+        claimable = (
+            select(WebhookDelivery.id)
+            .where(
+                or_(
+                    WebhookDelivery.status == "pending",
+                    and_(
+                        WebhookDelivery.status == "processing",
+                        WebhookDelivery.claimed_at < func.now() - timedelta(seconds=claim_timeout),
+                    ),
+                )
+            )
+            .order_by(WebhookDelivery.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
         result = await self.session.execute(
-            select(WebhookDelivery)
-            .where(WebhookDelivery.subscription_id == subscription_id)
-            .order_by(WebhookDelivery.created_at.desc())
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(claimable.scalar_subquery()))
+            .values(status="processing", claimed_at=func.now())
+            .returning(
+                WebhookDelivery.id,
+                WebhookDelivery.subscription_id,
+                WebhookDelivery.event_type,
+                WebhookDelivery.body,
+                WebhookDelivery.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.all())
+
+    async def release_due_retries(self, limit: int) -> list[int]:
+        """
+        Return failed deliveries whose next_attempt_at has passed to the queue.
+
+        Rows are locked with FOR UPDATE SKIP LOCKED, so several schedulers can
+        release concurrently without duplicates.
+
+        Returns:
+            IDs of released deliveries
+        """
+        due = (
+            select(WebhookDelivery.id)
+            .where(
+                and_(
+                    WebhookDelivery.status == "failed",
+                    WebhookDelivery.next_attempt_at <= func.now(),
+                )
+            )
+            .order_by(WebhookDelivery.next_attempt_at)
             .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+            .values(status="pending", next_attempt_at=None, claimed_at=None)
+            .returning(WebhookDelivery.id)
+            .execution_options(synchronize_session=False)
         )
         return list(result.scalars().all())
+
+    async def bulk_update_deliveries(self, results: list[dict]):
+        """
+        Write delivery results in one executemany round trip.
+
+        Each result: {"delivery_id", "status", "response_status",
+        "response_body", "error_message", "delivered_at", "next_attempt_at"}
+        """
+        if not results:
+            return
+
+        table = WebhookDelivery.__table__
+        await self.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("delivery_id"))
+            .values(
+                status=bindparam("status"),
+                attempts=table.c.attempts + 1,
+                response_status=bindparam("response_status"),
+                response_body=bindparam("response_body"),
+                error_message=bindparam("error_message"),
+                delivered_at=bindparam("delivered_at"),
+                next_attempt_at=bindparam("next_attempt_at"),
+                claimed_at=None,
+            ),
+            results,
+        )
+
+    async def get_due_buffers(self) -> list[Row]:
+        """
+        Subscriptions whose buffered events should be sent now.
+
+        A buffer is due when it holds max_events events or its oldest event
+        waited max_latency_ms.
+        """
+        buffered = (
+            select(
+                WebhookDelivery.subscription_id,
+                func.count().label("buffered"),
+                func.min(WebhookDelivery.created_at).label("oldest"),
+            )
+            .where(WebhookDelivery.status == "buffered")
+            .group_by(WebhookDelivery.subscription_id)
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(buffered.c.subscription_id, buffered.c.buffered, WebhookSubscription.max_events)
+            .join(WebhookSubscription, WebhookSubscription.id == buffered.c.subscription_id)
+            .where(
+                or_(
+                    buffered.c.buffered >= WebhookSubscription.max_events,
+                    buffered.c.oldest
+                    <= func.clock_timestamp()
+                    - WebhookSubscription.max_latency_ms
+                    * literal_column("interval '1 millisecond'"),
+                )
+            )
+        )
+        return list(result.all())
+
+    async def take_buffered_deliveries(self, subscription_id: int, limit: int) -> list[Row]:
+        """Lock the oldest buffered events of a subscription, skipping ones taken by others"""
+        result = await self.session.execute(
+            select(WebhookDelivery.id, WebhookDelivery.body)
+            .where(
+                and_(
+                    WebhookDelivery.subscription_id == subscription_id,
+                    WebhookDelivery.status == "buffered",
+                )
+            )
+            .order_by(WebhookDelivery.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.all())
+
+    async def coalesce_buffered_deliveries(self) -> list[int]:
+        """
+        Turn due buffers into batch deliveries.
+
+        Each batch delivery is a pending row whose body is the JSON array of
+        event bodies (at most max_events), joined without re-serializing.
+        Included events are marked "batched" and linked to it through
+        batch_delivery_id.
+
+        Returns:
+            IDs of created batch deliveries
+        """
+        batch_ids = []
+        for buffer in await self.get_due_buffers():
+            remaining = buffer.buffered
+            while remaining > 0:
+                events = await self.take_buffered_deliveries(
+                    buffer.subscription_id, buffer.max_events
+                )
+                if not events:
+                    break
+
+                batch = await self.create_delivery(
+                    subscription_id=buffer.subscription_id,
+                    event_type="batch",
+                    body=b"[" + b",".join(event.body for event in events) + b"]",
+                )
+                await self.session.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.id.in_([event.id for event in events]))
+                    .values(status="batched", batch_delivery_id=batch.id)
+                    .execution_options(synchronize_session=False)
+                )
+                batch_ids.append(batch.id)
+                remaining -= len(events)
+
+        return batch_ids
+
+    async def park_deliveries(self, delivery_ids: list[int]):
+        """Hold deliveries back while the circuit of their host is open"""
+        if not delivery_ids:
+            return
+
+        await self.session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(delivery_ids))
+            .values(status="parked", claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_hosts_with_deliveries(self, status: str) -> list[str]:
+        """Hosts of subscriptions that have deliveries in a status ("parked", "replaying")"""
+        subscription_ids = select(WebhookDelivery.subscription_id).where(
+            WebhookDelivery.status == status
+        )
+        result = await self.session.execute(
+            select(func.substring(WebhookSubscription.url, URL_HOST_PATTERN))
+            .where(WebhookSubscription.id.in_(subscription_ids))
+            .distinct()
+        )
+        return list(result.scalars().all())
+
+    async def release_host_deliveries(
+        self, host: str, status: str, limit: int | None = None
+    ) -> list[int]:
+        """
+        Return deliveries of a host held in `status` to the queue, oldest first.
+
+        Returns:
+            IDs of released deliveries
+        """
+        host_subscriptions = select(WebhookSubscription.id).where(
+            func.substring(WebhookSubscription.url, URL_HOST_PATTERN) == host
+        )
+        held = (
+            select(WebhookDelivery.id)
+            .where(
+                and_(
+                    WebhookDelivery.status == status,
+                    WebhookDelivery.subscription_id.in_(host_subscriptions),
+                )
+            )
+            .order_by(WebhookDelivery.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(held.scalar_subquery()))
+            .values(status="pending")
+            .returning(WebhookDelivery.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def replay_deliveries(
+        self,
+        statuses: list[str],
+        subscription_id: int | None = None,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> int:
+        """
+        Mark deliveries for replay with a fresh retry budget.
+
+        Replaying rows are released to the queue at a per-host rate
+        (see EndpointThrottle).
+
+        Returns:
+            Number of deliveries marked for replay
+        """
+        query = update(WebhookDelivery).where(WebhookDelivery.status.in_(statuses))
+        if subscription_id is not None:
+            query = query.where(WebhookDelivery.subscription_id == subscription_id)
+        if event_type:
+            query = query.where(WebhookDelivery.event_type == event_type)
+        if created_from is not None:
+            query = query.where(WebhookDelivery.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(WebhookDelivery.created_at < created_to)
+
+        result = await self.session.execute(
+            query.values(
+                status="replaying", attempts=0, next_attempt_at=None, claimed_at=None
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def list_delivery_partitions(self) -> list[date]:
+        """First days of months that have a webhook_deliveries partition"""
+        result = await self.session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'webhook_deliveries'::regclass"
+            )
+        )
+        months = []
+        for name in result.scalars().all():
+            suffix = name.removeprefix(PARTITION_PREFIX)
+            if name.startswith(PARTITION_PREFIX) and suffix.isdigit() and len(suffix) == 6:
+                months.append(date(int(suffix[:4]), int(suffix[4:]), 1))
+        return sorted(months)
+
+    async def create_delivery_partition(self, month: date):
+        """Create the monthly partition starting at `month` (UTC bounds)"""
+        await self.session.execute(text(delivery_partition_ddl(month)))
+
+    async def list_default_partition_months(self) -> list[date]:
+        """First days of months that have rows in the default partition"""
+        result = await self.session.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date "
+                f"FROM {DEFAULT_PARTITION} ORDER BY 1"
+            )
+        )
+        return list(result.scalars().all())
+
+    async def move_default_partition_rows(self, month: date) -> int:
+        """
+        Move rows of `month` from the default partition into a new monthly partition.
+
+        A partition cannot be created while the default partition holds rows of
+        its range, so the default partition is detached for the move. Inserts
+        into the table wait for the lock until the transaction commits.
+        """
+        lower = datetime(month.year, month.month, 1, tzinfo=UTC)
+        upper = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=UTC)
+        await self.session.execute(
+            text(f"ALTER TABLE webhook_deliveries DETACH PARTITION {DEFAULT_PARTITION}")
+        )
+        await self.session.execute(text(delivery_partition_ddl(month)))
+        # Partitions share the column order of the table, so rows move as they are
+        result = await self.session.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE created_at >= '{lower.isoformat()}' AND created_at < '{upper.isoformat()}' "
+                f"RETURNING *) "
+                f"INSERT INTO {PARTITION_PREFIX}{month:%Y%m} SELECT * FROM moved"
+            )
+        )
+        await self.session.execute(
+            text(f"ALTER TABLE webhook_deliveries ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        )
+        return result.rowcount
+
+    async def stream_delivery_partition(
+        self, month: date, chunk_size: int = 5000
+    ) -> AsyncIterator[list[dict]]:
+        """Stream all rows of a monthly partition in id order"""
+        result = await self.session.stream(
+            text(f"SELECT * FROM {PARTITION_PREFIX}{month:%Y%m} ORDER BY id").execution_options(
+                yield_per=chunk_size
+            )
+        )
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+    async def drop_delivery_partition(self, month: date):
+        """Detach and drop a monthly partition"""
+        name = f"{PARTITION_PREFIX}{month:%Y%m}"
+        await self.session.execute(text(f"ALTER TABLE webhook_deliveries DETACH PARTITION {name}"))
+        await self.session.execute(text(f"DROP TABLE {name}"))
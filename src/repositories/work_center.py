@@ -1,4 +1,5 @@
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.work_center import WorkCenter
@@ -8,6 +9,9 @@ class WorkCenterRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def get_by_id(self, work_center_id: int) -> WorkCenter | None:
+        return await self.session.get(WorkCenter, work_center_id)
+
     async def get_by_identifier(self, identifier: str) -> WorkCenter | None:
         result = await self.session.execute(
             select(WorkCenter).where(WorkCenter.identifier == identifier)
@@ -23,3 +27,34 @@ class WorkCenterRepository:
         self.session.add(work_center)
         await self.session.flush()
         return work_center
+
+    async def get_or_create_many(
+        self, names: dict[str, str], chunk_size: int = 5000
+    ) -> dict[str, int]:
+        """
+        Resolve work centers by identifier, creating missing ones with
+        INSERT ... ON CONFLICT DO NOTHING (one statement per chunk_size
+        identifiers, within the query parameter limit).
+
+        Args:
+            names: identifier -> name for new work centers
+
+        Returns:
+            identifier -> work center id
+        """
+        items = list(names.items())
+        work_centers: dict[str, int] = {}
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start : start + chunk_size]
+            await self.session.execute(
+                insert(WorkCenter)
+                .values([{"identifier": key, "name": name} for key, name in chunk])
+                .on_conflict_do_nothing(index_elements=["identifier"])
+            )
+            result = await self.session.execute(
+                select(WorkCenter.identifier, WorkCenter.id).where(
+                    WorkCenter.identifier.in_([key for key, _ in chunk])
+                )
+            )
+            work_centers.update(result.all())
+        return work_centers
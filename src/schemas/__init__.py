@@ -7,7 +7,10 @@ from src.schemas.batch import (
 )
 from src.schemas.product import ProductCreate, ProductResponse
 from src.schemas.webhook import (
+    WebhookDeliveryListResponse,
     WebhookDeliveryResponse,
+    WebhookDeliverySummary,
+    WebhookReplayRequest,
     WebhookSubscriptionCreate,
     WebhookSubscriptionResponse,
     WebhookSubscriptionUpdate,
@@ -28,4 +31,7 @@ __all__ = [
     "WebhookSubscriptionUpdate",
     "WebhookSubscriptionResponse",
     "WebhookDeliveryResponse",
+    "WebhookDeliverySummary",
+    "WebhookDeliveryListResponse",
+    "WebhookReplayRequest",
 ]
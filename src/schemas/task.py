@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+
+class TaskStatusRequest(BaseModel):
+    task_ids: list[str] = Field(..., min_length=1, max_length=1000)
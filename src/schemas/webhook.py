@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+DeliveryMode = Literal["single", "batch"]
 
 
 class WebhookSubscriptionCreate(BaseModel):
@@ -10,6 +12,9 @@ class WebhookSubscriptionCreate(BaseModel):
     secret_key: str
     retry_count: int = 3
     timeout: int = 10
+    delivery_mode: DeliveryMode = "single"
+    max_events: int = Field(100, ge=1, le=1000)
+    max_latency_ms: int = Field(1000, ge=100, le=60_000)
 
 
 class WebhookSubscriptionUpdate(BaseModel):
@@ -17,6 +22,9 @@ class WebhookSubscriptionUpdate(BaseModel):
     events: list[str] | None = None
     retry_count: int | None = None
     timeout: int | None = None
+    delivery_mode: DeliveryMode | None = None
+    max_events: int | None = Field(None, ge=1, le=1000)
+    max_latency_ms: int | None = Field(None, ge=100, le=60_000)
 
 
 class WebhookSubscriptionResponse(BaseModel):
@@ -26,6 +34,9 @@ class WebhookSubscriptionResponse(BaseModel):
     is_active: bool
     retry_count: int
     timeout: int
+    delivery_mode: str
+    max_events: int
+    max_latency_ms: int
     created_at: datetime
     updated_at: datetime
 
@@ -33,18 +44,43 @@ class WebhookSubscriptionResponse(BaseModel):
         from_attributes = True
 
 
-class WebhookDeliveryResponse(BaseModel):
+class WebhookDeliverySummary(BaseModel):
+    """Delivery without request and response bodies"""
+
     id: int
     subscription_id: int
     event_type: str
-    payload: dict[str, Any]
     status: str
+    batch_delivery_id: int | None = None
     attempts: int
     response_status: int | None = None
-    response_body: str | None = None
     error_message: str | None = None
+    next_attempt_at: datetime | None = None
     created_at: datetime
     delivered_at: datetime | None = None
 
     class Config:
         from_attributes = True
+
+
+class WebhookDeliveryResponse(WebhookDeliverySummary):
+    # Array of event payloads for batch deliveries
+    payload: dict[str, Any] | list[dict[str, Any]]
+    response_body: str | None = None
+
+
+class WebhookDeliveryListResponse(BaseModel):
+    items: list[WebhookDeliveryResponse] | list[WebhookDeliverySummary]
+    limit: int
+    # Pass as ?cursor= to get the next (older) page; None on the last page
+    next_cursor: str | None = None
+
+
+class WebhookReplayRequest(BaseModel):
+    subscription_id: int | None = None
+    event_type: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    statuses: list[Literal["dead", "failed"]] = Field(
+        default_factory=lambda: ["dead"], min_length=1
+    )
@@ -1,9 +1,28 @@
 from src.services.cache_service import CacheService
-from src.services.minio_service import MinIOService
+from src.services.forecast_service import ForecastService
+from src.services.progress_service import ProgressService
+from src.services.subscription_router import SubscriptionRouter
+from src.services.task_dedup_service import TaskDedupService
+from src.services.task_status_service import TaskStatusService
 from src.services.webhook_service import WebhookService
 
 __all__ = [
     "MinIOService",
     "CacheService",
+    "ForecastService",
+    "ProgressService",
+    "SubscriptionRouter",
+    "TaskDedupService",
+    "TaskStatusService",
     "WebhookService",
 ]
+
+
+def __getattr__(name):
+    # Importing minio_service creates the MinIO singleton, which connects to
+    # MinIO; it is imported on first access so other services load without it
+    if name == "MinIOService":
+        from src.services.minio_service import MinIOService
+
+        return MinIOService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
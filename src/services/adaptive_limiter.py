@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import deque
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit of one endpoint.
+
+    The limit grows by one slot per "limit" healthy responses and is halved
+    on errors or when latency exceeds `tolerance` times the healthy baseline
+    (an EWMA of latencies), at most once per baseline interval.
+
+    State is plain numbers plus futures of the running loop. A Celery worker
+    process runs all tasks on one loop (worker.get_loop), and the limiter
+    also keeps what it learned when a new loop is started (a forked process,
+    or task.apply() outside a worker).
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: int | None = None,
+        tolerance: float = 2.0,
+        smoothing: float = 0.1,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max(min_limit, max_limit // 4))
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+
+        self.inflight = 0
+        self.baseline: float | None = None
+        self._last_decrease = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted right before cancellation - give it back
+                self.inflight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, healthy: bool):
+        """Free a slot and adapt the limit to the observed response"""
+        self.inflight -= 1
+
+        if not healthy:
+            self._decrease()
+        elif self.baseline is None:
+            self.baseline = latency
+        elif latency > self.tolerance * self.baseline:
+            self._decrease()
+        else:
+            self.baseline += self.smoothing * (latency - self.baseline)
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        self._wake()
+
+    def _decrease(self):
+        now = time.monotonic()
+        # Responses of requests sent before the last decrease reflect the old limit
+        if now - self._last_decrease < (self.baseline or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
@@ -25,6 +25,10 @@ class CacheService:
             await self.redis_client.close()
             self.redis_client = None
 
+    def reset(self):
+        """Drop the client without closing (e.g. sockets inherited after fork)"""
+        self.redis_client = None
+
     async def get(self, key: str) -> Any | None:
         """Get value from cache"""
         if not self.redis_client:
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import redis.asyncio as redis
+
+from src.config import settings
+
+# Failure: count it, open after threshold (or re-open a failed probe).
+# Success: close and reset. Returns the state before the call.
+RECORD_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if ARGV[1] == '1' then
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        redis.call('DEL', KEYS[1], KEYS[2])
+    end
+    return state
+end
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+if state == 'open' or failures >= tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[3])
+    redis.call('DEL', KEYS[2])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return state
+"""
+
+
+def endpoint_host(url: str) -> str:
+    """Circuit key of a subscription URL (matches WebhookRepository host lookup)"""
+    return urlsplit(url).netloc
+
+
+def is_endpoint_failure(status_code: int | None) -> bool:
+    """Timeouts, connection errors, 5xx and 429 mean the endpoint is unhealthy"""
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker shared by all workers through Redis.
+
+    closed    - deliveries are sent, consecutive failures are counted
+    open      - after `failure_threshold` failures; deliveries are parked
+    half_open - `open_seconds` after opening; one probe delivery at a time
+                is let through, its result closes or re-opens the circuit
+    """
+
+    def __init__(self):
+        self.failure_threshold = settings.webhook_circuit_failure_threshold
+        self.open_seconds = settings.webhook_circuit_open_seconds
+        self.probe_timeout = settings.webhook_circuit_probe_timeout
+        self._client: redis.Redis | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._record_script = None
+
+    def get_client(self) -> redis.Redis:
+        """Redis client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = redis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+            self._client_loop = loop
+            self._record_script = self._client.register_script(RECORD_SCRIPT)
+        return self._client
+
+    @staticmethod
+    def _keys(host: str) -> tuple[str, str]:
+        return f"webhook:circuit:{host}", f"webhook:circuit:{host}:probe"
+
+    async def get_state(self, host: str) -> str:
+        """Current state: "closed", "open" or "half_open" """
+        circuit_key, _ = self._keys(host)
+        state, opened_at = await self.get_client().hmget(circuit_key, "state", "opened_at")
+        if state != "open":
+            return "closed"
+        if time.time() - float(opened_at) < self.open_seconds:
+            return "open"
+        return "half_open"
+
+    async def allow(self, host: str) -> bool:
+        """Whether a delivery to host may be sent now (fails open without Redis)"""
+        try:
+            state = await self.get_state(host)
+            if state == "closed":
+                return True
+            if state == "open":
+                return False
+
+            # Half-open: only the holder of the probe lock is let through
+            _, probe_key = self._keys(host)
+            return bool(await self.get_client().set(probe_key, "1", nx=True, ex=self.probe_timeout))
+        except redis.RedisError:
+            return True
+
+    async def record(self, host: str, healthy: bool) -> bool:
+        """
+        Record a delivery result.
+
+        Returns:
+            True if this result closed an open circuit
+            (parked deliveries of the host can be released)
+        """
+        try:
+            self.get_client()
+            previous = await self._record_script(
+                keys=list(self._keys(host)),
+                args=[
+                    "1" if healthy else "0",
+                    self.failure_threshold,
+                    time.time(),
+                    # Forget hosts that stopped failing long ago
+                    max(self.open_seconds * 10, 3600),
+                ],
+            )
+        except redis.RedisError:
+            return False
+        return healthy and previous == "open"
+
+
+# Singleton instance
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import redis.asyncio as redis
+
+from src.config import settings
+
+# Fixed one-second window shared by all processes: grant up to the rest of the
+# window budget, return the number of granted slots
+ACQUIRE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local granted = math.min(tonumber(ARGV[1]), tonumber(ARGV[2]) - used)
+if granted <= 0 then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('EXPIRE', KEYS[1], 2)
+return granted
+"""
+
+
+class EndpointThrottle:
+    """Per-host rate limit of replayed deliveries shared by all workers through Redis"""
+
+    def __init__(self, rate_per_second: int | None = None):
+        self.rate_per_second = rate_per_second or settings.webhook_replay_rate_per_host
+        self._client: redis.Redis | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._acquire_script = None
+
+    def get_client(self) -> redis.Redis:
+        """Redis client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = redis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+            self._client_loop = loop
+            self._acquire_script = self._client.register_script(ACQUIRE_SCRIPT)
+        return self._client
+
+    async def acquire(self, host: str, requested: int | None = None) -> int:
+        """
+        Take up to `requested` slots of the current second for host.
+
+        Returns:
+            Number of deliveries that may be released now
+        """
+        self.get_client()
+        window = int(time.time())
+        return int(
+            await self._acquire_script(
+                keys=[f"webhook:replay:{host}:{window}"],
+                args=[requested or self.rate_per_second, self.rate_per_second],
+            )
+        )
+
+
+# Singleton instance
+endpoint_throttle = EndpointThrottle()
@@ -0,0 +1,148 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.repositories.product import ProductRepository
+from src.services.cache_service import cache_service
+
+# z-score for 95% confidence interval
+Z_95 = 1.96
+
+
+def compute_throughput(
+    timestamps: np.ndarray,
+    window_seconds: int = 900,
+    lookback_windows: int = 8,
+    break_gap_seconds: int = 600,
+) -> dict[str, Any]:
+    """
+    Throughput statistics from sorted aggregation timestamps (epoch seconds).
+
+    Timestamps are bucketed into fixed windows. Pace is measured over the last
+    `lookback_windows` windows that had any output, so breaks and the ramp-up
+    at the start of the shift do not drag the current pace down.
+
+    Returns:
+        {
+            "samples": 1000,
+            "pace_per_hour": 120.0,
+            "pace_std_per_hour": 8.5,
+            "pace_low_per_hour": 114.1,
+            "pace_high_per_hour": 125.9,
+            "active_hours": 7.5,
+            "break_hours": 0.5,
+            "last_aggregated_at": 1706630400.0,
+            "rolling_throughput": [{"window_start": ..., "per_hour": ...}, ...]
+        }
+    """
+    samples = int(timestamps.size)
+    if samples < 2:
+        return {
+            "samples": samples,
+            "pace_per_hour": 0.0,
+            "pace_std_per_hour": 0.0,
+            "pace_low_per_hour": 0.0,
+            "pace_high_per_hour": 0.0,
+            "active_hours": 0.0,
+            "break_hours": 0.0,
+            "last_aggregated_at": float(timestamps[-1]) if samples else None,
+            "rolling_throughput": [],
+        }
+
+    start = timestamps[0]
+    end = timestamps[-1]
+
+    # Breaks: gaps between consecutive aggregations longer than threshold
+    gaps = np.diff(timestamps)
+    break_seconds = float(gaps[gaps > break_gap_seconds].sum())
+    active_seconds = float(end - start) - break_seconds
+
+    # Output per window
+    window_index = ((timestamps - start) // window_seconds).astype(np.int64)
+    counts = np.bincount(window_index)
+    rates = counts * (3600.0 / window_seconds)
+
+    # Last window is usually incomplete - exclude it while there is enough history
+    complete_rates = rates[:-1] if rates.size > 2 else rates
+    active_rates = complete_rates[complete_rates > 0]
+    recent = active_rates[-lookback_windows:]
+
+    pace = float(recent.mean())
+    std = float(recent.std(ddof=1)) if recent.size > 1 else 0.0
+    margin = Z_95 * std / np.sqrt(recent.size)
+
+    # Rolling throughput over lookback windows (cumsum trick instead of per-window loop)
+    k = min(lookback_windows, counts.size)
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+    rolling = (cumulative[k:] - cumulative[:-k]) * (3600.0 / (k * window_seconds))
+    rolling_starts = start + np.arange(rolling.size) * window_seconds
+    tail = slice(-48, None)
+
+    return {
+        "samples": samples,
+        "pace_per_hour": pace,
+        "pace_std_per_hour": std,
+        "pace_low_per_hour": max(pace - margin, 0.0),
+        "pace_high_per_hour": pace + margin,
+        "active_hours": active_seconds / 3600,
+        "break_hours": break_seconds / 3600,
+        "last_aggregated_at": float(end),
+        "rolling_throughput": [
+            {"window_start": float(ws), "per_hour": float(rate)}
+            for ws, rate in zip(rolling_starts[tail], rolling[tail], strict=True)
+        ],
+    }
+
+
+def estimate_completion(throughput: dict[str, Any], remaining: int, now: datetime) -> dict:
+    """ETA with 95% confidence interval from throughput statistics"""
+
+    def _eta(per_hour: float) -> str | None:
+        if remaining <= 0 or per_hour <= 0:
+            return None
+        return (now + timedelta(hours=remaining / per_hour)).isoformat()
+
+    return {
+        "estimated_completion": _eta(throughput["pace_per_hour"]),
+        # Higher pace finishes earlier
+        "earliest_completion": _eta(throughput["pace_high_per_hour"]),
+        "latest_completion": _eta(throughput["pace_low_per_hour"]),
+    }
+
+
+class ForecastService:
+    """Прогноз завершения партии по меткам времени аггрегации"""
+
+    def __init__(self, cache_ttl: int = 3600):
+        self.cache_ttl = cache_ttl
+
+    async def get_batch_forecast(
+        self, session: AsyncSession, batch_id: int, remaining: int, now: datetime | None = None
+    ) -> dict[str, Any]:
+        """
+        Forecast batch completion.
+
+        Throughput statistics are cached per batch version (aggregated count
+        and last aggregation time), so they are only recomputed after new
+        products are aggregated.
+        """
+        now = now or datetime.now(UTC)
+        product_repo = ProductRepository(session)
+
+        aggregated, last_aggregated_at = await product_repo.get_aggregation_version(batch_id)
+        version = f"{aggregated}:{last_aggregated_at.timestamp() if last_aggregated_at else 0}"
+        cache_key = f"batch_forecast:{batch_id}:{version}"
+
+        throughput = await cache_service.get(cache_key)
+        if throughput is None:
+            timestamps = await product_repo.get_aggregation_timestamps(batch_id)
+            throughput = compute_throughput(timestamps)
+            await cache_service.set(cache_key, throughput, ttl=self.cache_ttl)
+
+        return {**throughput, **estimate_completion(throughput, remaining, now)}
+
+
+# Singleton instance
+forecast_service = ForecastService()
@@ -1,11 +1,32 @@
 import os
-from datetime import timedelta
+from collections.abc import Iterable, Iterator
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
 
 from minio import Minio
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 
 from src.config import settings
 
+# remove_objects sends at most this many keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+
+def dated_object_name(object_name: str, day: date | None = None) -> str:
+    """Object key under a YYYY/MM/DD/ prefix (upload day by default)"""
+    day = day or datetime.now(UTC).date()
+    return f"{day:%Y/%m/%d}/{object_name}"
+
+
+def _date_part(prefix: str, depth: int) -> int | None:
+    """Year, month or day of a YYYY/, MM/ or DD/ listing prefix, None if not a date part"""
+    part = prefix.rstrip("/").rsplit("/", 1)[-1]
+    if len(part) != (4 if depth == 0 else 2) or not part.isdigit():
+        return None
+    return int(part)
+
 
 class MinIOService:
     def __init__(self):
@@ -124,8 +145,10 @@ class MinIOService:
         except S3Error as e:
             raise Exception(f"Failed to download file from MinIO: {e}") from e
 
-    def download_bytes(self, bucket: str, object_name: str) -> bytes:
-        """Download file as bytes from MinIO"""
+    def download_bytes(
+        self, bucket: str, object_name: str, missing_ok: bool = False
+    ) -> bytes | None:
+        """Download file as bytes from MinIO; None for a missing object if missing_ok"""
         try:
             response = self.client.get_object(bucket, object_name)
             data = response.read()
@@ -133,6 +156,8 @@ class MinIOService:
             response.release_conn()
             return data
         except S3Error as e:
+            if missing_ok and e.code == "NoSuchKey":
+                return None
             raise Exception(f"Failed to download bytes from MinIO: {e}") from e
 
     def delete_file(self, bucket: str, object_name: str):
@@ -144,12 +169,87 @@ class MinIOService:
 
     def list_files(self, bucket: str, prefix: str | None = None):
         """List files in bucket"""
+        return list(self.iter_files(bucket, prefix))
+
+    def iter_files(
+        self, bucket: str, prefix: str | None = None, recursive: bool = True
+    ) -> Iterator[Object]:
+        """
+        Stream a bucket listing page by page instead of loading it whole.
+
+        Non-recursive listings also yield "directories" (is_dir) for the
+        next level of prefixes.
+        """
         try:
-            objects = self.client.list_objects(bucket_name=bucket, prefix=prefix, recursive=True)
-            return list(objects)
+            yield from self.client.list_objects(
+                bucket_name=bucket, prefix=prefix, recursive=recursive
+            )
         except S3Error as e:
             raise Exception(f"Failed to list files from MinIO: {e}") from e
 
+    def delete_files(self, bucket: str, object_names: Iterable[str]) -> int:
+        """
+        Delete objects with one DeleteObjects request per DELETE_BATCH_SIZE keys.
+
+        object_names is consumed lazily, so a streamed listing is never held
+        in memory. Returns the number of deleted objects; keys MinIO refused
+        to delete are reported and skipped.
+        """
+        names = iter(object_names)
+        deleted = 0
+        try:
+            while batch := list(islice(names, DELETE_BATCH_SIZE)):
+                # remove_objects is lazy: errors come back only while iterating
+                failed = 0
+                for error in self.client.remove_objects(
+                    bucket, [DeleteObject(name) for name in batch]
+                ):
+                    failed += 1
+                    print(f"❌ Error deleting {bucket}/{error.name}: {error.message}")
+                deleted += len(batch) - failed
+        except S3Error as e:
+            raise Exception(f"Failed to delete files from MinIO: {e}") from e
+        return deleted
+
+    def iter_expired_files(self, bucket: str, cutoff: datetime) -> Iterator[str]:
+        """
+        Names of objects in bucket last modified before cutoff (aware UTC).
+
+        Keys under YYYY/MM/DD/ prefixes (see dated_object_name) are decided
+        per day: days before the cutoff day are listed only to be deleted,
+        later days are not listed at all. Other keys are checked one by one.
+        """
+        cutoff_day = (cutoff.year, cutoff.month, cutoff.day)
+
+        def older(files: Iterable[Object]) -> Iterator[str]:
+            for file in files:
+                if file.last_modified and file.last_modified < cutoff:
+                    yield file.object_name
+
+        def walk(prefix: str | None, parts: tuple[int, ...]) -> Iterator[str]:
+            for obj in self.iter_files(bucket, prefix, recursive=False):
+                if not obj.is_dir:
+                    yield from older([obj])
+                    continue
+
+                part = _date_part(obj.object_name, len(parts))
+                if part is None:
+                    yield from older(self.iter_files(bucket, obj.object_name))
+                    continue
+
+                key = (*parts, part)
+                if key < cutoff_day[: len(key)]:
+                    # The whole year, month or day is past retention
+                    yield from (
+                        file.object_name for file in self.iter_files(bucket, obj.object_name)
+                    )
+                elif key == cutoff_day:
+                    yield from older(self.iter_files(bucket, obj.object_name))
+                elif key == cutoff_day[: len(key)]:
+                    yield from walk(obj.object_name, key)
+
+        yield from walk(None, ())
+
     def _get_content_type(self, file_path: str) -> str:
         """Determine Content-Type from file path"""
         return self._get_content_type_by_extension(file_path)
@@ -164,6 +264,8 @@ class MinIOService:
             ".csv": "text/csv",
             ".pdf": "application/pdf",
             ".json": "application/json",
+            ".parquet": "application/vnd.apache.parquet",
+            ".gz": "application/gzip",
         }
 
         return content_types.get(ext, "application/octet-stream")
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from typing import Any
+
+import redis.asyncio as redis
+from fastapi.responses import StreamingResponse
+from redis.asyncio.client import PubSub
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(data: Any, event: str | None = None) -> str:
+    """Format a Server-Sent Events message"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, default=str)}\n\n"
+    return message
+
+
+def sse_response(generator) -> StreamingResponse:
+    """Streaming response of SSE messages, not buffered by proxies"""
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class ProgressService:
+    """Публикация событий прогресса через Redis pub/sub"""
+
+    def __init__(self):
+        self.redis_client: redis.Redis | None = None
+
+    async def connect(self):
+        """Connect to Redis"""
+        if self.redis_client is None:
+            self.redis_client = await redis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+
+    async def disconnect(self):
+        """Disconnect from Redis"""
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    def reset(self):
+        """Drop the client without closing (e.g. sockets inherited after fork)"""
+        self.redis_client = None
+
+    @staticmethod
+    def batch_channel(batch_id: int) -> str:
+        return f"progress:batch:{batch_id}"
+
+    @staticmethod
+    def work_center_channel(work_center_id: int) -> str:
+        return f"progress:work_center:{work_center_id}"
+
+    async def publish(self, channel: str, message: dict[str, Any]):
+        """Publish message to channel"""
+        if not self.redis_client:
+            await self.connect()
+
+        await self.redis_client.publish(channel, json.dumps(message, default=str))
+
+    async def publish_batch_progress(
+        self,
+        batch_id: int,
+        work_center_id: int,
+        event: str,
+        stats: dict[str, Any],
+        aggregated_delta: int = 0,
+        is_closed: bool = False,
+    ):
+        """
+        Publish batch progress delta to batch and work center channels.
+
+        Best effort: the change is already committed, so Redis errors are
+        logged instead of failing the caller.
+
+        Args:
+            batch_id: ID партии
+            work_center_id: ID рабочего центра партии
+            event: "aggregated" или "closed"
+            stats: Результат ProductRepository.get_statistics
+            aggregated_delta: Сколько продукции аггрегировано этим изменением
+            is_closed: Статус закрытия партии
+        """
+        message = {
+            "event": event,
+            "batch_id": batch_id,
+            "work_center_id": work_center_id,
+            "aggregated_delta": aggregated_delta,
+            "is_closed": is_closed,
+            **stats,
+            "timestamp": datetime.now(UTC).isoformat(),
+        }
+
+        try:
+            await self.publish(self.batch_channel(batch_id), message)
+            await self.publish(self.work_center_channel(work_center_id), message)
+        except Exception as e:
+            logger.warning("Batch %s progress not published: %s", batch_id, e)
+
+    @asynccontextmanager
+    async def subscription(self, channel: str) -> AsyncIterator[PubSub]:
+        """
+        Subscribe to channel for the duration of the block.
+
+        Messages published after entering are not lost, so a snapshot read
+        inside the block cannot miss a concurrent change.
+        """
+        if not self.redis_client:
+            await self.connect()
+
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            yield pubsub
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    @staticmethod
+    async def next_message(pubsub: PubSub, timeout: float) -> dict | None:
+        """Next decoded message, None if nothing arrives within timeout seconds"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is None:
+                continue
+            try:
+                return json.loads(message["data"])
+            except json.JSONDecodeError:
+                continue
+        return None
+
+    async def listen(self, channel: str, timeout: float = 15.0) -> AsyncIterator[dict | None]:
+        """
+        Subscribe to channel and yield messages.
+
+        Yields None every `timeout` seconds without messages,
+        so callers can send heartbeats and check for disconnects.
+        """
+        async with self.subscription(channel) as pubsub:
+            while True:
+                yield await self.next_message(pubsub, timeout)
+
+
+# Singleton instance
+progress_service = ProgressService()
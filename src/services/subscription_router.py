@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple
+
+import redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.repositories.webhook import WebhookRepository
+from src.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+
+class Route(NamedTuple):
+    subscription_id: int
+    delivery_mode: str
+
+
+class SubscriptionRouter:
+    """
+    Per-process routing table: event type -> active subscriptions.
+
+    Routes are loaded lazily per event type and kept until a subscription is
+    created, updated or deleted. Changes are broadcast on a Redis channel; every
+    process listens on a daemon thread (sync client, so it works regardless of
+    which event loop the caller runs) and drops its table on each message.
+    """
+
+    CHANNEL = "webhooks:subscriptions:changed"
+
+    def __init__(self, ttl: int | None = None):
+        self.ttl = ttl if ttl is not None else settings.webhook_routing_ttl
+        self._routes: dict[str, tuple[float, tuple[Route, ...]]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid: int | None = None
+
+    async def get_routes(self, session: AsyncSession, event_type: str) -> tuple[Route, ...]:
+        """Active subscriptions of an event; queries PostgreSQL only on a cold route"""
+        self._ensure_listener()
+
+        cached = self._routes.get(event_type)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        generation = self._generation
+        routes = tuple(
+            Route(*row)
+            for row in await WebhookRepository(session).get_active_routes_for_event(event_type)
+        )
+
+        # Do not store a route loaded before an invalidation arrived
+        with self._lock:
+            if generation == self._generation:
+                self._routes[event_type] = (time.monotonic(), routes)
+
+        return routes
+
+    def invalidate(self):
+        """Drop the routing table of this process"""
+        with self._lock:
+            self._generation += 1
+            self._routes = {}
+
+    async def notify_changed(self):
+        """
+        Invalidate routes in all processes.
+
+        Call after the subscription change is committed.
+        """
+        self.invalidate()
+        try:
+            if not cache_service.redis_client:
+                await cache_service.connect()
+            await cache_service.redis_client.publish(self.CHANNEL, "1")
+        except redis.RedisError as e:
+            logger.warning("Subscription change not broadcast, relying on TTL: %s", e)
+
+    def _ensure_listener(self):
+        """Start the invalidation listener once per process (also after fork)"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            # Routes inherited from the parent process may already be stale
+            self._generation += 1
+            self._routes = {}
+
+            try:
+                client = redis.Redis.from_url(settings.redis_url)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: lambda message: self.invalidate()})
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1.0,
+                    daemon=True,
+                    exception_handler=self._on_listener_error,
+                )
+            except redis.RedisError as e:
+                self._listener = None
+                logger.warning("Subscription invalidation listener not started: %s", e)
+
+    def _on_listener_error(self, exc: Exception, pubsub, thread):
+        """Keep the listener alive; messages may be lost, so drop routes"""
+        logger.warning("Subscription invalidation listener error: %s", exc)
+        self.invalidate()
+        time.sleep(1.0)
+
+    def stop(self):
+        """Stop the invalidation listener"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self._listener_pid = None
+
+
+# Singleton instance
+subscription_router = SubscriptionRouter()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+import redis
+import redis.asyncio as aioredis
+from celery import Task
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if it still belongs to the finished task
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TaskDedupService:
+    """
+    Idempotent task submission.
+
+    A submission takes a Redis lock (SET NX EX) holding the new task id. The
+    lock key is the task name plus canonical JSON of its arguments, or the
+    client Idempotency-Key. A duplicate submission gets the task id from the
+    lock instead of enqueuing the same work again.
+
+    Argument locks are released by the worker when the task finishes (tasks
+    declared with deduplicate=True), so the same job can be started again
+    afterwards. Idempotency-Key locks are kept for task_idempotency_ttl.
+    """
+
+    def __init__(self):
+        self.redis_client: aioredis.Redis | None = None
+        self._sync_client: redis.Redis | None = None
+        self._release_script = None
+
+    async def connect(self):
+        """Connect to Redis"""
+        if self.redis_client is None:
+            self.redis_client = aioredis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+
+    async def disconnect(self):
+        """Disconnect from Redis"""
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    @staticmethod
+    def lock_key(task_name: str, args: Sequence[Any], idempotency_key: str | None = None) -> str:
+        """Lock key of a submission; args must already be normalized by the caller"""
+        if idempotency_key:
+            digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+            return f"task:dedup:{task_name}:key:{digest}"
+
+        canonical = json.dumps(list(args), sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(canonical.encode()).hexdigest()
+        return f"task:dedup:{task_name}:args:{digest}"
+
+    async def submit(
+        self, task: Task, args: Sequence[Any], idempotency_key: str | None = None
+    ) -> tuple[str, bool]:
+        """
+        Enqueue task unless an identical one is already submitted.
+
+        Returns:
+            (task_id, duplicate) - duplicate is True when an existing task id
+            is returned and nothing was enqueued
+        """
+        key = self.lock_key(task.name, args, idempotency_key)
+        ttl = settings.task_idempotency_ttl if idempotency_key else settings.task_dedup_ttl
+        task_id = str(uuid.uuid4())
+
+        try:
+            if not self.redis_client:
+                await self.connect()
+            # The lock may expire between SET and GET, then try to take it again
+            for _ in range(3):
+                if await self.redis_client.set(key, task_id, nx=True, ex=ttl):
+                    break
+                existing = await self.redis_client.get(key)
+                if existing:
+                    return existing, True
+            else:
+                raise redis.RedisError(f"Lock {key} is neither free nor held")
+        except redis.RedisError as e:
+            # Without Redis duplicates are possible, losing submissions is worse
+            logger.warning("Task %s submitted without deduplication: %s", task.name, e)
+            return task.apply_async(args=list(args)).id, False
+
+        try:
+            task.apply_async(args=list(args), task_id=task_id)
+        except Exception:
+            await self.redis_client.delete(key)
+            raise
+        return task_id, False
+
+    def release(self, task_name: str, args: Sequence[Any], task_id: str):
+        """Release the argument lock of a finished task (sync, called by the worker)"""
+        try:
+            if self._sync_client is None:
+                self._sync_client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+                self._release_script = self._sync_client.register_script(RELEASE_SCRIPT)
+            self._release_script(keys=[self.lock_key(task_name, args)], args=[task_id])
+        except redis.RedisError as e:
+            logger.warning("Task %s lock not released, expires by TTL: %s", task_id, e)
+
+    def reset(self):
+        """Drop clients without closing (e.g. sockets inherited after fork)"""
+        self.redis_client = None
+        self._sync_client = None
+        self._release_script = None
+
+
+# Singleton instance
+task_dedup_service = TaskDedupService()
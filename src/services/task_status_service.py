@@ -0,0 +1,101 @@
+import json
+import logging
+from typing import Any
+
+import redis
+import redis.asyncio as aioredis
+
+from src.celery_app import celery_app
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# States after which a task never changes again
+TERMINAL_STATES = frozenset({"SUCCESS", "FAILURE", "REVOKED"})
+
+
+def task_status(task_id: str, state: str, info: Any = None) -> dict[str, Any]:
+    """Task status as returned by the task API and published to the task channel"""
+    if state in ("PENDING", "STARTED", "RETRY"):
+        result = None
+    elif state in ("FAILURE", "REVOKED"):
+        result = {"error": str(info)}
+    else:
+        result = info
+    return {"task_id": task_id, "status": state, "result": result}
+
+
+class TaskStatusService:
+    """
+    Celery task status without blocking the event loop.
+
+    Statuses are read straight from the Redis result backend (one pipeline
+    for any number of tasks). Workers publish every state change to
+    progress:task:{task_id}, so clients can wait for changes instead of polling.
+    """
+
+    def __init__(self):
+        self.redis_client: aioredis.Redis | None = None
+        self._publisher: redis.Redis | None = None
+
+    @staticmethod
+    def task_channel(task_id: str) -> str:
+        return f"progress:task:{task_id}"
+
+    async def connect(self):
+        """Connect to the result backend"""
+        if self.redis_client is None:
+            self.redis_client = aioredis.from_url(settings.celery_result_backend)
+
+    async def disconnect(self):
+        """Disconnect from the result backend"""
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    async def get_statuses(self, task_ids: list[str]) -> list[dict[str, Any]]:
+        """Statuses of tasks in request order, unknown tasks are PENDING"""
+        if not self.redis_client:
+            await self.connect()
+
+        backend = celery_app.backend
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                pipe.get(backend.get_key_for_task(task_id))
+            payloads = await pipe.execute()
+
+        statuses = []
+        for task_id, payload in zip(task_ids, payloads, strict=True):
+            if payload is None:
+                statuses.append(task_status(task_id, "PENDING"))
+                continue
+            meta = backend.decode_result(payload)
+            statuses.append(task_status(task_id, meta["status"], meta.get("result")))
+        return statuses
+
+    async def get_status(self, task_id: str) -> dict[str, Any]:
+        return (await self.get_statuses([task_id]))[0]
+
+    def publish(self, task_id: str, state: str, info: Any = None):
+        """
+        Publish a state change from a worker (sync, works inside running tasks).
+        Best effort: status stays available from the result backend.
+        """
+        try:
+            if self._publisher is None:
+                self._publisher = redis.Redis.from_url(settings.redis_url)
+            self._publisher.publish(
+                self.task_channel(task_id),
+                json.dumps(task_status(task_id, state, info), default=str),
+            )
+        except redis.RedisError as e:
+            logger.warning("Task %s state %s not published: %s", task_id, state, e)
+
+    def reset(self):
+        """Drop clients without closing (e.g. sockets inherited after fork)"""
+        self.redis_client = None
+        self._publisher = None
+
+
+# Singleton instance
+task_status_service = TaskStatusService()
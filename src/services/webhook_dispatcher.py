@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.repositories.webhook import WebhookRepository
+from src.services.circuit_breaker import circuit_breaker, endpoint_host, is_endpoint_failure
+from src.services.endpoint_throttle import endpoint_throttle
+from src.services.webhook_service import webhook_service
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """
+    Sends pending webhook deliveries concurrently from one event loop.
+
+    Pending rows are claimed in batches with FOR UPDATE SKIP LOCKED (several
+    dispatchers can run side by side), sent under a semaphore through the
+    pooled WebhookService client, and results are written back in bulk.
+    """
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        poll_interval: float | None = None,
+    ):
+        self.batch_size = batch_size or settings.webhook_dispatcher_batch_size
+        self.concurrency = concurrency or settings.webhook_dispatcher_concurrency
+        self.poll_interval = poll_interval or settings.webhook_dispatcher_poll_interval
+        self.max_backoff = settings.webhook_dispatcher_max_backoff
+
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._inflight: set[asyncio.Task] = set()
+        self._results: list[dict] = []
+        self._parked: list[int] = []
+        self._recovered_hosts: set[str] = set()
+        self._stopping = False
+        self._next_schedule = 0.0
+
+    def stop(self):
+        """Stop claiming new deliveries, finish in-flight ones"""
+        self._stopping = True
+
+    async def run(self):
+        logger.info(
+            "Webhook dispatcher started (batch_size=%s, concurrency=%s)",
+            self.batch_size,
+            self.concurrency,
+        )
+        errors = 0
+        try:
+            while not self._stopping:
+                try:
+                    await self._iterate()
+                    errors = 0
+                except Exception:
+                    # Database or Redis unavailable: keep running, in-flight
+                    # deliveries continue and their results stay buffered
+                    errors += 1
+                    backoff = self._backoff(errors)
+                    logger.exception(
+                        "Webhook dispatcher iteration failed (%s in a row), retrying in %.1fs",
+                        errors,
+                        backoff,
+                    )
+                    await asyncio.sleep(backoff)
+
+            if self._inflight:
+                await asyncio.wait(self._inflight)
+            await self._flush_pending_results()
+        finally:
+            await webhook_service.close()
+            logger.info("Webhook dispatcher stopped")
+
+    async def _iterate(self):
+        """Schedule, claim, write back results, then wait for progress"""
+        await self._schedule()
+
+        claimed = 0
+        if len(self._inflight) < self.concurrency:
+            claimed = await self._claim()
+
+        await self._flush_results()
+
+        if self._inflight:
+            # Wake up as soon as some delivery finishes
+            await asyncio.wait(
+                self._inflight,
+                timeout=self.poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        elif not claimed:
+            await asyncio.sleep(self.poll_interval)
+
+    def _backoff(self, errors: int) -> float:
+        return min(self.poll_interval * 2**errors, self.max_backoff)
+
+    async def _flush_pending_results(self, attempts: int = 5):
+        """Write results left at shutdown, retrying while the database is unavailable"""
+        for attempt in range(1, attempts + 1):
+            try:
+                await self._flush_results()
+                return
+            except Exception:
+                if attempt == attempts:
+                    # Unwritten deliveries are claimed again after claim_timeout
+                    logger.exception(
+                        "Webhook dispatcher dropped %s results at shutdown", len(self._results)
+                    )
+                    return
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def _schedule(self):
+        """
+        Make deliveries pending: coalesce due buffers of batch mode
+        subscriptions, release failed deliveries due for retry and
+        replayed deliveries within the per-host replay rate.
+        """
+        # The loop wakes on every finished delivery, schedule once per poll
+        now = time.monotonic()
+        if now < self._next_schedule:
+            return
+        self._next_schedule = now + self.poll_interval
+
+        async with AsyncSessionLocal() as session:
+            webhook_repo = WebhookRepository(session)
+            await webhook_repo.coalesce_buffered_deliveries()
+            await webhook_repo.release_due_retries(limit=settings.webhook_retry_batch_size)
+            for host in await webhook_repo.get_hosts_with_deliveries("replaying"):
+                granted = await endpoint_throttle.acquire(host)
+                if granted:
+                    await webhook_repo.release_host_deliveries(host, "replaying", limit=granted)
+            await session.commit()
+
+    async def _claim(self) -> int:
+        """Claim a batch of pending deliveries and start sending them"""
+        async with AsyncSessionLocal() as session:
+            webhook_repo = WebhookRepository(session)
+            deliveries = await webhook_repo.claim_pending_deliveries(
+                limit=self.batch_size,
+                claim_timeout=settings.webhook_dispatcher_claim_timeout,
+            )
+            if not deliveries:
+                await session.commit()
+                return 0
+
+            subscriptions = await webhook_repo.get_subscriptions_by_ids(
+                list({delivery.subscription_id for delivery in deliveries})
+            )
+            await session.commit()
+
+        subscriptions_by_id = {subscription.id: subscription for subscription in subscriptions}
+        for delivery in deliveries:
+            task = asyncio.create_task(
+                self._deliver(delivery, subscriptions_by_id.get(delivery.subscription_id))
+            )
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+        return len(deliveries)
+
+    async def _deliver(self, delivery, subscription):
+        """Send one delivery and buffer its result"""
+        if subscription is None or not subscription.is_active:
+            self._results.append(
+                self._result(delivery.id, False, None, None, "Subscription is inactive", None)
+            )
+            return
+
+        host = endpoint_host(subscription.url)
+        if not await circuit_breaker.allow(host):
+            self._parked.append(delivery.id)
+            return
+
+        async with self._semaphore:
+            success, status_code, response_body, error_message = await webhook_service.send_webhook(
+                url=subscription.url,
+                body=delivery.body,
+                secret_key=subscription.secret_key,
+                timeout=subscription.timeout,
+            )
+
+        # record() is true when this response closed the circuit of the host
+        if await circuit_breaker.record(host, healthy=not is_endpoint_failure(status_code)):
+            self._recovered_hosts.add(host)
+
+        next_attempt_at = None
+        if not success:
+            next_attempt_at = webhook_service.next_attempt_at(
+                delivery.attempts + 1, subscription.retry_count
+            )
+
+        self._results.append(
+            self._result(
+                delivery.id, success, status_code, response_body, error_message, next_attempt_at
+            )
+        )
+
+    @staticmethod
+    def _result(
+        delivery_id: int,
+        success: bool,
+        status_code: int | None,
+        response_body: str | None,
+        error_message: str | None,
+        next_attempt_at: datetime | None,
+    ) -> dict:
+        return {
+            "delivery_id": delivery_id,
+            # Failed without next attempt - retries exhausted, dead letter
+            "status": "success" if success else ("failed" if next_attempt_at else "dead"),
+            "response_status": status_code,
+            "response_body": response_body,
+            "error_message": error_message,
+            "delivered_at": datetime.now(UTC) if success else None,
+            "next_attempt_at": next_attempt_at,
+        }
+
+    async def _flush_results(self):
+        """
+        Write buffered results with one bulk update, park deliveries of open
+        circuits and release parked deliveries of hosts that recovered.
+        """
+        if not (self._results or self._parked or self._recovered_hosts):
+            return
+
+        # Deliveries finishing during the write buffer new results meanwhile
+        results, self._results = self._results, []
+        parked, self._parked = self._parked, []
+        recovered_hosts, self._recovered_hosts = self._recovered_hosts, set()
+        try:
+            async with AsyncSessionLocal() as session:
+                webhook_repo = WebhookRepository(session)
+                await webhook_repo.bulk_update_deliveries(results)
+                await webhook_repo.park_deliveries(parked)
+                for host in recovered_hosts:
+                    await webhook_repo.release_host_deliveries(host, "parked")
+                await session.commit()
+        except Exception:
+            # Keep them for the next flush instead of sending the rows again
+            # after claim_timeout
+            self._results[:0] = results
+            self._parked[:0] = parked
+            self._recovered_hosts |= recovered_hosts
+            raise
@@ -1,34 +1,138 @@
+import asyncio
 import hashlib
 import hmac
-from datetime import datetime
+import random
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import httpx
 
+from src.config import settings
+from src.models.webhook import encode_body
+from src.services.adaptive_limiter import AdaptiveLimiter
+from src.services.circuit_breaker import endpoint_host, is_endpoint_failure
+
+# HTTP/2 support is optional (requires "h2" package)
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 
 class WebhookService:
+    # Keyed HMAC states kept for the most recently used secrets
+    SIGNER_CACHE_SIZE = 1024
+
     def __init__(self):
         self.timeout = 10
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._host_limiters: dict[str, AdaptiveLimiter] = {}
+        self._signers: OrderedDict[str, Any] = OrderedDict()
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create pooled keep-alive client"""
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.webhook_max_connections,
+                max_keepalive_connections=settings.webhook_max_keepalive_connections,
+                keepalive_expiry=settings.webhook_keepalive_expiry,
+            ),
+            timeout=self.timeout,
+            http2=settings.webhook_http2 and HTTP2_AVAILABLE,
+        )
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Get long-lived client for the running event loop.
+
+        Pooled connections belong to the loop that opened them,
+        so the client is re-created if it is used from another loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._close_on_loop(self._client, self._client_loop)
+            self._client = self._create_client()
+            self._client_loop = loop
+        return self._client
+
+    @staticmethod
+    def _close_on_loop(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        """Close a replaced client on its own loop, which may run in another thread"""
+        if loop.is_closed():
+            # Nothing can await aclose() any more; the sockets of a closed loop
+            # are released when the client is garbage collected. Forked
+            # processes never get here: they drop inherited clients via reset()
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    def _host_limiter(self, url: str) -> AdaptiveLimiter:
+        """Per-host concurrency limit adapting to latency and errors"""
+        host = endpoint_host(url)
+        limiter = self._host_limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveLimiter(max_limit=settings.webhook_max_connections_per_host)
+            self._host_limiters[host] = limiter
+        return limiter
+
+    async def close(self):
+        """Close client and its pooled connections"""
+        if self._client is not None:
+            client = self._client
+            self.reset()
+            await client.aclose()
 
-    def generate_signature(self, payload: str, secret_key: str) -> str:
-        """Generate HMAC SHA256 signature for webhook payload"""
-        return hmac.new(
-            secret_key.encode("utf-8"), payload.encode("utf-8"), hashlib.sha256
-        ).hexdigest()
+    def reset(self):
+        """Drop client without closing (e.g. sockets inherited after fork)"""
+        self._client = None
+        self._client_loop = None
+        self._host_limiters = {}
+
+    def generate_signature(self, body: bytes | str, secret_key: str) -> str:
+        """Generate HMAC SHA256 signature of the exact request body"""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        # Keyed HMAC state is derived once per secret and copied per body;
+        # least recently used secrets (deleted subscriptions, rotated keys) are evicted
+        signer = self._signers.get(secret_key)
+        if signer is None:
+            signer = hmac.new(secret_key.encode("utf-8"), digestmod=hashlib.sha256)
+            self._signers[secret_key] = signer
+            if len(self._signers) > self.SIGNER_CACHE_SIZE:
+                self._signers.popitem(last=False)
+        else:
+            self._signers.move_to_end(secret_key)
+        signature = signer.copy()
+        signature.update(body)
+        return signature.hexdigest()
+
+    def serialize_payload(self, payload: dict[str, Any] | list[dict[str, Any]]) -> bytes:
+        """Canonical body bytes of a payload, computed once per event"""
+        return encode_body(payload)
 
     async def send_webhook(
-        self, url: str, payload: dict[str, Any], secret_key: str, timeout: int = 10
+        self,
+        url: str,
+        body: bytes,
+        secret_key: str,
+        timeout: int = 10,
     ) -> tuple[bool, int | None, str | None, str | None]:
         """
         Send webhook to URL.
 
+        Args:
+            body: Serialized payload (see serialize_payload); sent and signed as is
+
         Returns:
             (success, status_code, response_body, error_message)
         """
-        import json
-
-        payload_str = json.dumps(payload, default=str)
-        signature = self.generate_signature(payload_str, secret_key)
+        signature = self.generate_signature(body, secret_key)
 
         headers = {
             "Content-Type": "application/json",
@@ -37,18 +141,33 @@ class WebhookService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(url, json=payload, headers=headers)
-
-                if response.status_code < 400:
-                    return (True, response.status_code, response.text, None)
-                else:
-                    return (
-                        False,
-                        response.status_code,
-                        response.text,
-                        f"HTTP {response.status_code}",
-                    )
+            client = self.get_client()
+            limiter = self._host_limiter(url)
+            await limiter.acquire()
+            started = time.perf_counter()
+            status_code = None
+            try:
+                # Timeout is configured per subscription
+                response = await client.post(
+                    url, content=body, headers=headers, timeout=httpx.Timeout(timeout)
+                )
+                status_code = response.status_code
+            finally:
+                limiter.release(
+                    time.perf_counter() - started, healthy=not is_endpoint_failure(status_code)
+                )
+
+            # Only a prefix is kept in the delivery log
+            response_body = response.text[: settings.webhook_response_body_limit]
+            if response.status_code < 400:
+                return (True, response.status_code, response_body, None)
+            else:
+                return (
+                    False,
+                    response.status_code,
+                    response_body,
+                    f"HTTP {response.status_code}",
+                )
 
         except httpx.TimeoutException:
             return (False, None, None, "Connection timeout")
@@ -57,6 +176,25 @@ class WebhookService:
         except Exception as e:
             return (False, None, None, f"Unexpected error: {str(e)}")
 
+    def next_attempt_at(
+        self, attempts: int, retry_count: int, now: datetime | None = None
+    ) -> datetime | None:
+        """
+        When to retry a failed delivery, None once retry_count attempts are used.
+
+        Exponential backoff with equal jitter: retries of one burst are spread
+        out, but never sooner than half of the nominal delay.
+        """
+        if attempts >= retry_count:
+            return None
+
+        delay = min(
+            settings.webhook_retry_max_seconds,
+            settings.webhook_retry_base_seconds * 2 ** max(attempts - 1, 0),
+        )
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        return (now or datetime.now(UTC)) + timedelta(seconds=delay)
+
     def create_webhook_payload(self, event_type: str, data: dict[str, Any]) -> dict[str, Any]:
         """Create standardized webhook payload"""
         return {
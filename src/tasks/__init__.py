@@ -1,22 +1,39 @@
 from src.tasks.aggregation import aggregate_products_batch
-from src.tasks.import_export import export_batches_to_file, import_batches_from_file
+from src.tasks.import_export import (
+    export_batches_to_file,
+    export_product_events_to_parquet,
+    import_batches_from_file,
+)
 from src.tasks.reports import generate_batch_report
 from src.tasks.scheduled import (
     auto_close_expired_batches,
     cleanup_old_files,
+    maintain_webhook_partitions,
+    refresh_shift_performance,
     retry_failed_webhooks,
     update_cached_statistics,
 )
-from src.tasks.webhooks import send_webhook_delivery
+from src.tasks.webhooks import (
+    flush_webhook_buffers,
+    release_parked_webhooks,
+    release_replayed_webhooks,
+    send_webhook_delivery,
+)
 
 __all__ = [
     "aggregate_products_batch",
     "generate_batch_report",
     "import_batches_from_file",
     "export_batches_to_file",
+    "export_product_events_to_parquet",
     "auto_close_expired_batches",
     "cleanup_old_files",
     "update_cached_statistics",
+    "refresh_shift_performance",
     "retry_failed_webhooks",
+    "maintain_webhook_partitions",
     "send_webhook_delivery",
+    "flush_webhook_buffers",
+    "release_parked_webhooks",
+    "release_replayed_webhooks",
 ]
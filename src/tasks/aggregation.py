@@ -4,9 +4,18 @@ from src.celery_app import celery_app
 from src.database import AsyncSessionLocal
 from src.repositories.batch import BatchRepository
 from src.repositories.product import ProductRepository
+from src.worker import report_progress, run_async
 
 
-@celery_app.task(bind=True, max_retries=3)
+# Safe to run twice: codes aggregated by the first run are skipped
+@celery_app.task(
+    bind=True,
+    max_retries=3,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    track_progress=True,
+    deduplicate=True,
+)
 def aggregate_products_batch(
     self: Task, batch_id: int, unique_codes: list[str], user_id: int | None = None
 ) -> dict:
@@ -27,7 +36,6 @@ def aggregate_products_batch(
             "errors": [...]
         }
     """
-    import asyncio
 
     async def _aggregate():
         async with AsyncSessionLocal() as session:
@@ -45,61 +53,52 @@ def aggregate_products_batch(
 
                 await session.commit()
 
-                # Send webhook events for aggregated products
-                from src.repositories.webhook import WebhookRepository
-                from src.services.webhook_service import webhook_service
-                from src.tasks.webhooks import send_webhook_delivery
+                # Publish progress delta
+                if result["aggregated"] > 0:
+                    from src.services.progress_service import progress_service
 
-                webhook_repo = WebhookRepository(session)
-                subscriptions = await webhook_repo.get_active_subscriptions_for_event(
-                    "product_aggregated"
-                )
-
-                # Get aggregated product codes
-                [
-                    code
-                    for code in unique_codes
-                    if code not in [e.get("code") for e in result.get("errors", [])]
-                ]
-
-                for subscription in subscriptions:
-                    # Send event for batch aggregation completion
-                    payload = webhook_service.create_webhook_payload(
-                        "product_aggregated",
-                        {
-                            "batch_id": batch_id,
-                            "batch_number": batch.batch_number,
-                            "total": result["total"],
-                            "aggregated": result["aggregated"],
-                            "failed": result["failed"],
-                        },
+                    stats = await product_repo.get_statistics(batch_id)
+                    await progress_service.publish_batch_progress(
+                        batch_id=batch_id,
+                        work_center_id=batch.work_center_id,
+                        event="aggregated",
+                        stats=stats,
+                        aggregated_delta=result["aggregated"],
+                        is_closed=batch.is_closed,
                     )
-                    delivery = await webhook_repo.create_delivery(
-                        subscription_id=subscription.id,
-                        event_type="product_aggregated",
-                        payload=payload,
-                    )
-                    send_webhook_delivery.delay(delivery.id)
 
-                # Update progress
-                self.update_state(
-                    state="PROGRESS",
-                    meta={
-                        "current": result["aggregated"],
+                # Send event for batch aggregation completion
+                from src.tasks.webhooks import emit_webhook_event
+
+                await emit_webhook_event(
+                    session,
+                    "product_aggregated",
+                    {
+                        "batch_id": batch_id,
+                        "batch_number": batch.batch_number,
                         "total": result["total"],
-                        "progress": int((result["aggregated"] / result["total"]) * 100)
-                        if result["total"] > 0
-                        else 0,
+                        "aggregated": result["aggregated"],
+                        "failed": result["failed"],
                     },
                 )
 
+                # Update progress
+                report_progress(
+                    self,
+                    current=result["aggregated"],
+                    total=result["total"],
+                    progress=int((result["aggregated"] / result["total"]) * 100)
+                    if result["total"] > 0
+                    else 0,
+                )
+
                 return result
             except Exception as e:
                 await session.rollback()
                 raise e
 
     try:
-        result = asyncio.run(_aggregate())
+        result = run_async(_aggregate())
         return result
     except Exception as exc:
         # Retry with exponential backoff
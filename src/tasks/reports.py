@@ -8,10 +8,11 @@ from src.celery_app import celery_app
 from src.database import AsyncSessionLocal
 from src.repositories.batch import BatchRepository
 from src.repositories.product import ProductRepository
-from src.services.minio_service import minio_service
+from src.services.minio_service import dated_object_name, minio_service
+from src.worker import run_async
 
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(bind=True, max_retries=3, track_progress=True, deduplicate=True)
 def generate_batch_report(
     self: Task, batch_id: int, format: str = "excel", user_email: str | None = None
 ) -> dict:
@@ -32,7 +33,6 @@ def generate_batch_report(
             "expires_at": "2024-02-07T00:00:00Z"
         }
     """
-    import asyncio
 
     async def _generate():
         async with AsyncSessionLocal() as session:
@@ -62,7 +62,7 @@ def generate_batch_report(
             file_url = minio_service.upload_file(
                 bucket="reports",
                 file_path=file_path,
-                object_name=file_name,
+                object_name=dated_object_name(file_name),
                 expires_days=7,
             )
 
@@ -71,34 +71,21 @@ def generate_batch_report(
             expires_at = (datetime.utcnow() + timedelta(days=7)).isoformat() + "Z"
 
             # Send webhook event
-            from src.repositories.webhook import WebhookRepository
-            from src.services.webhook_service import webhook_service
-            from src.tasks.webhooks import send_webhook_delivery
-
-            webhook_repo = WebhookRepository(session)
-            subscriptions = await webhook_repo.get_active_subscriptions_for_event(
-                "report_generated"
+            from src.tasks.webhooks import emit_webhook_event
+
+            await emit_webhook_event(
+                session,
+                "report_generated",
+                {
+                    "batch_id": batch_id,
+                    "report_type": format,
+                    "file_url": file_url,
+                    "file_name": file_name,
+                    "file_size": file_size,
+                    "expires_at": expires_at,
+                },
             )
 
-            for subscription in subscriptions:
-                payload = webhook_service.create_webhook_payload(
-                    "report_generated",
-                    {
-                        "batch_id": batch_id,
-                        "report_type": format,
-                        "file_url": file_url,
-                        "file_name": file_name,
-                        "file_size": file_size,
-                        "expires_at": expires_at,
-                    },
-                )
-                delivery = await webhook_repo.create_delivery(
-                    subscription_id=subscription.id,
-                    event_type="report_generated",
-                    payload=payload,
-                )
-                send_webhook_delivery.delay(delivery.id)
-
             # Cleanup temp file
             try:
                 os.remove(file_path)
@@ -128,7 +115,7 @@ def generate_batch_report(
             }
 
     try:
-        result = asyncio.run(_generate())
+        result = run_async(_generate())
         return result
     except Exception as exc:
         raise self.retry(exc=exc, countdown=2**self.request.retries) from None
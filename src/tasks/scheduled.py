@@ -1,74 +1,109 @@
-from datetime import datetime
+from datetime import UTC, datetime
 
-from src.celery_app import celery_app
+from src.celery_app import TASK_PRIORITY_LOW, celery_app
 from src.database import AsyncSessionLocal
 from src.repositories.batch import BatchRepository
 from src.services.cache_service import cache_service
 from src.services.minio_service import minio_service
-from src.tasks.webhooks import send_webhook_delivery
+from src.tasks.webhooks import dispatch_delivery
+from src.worker import run_async
 
 
 @celery_app.task
 def auto_close_expired_batches():
     """
-    Закрывает партии, у которых shift_end < now().
-    Запускается: каждый день в 01:00
+    Закрывает партии, у которых shift_end < now(), одним UPDATE на пачку
+    и отправляет batch_closed со статистикой для всех закрытых партий.
+    Запускается: каждые 5 минут
     """
-    import asyncio
+    from src.repositories.product import ProductRepository
+    from src.services.progress_service import progress_service
+    from src.tasks.webhooks import emit_webhook_events
 
-    async def _close():
-        async with AsyncSessionLocal() as session:
-            await session.begin()
-            try:
-                batch_repo = BatchRepository(session)
-                expired_batches = await batch_repo.get_expired_batches()
+    chunk_size = 1000
 
-                closed_count = 0
-                for batch in expired_batches:
-                    batch.is_closed = True
-                    batch.closed_at = datetime.utcnow()
-                    closed_count += 1
+    async def _close():
+        closed_count = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                closed = await BatchRepository(session).close_expired_batches(limit=chunk_size)
+                if not closed:
+                    await session.commit()
+                    break
 
+                batch_ids = [batch.id for batch in closed]
+                statistics = await ProductRepository(session).get_statistics_bulk(batch_ids)
+                # Commits the close together with the deliveries
+                await emit_webhook_events(
+                    session,
+                    "batch_closed",
+                    [
+                        {
+                            "id": batch.id,
+                            "batch_number": batch.batch_number,
+                            "closed_at": batch.closed_at.isoformat(),
+                            "statistics": statistics[batch.id],
+                        }
+                        for batch in closed
+                    ],
+                )
                 await session.commit()
-                return {"closed_count": closed_count}
-            except Exception as e:
-                await session.rollback()
-                raise e
 
-    return asyncio.run(_close())
+            for batch in closed:
+                await progress_service.publish_batch_progress(
+                    batch_id=batch.id,
+                    work_center_id=batch.work_center_id,
+                    event="closed",
+                    stats=statistics[batch.id],
+                    is_closed=True,
+                )
+
+            closed_count += len(closed)
+            if len(closed) < chunk_size:
+                break
+
+        if closed_count:
+            await cache_service.delete("dashboard_stats")
+            await cache_service.delete_pattern("batches_list:*")
+            await cache_service.delete_pattern("batch_statistics:*")
+
+        return {"closed_count": closed_count}
+
+    return run_async(_close())
 
 
 @celery_app.task
 def cleanup_old_files():
     """
-    Удаляет файлы старше 30 дней из MinIO.
+    Удаляет из MinIO файлы старше срока хранения бакета (settings.minio_retention_days).
+    Листинг читается потоком, файлы удаляются пачками до 1000 ключей,
+    дни YYYY/MM/DD/ моложе срока хранения не просматриваются.
     Запускается: каждый день в 02:00
     """
     from datetime import timedelta
 
-    cutoff_date = datetime.utcnow() - timedelta(days=30)
-    deleted_count = 0
+    from src.config import settings
+
+    now = datetime.now(UTC)
+    deleted = {}
+    errors = []
 
-    for bucket in ["reports", "exports", "imports"]:
+    for bucket, days in settings.minio_retention_days.items():
         try:
-            files = minio_service.list_files(bucket)
-            for file_obj in files:
-                if file_obj.last_modified < cutoff_date:
-                    minio_service.delete_file(bucket, file_obj.object_name)
-                    deleted_count += 1
+            expired = minio_service.iter_expired_files(bucket, now - timedelta(days=days))
+            deleted[bucket] = minio_service.delete_files(bucket, expired)
         except Exception as e:
-            print(f"Error cleaning bucket {bucket}: {e}")
+            errors.append(f"{bucket}: {e}")
 
-    return {"deleted_count": deleted_count}
+    return {"deleted_count": sum(deleted.values()), "deleted": deleted, "errors": errors}
 
 
 @celery_app.task
 def update_cached_statistics():
     """
-    Обновляет кэшированную статистику в Redis.
+    Обновляет кэшированную статистику в Redis и сохраняет снимок в историю.
     Запускается: каждые 5 минут
     """
-    import asyncio
 
     async def _update():
         async with AsyncSessionLocal() as session:
@@ -94,6 +129,7 @@ def update_cached_statistics():
             )
             aggregated_products = aggregated_products_result.scalar() or 0
 
+            now = datetime.now(UTC)
             stats = {
                 "total_batches": total_batches,
                 "active_batches": active_batches,
@@ -103,37 +139,159 @@ def update_cached_statistics():
                 "aggregation_rate": (aggregated_products / total_products * 100)
                 if total_products > 0
                 else 0.0,
-                "cached_at": datetime.utcnow().isoformat() + "Z",
+                "cached_at": now.isoformat(),
             }
 
             await cache_service.set("dashboard_stats", stats, ttl=300)
+
+            # Append snapshot to history series (tiered retention)
+            from src.repositories.dashboard_snapshot import DashboardSnapshotRepository
+
+            snapshot_repo = DashboardSnapshotRepository(session)
+            await snapshot_repo.record(stats, now)
+            await snapshot_repo.prune(now)
+            await session.commit()
+
             return stats
 
-    return asyncio.run(_update())
+    return run_async(_update())
 
 
 @celery_app.task
 def retry_failed_webhooks():
     """
-    Повторная отправка неудачных webhook delivery.
-    Запускается: каждые 15 минут
+    Повторная отправка неудачных webhook delivery, у которых наступил next_attempt_at.
+    Забирает due записи пачками, пока они есть, поэтому темп повторов растет с очередью.
+    Запускается: каждые 5 секунд
     """
-    import asyncio
+    from src.config import settings
+    from src.repositories.webhook import WebhookRepository
 
     async def _retry():
+        retried_count = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                webhook_repo = WebhookRepository(session)
+                # Dispatcher picks pending rows up by itself
+                retry_ids = await webhook_repo.release_due_retries(
+                    limit=settings.webhook_retry_batch_size
+                )
+                await session.commit()
+
+            for delivery_id in retry_ids:
+                dispatch_delivery(delivery_id, priority=TASK_PRIORITY_LOW)
+
+            retried_count += len(retry_ids)
+            if len(retry_ids) < settings.webhook_retry_batch_size:
+                return {"retried_count": retried_count}
+
+    return run_async(_retry())
+
+
+@celery_app.task
+def refresh_shift_performance():
+    """
+    Обновляет материализованный агрегат для рейтингов рабочих центров и бригад.
+    Запускается: каждые 5 минут
+    """
+
+    async def _refresh():
+        async with AsyncSessionLocal() as session:
+            from src.repositories.analytics import AnalyticsRepository
+
+            analytics_repo = AnalyticsRepository(session)
+            await analytics_repo.refresh_shift_performance()
+            await session.commit()
+
+            await cache_service.delete_pattern("leaderboards:*")
+            return {"refreshed_at": datetime.now(UTC).isoformat()}
+
+    return run_async(_refresh())
+
+
+@celery_app.task
+def maintain_webhook_partitions():
+    """
+    Обслуживание месячных партиций webhook_deliveries:
+    переносит строки из партиции по умолчанию в партиции их месяцев,
+    создает партиции на WEBHOOK_PARTITIONS_AHEAD месяцев вперед, выгружает партиции
+    старше WEBHOOK_DELIVERY_RETENTION_MONTHS в MinIO (gzip NDJSON, bucket "archives")
+    и удаляет их.
+    Запускается: каждый день в 04:00
+    """
+    import gzip
+    import json
+    import os
+    import tempfile
+
+    from src.config import settings
+    from src.repositories.webhook import WebhookRepository, add_months
+
+    async def _maintain():
+        current_month = datetime.now(UTC).date().replace(day=1)
+        moved, created, archived, errors = {}, [], [], []
+
+        # Rows land in the default partition when their month had no partition;
+        # moved into their months, they are archived with the rest of the month
+        async with AsyncSessionLocal() as session:
+            default_months = await WebhookRepository(session).list_default_partition_months()
+        for month in default_months:
+            try:
+                async with AsyncSessionLocal() as session:
+                    rows = await WebhookRepository(session).move_default_partition_rows(month)
+                    await session.commit()
+                moved[f"{month:%Y-%m}"] = rows
+            except Exception as e:
+                errors.append(f"{month:%Y-%m}: {e}")
+
         async with AsyncSessionLocal() as session:
-            from src.repositories.webhook import WebhookRepository
+            existing = set(await WebhookRepository(session).list_delivery_partitions())
+
+        # Partitions must exist before rows arrive, otherwise rows land in the
+        # default partition and the month can no longer be attached
+        for offset in range(settings.webhook_partitions_ahead + 1):
+            month = add_months(current_month, offset)
+            if month in existing:
+                continue
+            try:
+                async with AsyncSessionLocal() as session:
+                    await WebhookRepository(session).create_delivery_partition(month)
+                    await session.commit()
+                created.append(month.isoformat())
+            except Exception as e:
+                errors.append(f"{month:%Y-%m}: {e}")
+
+        cutoff = add_months(current_month, -settings.webhook_delivery_retention_months)
+        for month in sorted(m for m in existing if m < cutoff):
+            object_name = f"webhook_deliveries/{month:%Y/%m}.ndjson.gz"
+            fd, path = tempfile.mkstemp(suffix=".ndjson.gz")
+            os.close(fd)
+            try:
+                rows = 0
+                async with AsyncSessionLocal() as session:
+                    webhook_repo = WebhookRepository(session)
+                    with gzip.open(path, "wt", encoding="utf-8") as f:
+                        async for chunk in webhook_repo.stream_delivery_partition(month):
+                            for row in chunk:
+                                row["payload"] = json.loads(row.pop("body"))
+                                f.write(json.dumps(row, default=str) + "\n")
+                            rows += len(chunk)
+
+                # Drop only after the archive is stored
+                minio_service.upload_file(
+                    bucket="archives", file_path=path, object_name=object_name
+                )
 
-            webhook_repo = WebhookRepository(session)
-            failed_deliveries = await webhook_repo.get_failed_deliveries(limit=100)
+                async with AsyncSessionLocal() as session:
+                    await WebhookRepository(session).drop_delivery_partition(month)
+                    await session.commit()
 
-            retried_count = 0
-            for delivery in failed_deliveries:
-                if delivery.attempts < delivery.subscription.retry_count:
-                    # Send webhook task
-                    send_webhook_delivery.delay(delivery.id)
-                    retried_count += 1
+                archived.append({"month": f"{month:%Y-%m}", "rows": rows, "file": object_name})
+            except Exception as e:
+                errors.append(f"{month:%Y-%m}: {e}")
+            finally:
+                os.remove(path)
 
-            return {"retried_count": retried_count}
+        return {"moved": moved, "created": created, "archived": archived, "errors": errors}
 
-    return asyncio.run(_retry())
+    return run_async(_maintain())
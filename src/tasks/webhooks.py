@@ -1,18 +1,28 @@
-import asyncio
+from typing import Any
 
 from celery import Task
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.celery_app import celery_app
+from src.celery_app import TASK_PRIORITY_DEFAULT, TASK_PRIORITY_LOW, celery_app
+from src.config import settings
 from src.database import AsyncSessionLocal
-from src.models.webhook import WebhookDelivery
+from src.models.webhook import WebhookSubscription
 from src.repositories.webhook import WebhookRepository
+from src.services.circuit_breaker import circuit_breaker, endpoint_host, is_endpoint_failure
+from src.services.endpoint_throttle import endpoint_throttle
+from src.services.subscription_router import subscription_router
 from src.services.webhook_service import webhook_service
+from src.worker import run_async
 
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(bind=True, max_retries=3, acks_late=True, reject_on_worker_lost=True)
 def send_webhook_delivery(self: Task, delivery_id: int):
     """
-    Отправка webhook с retry логикой.
+    Отправка webhook.
+    Неудачная доставка получает next_attempt_at и повторяется retry_failed_webhooks;
+    Celery retry используется только при ошибках БД/брокера.
+    Подтверждается после выполнения: задача, потерянная вместе с worker,
+    выполняется повторно, уже отправленная доставка (не pending) пропускается.
 
     Args:
         delivery_id: ID записи WebhookDelivery
@@ -23,16 +33,30 @@ def send_webhook_delivery(self: Task, delivery_id: int):
             await session.begin()
             try:
                 webhook_repo = WebhookRepository(session)
-                delivery = await session.get(WebhookDelivery, delivery_id)
+                delivery = await webhook_repo.get_delivery(delivery_id)
 
                 if not delivery:
                     return {"success": False, "error": "Delivery not found"}
 
-                subscription = delivery.subscription
+                if delivery.status != "pending":
+                    return {"success": False, "error": f"Delivery is {delivery.status}"}
+
+                subscription = await session.get(WebhookSubscription, delivery.subscription_id)
+
+                # Deleted after the delivery was claimed: nothing to retry
+                if subscription is None:
+                    return {"success": False, "error": "Subscription not found"}
 
                 if not subscription.is_active:
                     return {"success": False, "error": "Subscription is inactive"}
 
+                host = endpoint_host(subscription.url)
+                if not await circuit_breaker.allow(host):
+                    # Released when the circuit closes, no worker waits on a broken endpoint
+                    await webhook_repo.park_deliveries([delivery_id])
+                    await session.commit()
+                    return {"success": False, "parked": True, "error": "Circuit open"}
+
                 # Send webhook
                 (
                     success,
@@ -41,7 +65,7 @@ def send_webhook_delivery(self: Task, delivery_id: int):
                     error_message,
                 ) = await webhook_service.send_webhook(
                     url=subscription.url,
-                    payload=delivery.payload,
+                    body=delivery.body,
                     secret_key=subscription.secret_key,
                     timeout=subscription.timeout,
                 )
@@ -55,16 +79,28 @@ def send_webhook_delivery(self: Task, delivery_id: int):
                         response_body=response_body,
                     )
                 else:
+                    next_attempt_at = webhook_service.next_attempt_at(
+                        delivery.attempts + 1, subscription.retry_count
+                    )
                     await webhook_repo.update_delivery(
                         delivery_id=delivery_id,
-                        status="failed",
+                        # Retries exhausted - dead letter, replayed only on request
+                        status="failed" if next_attempt_at else "dead",
                         response_status=status_code,
                         response_body=response_body,
                         error_message=error_message,
+                        next_attempt_at=next_attempt_at,
                     )
 
+                released = []
+                if await circuit_breaker.record(host, healthy=not is_endpoint_failure(status_code)):
+                    released = await webhook_repo.release_host_deliveries(host, "parked")
+
                 await session.commit()
 
+                for released_id in released:
+                    dispatch_delivery(released_id, priority=TASK_PRIORITY_LOW)
+
                 return {
                     "success": success,
                     "status_code": status_code,
@@ -76,12 +112,151 @@ def send_webhook_delivery(self: Task, delivery_id: int):
                 raise e
 
     try:
-        result = asyncio.run(_send())
-
-        # If failed and retries available, retry
-        if not result.get("success") and self.request.retries < self.max_retries:
-            raise self.retry(exc=Exception(result.get("error", "Unknown error")))
-
-        return result
+        return run_async(_send())
     except Exception as exc:
         raise self.retry(exc=exc, countdown=2**self.request.retries) from None
+
+
+def dispatch_delivery(delivery_id: int, priority: int = TASK_PRIORITY_DEFAULT):
+    """
+    Hand a committed pending delivery over for sending.
+
+    With the dispatcher enabled pending rows are picked up by the dispatcher
+    process, otherwise a Celery task is enqueued. Retried, replayed and
+    released deliveries are enqueued with TASK_PRIORITY_LOW, so a backlog
+    of them does not delay fresh events.
+    """
+    if not settings.webhook_dispatcher_enabled:
+        send_webhook_delivery.apply_async((delivery_id,), priority=priority)
+
+
+async def emit_webhook_event(session: AsyncSession, event_type: str, data: dict[str, Any]) -> int:
+    """
+    Create deliveries of an event for all active subscriptions and dispatch them.
+
+    Events of batch mode subscriptions are buffered and sent later by
+    flush_webhook_buffers. Commits the session, so deliveries are visible
+    to workers before they run.
+
+    Returns:
+        Number of created deliveries
+    """
+    return await emit_webhook_events(session, event_type, [data])
+
+
+async def emit_webhook_events(
+    session: AsyncSession, event_type: str, items: list[dict[str, Any]]
+) -> int:
+    """
+    Emit many events of one type: routes are resolved once, deliveries of all
+    events are inserted in one statement and committed together.
+
+    Returns:
+        Number of created deliveries
+    """
+    routes = await subscription_router.get_routes(session, event_type)
+    if not routes or not items:
+        return 0
+
+    deliveries = []
+    for data in items:
+        # Serialized once, shared by all subscriptions and retries
+        body = webhook_service.serialize_payload(
+            webhook_service.create_webhook_payload(event_type, data)
+        )
+        for route in routes:
+            deliveries.append(
+                {
+                    "subscription_id": route.subscription_id,
+                    "event_type": event_type,
+                    "body": body,
+                    "status": "buffered" if route.delivery_mode == "batch" else "pending",
+                }
+            )
+
+    created = await WebhookRepository(session).create_deliveries(deliveries)
+    await session.commit()
+
+    for delivery_id, status in created:
+        if status == "pending":
+            dispatch_delivery(delivery_id)
+
+    return len(created)
+
+
+@celery_app.task
+def flush_webhook_buffers():
+    """
+    Отправка накопленных событий подписок с delivery_mode="batch".
+    Запускается: каждую секунду
+    """
+
+    async def _flush():
+        async with AsyncSessionLocal() as session:
+            webhook_repo = WebhookRepository(session)
+            batch_ids = await webhook_repo.coalesce_buffered_deliveries()
+            await session.commit()
+
+        for batch_id in batch_ids:
+            dispatch_delivery(batch_id)
+
+        return {"batches": len(batch_ids)}
+
+    return run_async(_flush())
+
+
+@celery_app.task
+def release_parked_webhooks():
+    """
+    Возврат отложенных (parked) доставок в очередь.
+    Для закрытого circuit возвращаются все доставки хоста, для half-open -
+    одна пробная доставка, результат которой закроет или снова откроет circuit.
+    Запускается: каждые 30 секунд
+    """
+
+    async def _release():
+        async with AsyncSessionLocal() as session:
+            webhook_repo = WebhookRepository(session)
+            released = []
+            for host in await webhook_repo.get_hosts_with_deliveries("parked"):
+                state = await circuit_breaker.get_state(host)
+                if state == "closed":
+                    released += await webhook_repo.release_host_deliveries(host, "parked")
+                elif state == "half_open":
+                    released += await webhook_repo.release_host_deliveries(host, "parked", limit=1)
+            await session.commit()
+
+        for delivery_id in released:
+            dispatch_delivery(delivery_id, priority=TASK_PRIORITY_LOW)
+
+        return {"released": len(released)}
+
+    return run_async(_release())
+
+
+@celery_app.task
+def release_replayed_webhooks():
+    """
+    Возврат доставок, отмеченных для повторной отправки (replay), в очередь
+    с ограничением WEBHOOK_REPLAY_RATE_PER_HOST доставок в секунду на хост.
+    Запускается: каждую секунду
+    """
+
+    async def _release():
+        async with AsyncSessionLocal() as session:
+            webhook_repo = WebhookRepository(session)
+            released = []
+            for host in await webhook_repo.get_hosts_with_deliveries("replaying"):
+                granted = await endpoint_throttle.acquire(host)
+                if granted:
+                    released += await webhook_repo.release_host_deliveries(
+                        host, "replaying", limit=granted
+                    )
+            await session.commit()
+
+        for delivery_id in released:
+            dispatch_delivery(delivery_id, priority=TASK_PRIORITY_LOW)
+
+        return {"released": len(released)}
+
+    return run_async(_release())
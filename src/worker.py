@@ -0,0 +1,146 @@
+"""
+Celery worker process runtime.
+
+Each worker process owns one long-lived event loop. Tasks run their
+coroutines on it with run_async, so pooled asyncpg connections of the
+engine, the webhook HTTP client and Redis clients stay bound to one loop
+and are reused across tasks instead of being reopened per task.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from celery import Task
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
+
+from src.database import engine
+from src.services.cache_service import cache_service
+from src.services.progress_service import progress_service
+from src.services.task_dedup_service import task_dedup_service
+from src.services.task_status_service import TERMINAL_STATES, task_status_service
+from src.services.webhook_service import webhook_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Progress of tasks looping over many items is stored at most this often
+PROGRESS_INTERVAL = 0.25
+
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop of this process.
+
+    Created on first use, so tasks also work outside a prefork worker
+    (solo pool, task.apply() in scripts and tests).
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a task coroutine to completion on the process event loop"""
+    return get_loop().run_until_complete(coro)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Start a forked worker process with its own loop, engine pool and clients"""
+    global _loop
+    # Connections and sockets inherited from the parent belong to its loop;
+    # drop them without closing, the parent may still be using them
+    engine.sync_engine.dispose(close=False)
+    webhook_service.reset()
+    task_status_service.reset()
+    task_dedup_service.reset()
+    cache_service.reset()
+    progress_service.reset()
+
+    _loop = None
+    get_loop()
+
+
+def report_progress(task: Task, **meta):
+    """Store PROGRESS state of a running task and publish it to subscribers"""
+    task.update_state(state="PROGRESS", meta=meta)
+    task_status_service.publish(task.request.id, "PROGRESS", meta)
+
+
+class ProgressThrottle:
+    """
+    report_progress at most once per interval, for tasks that would
+    otherwise write to Redis on every processed row.
+    """
+
+    def __init__(self, task: Task, interval: float = PROGRESS_INTERVAL):
+        self.task = task
+        self.interval = interval
+        self._reported_at: float | None = None
+
+    def __call__(self, force: bool = False, **meta) -> bool:
+        """Report unless the last report is too recent; force for the final state"""
+        now = time.monotonic()
+        if not force and self._reported_at is not None and now - self._reported_at < self.interval:
+            return False
+        self._reported_at = now
+        report_progress(self.task, **meta)
+        return True
+
+
+# State changes are published only for tasks declared with track_progress=True
+# (started from the API and followed by clients), not for webhook deliveries
+
+
+@task_prerun.connect
+def publish_task_started(task_id: str, task: Task, **kwargs):
+    if getattr(task, "track_progress", False):
+        task_status_service.publish(task_id, "STARTED")
+
+
+@task_postrun.connect
+def publish_task_finished(
+    task_id: str, task: Task, retval=None, state: str | None = None, **kwargs
+):
+    """SUCCESS, FAILURE or RETRY, after the state is stored in the result backend"""
+    if state and getattr(task, "track_progress", False):
+        task_status_service.publish(task_id, state, retval)
+
+
+@task_postrun.connect
+def release_task_lock(task_id: str, task: Task, args=None, state: str | None = None, **kwargs):
+    """Let identical work be submitted again once the task is finished"""
+    if state in TERMINAL_STATES and getattr(task, "deduplicate", False):
+        task_dedup_service.release(task.name, args or (), task_id)
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Close pooled connections and the event loop on worker process shutdown"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+
+    try:
+        run_async(webhook_service.close())
+        run_async(cache_service.disconnect())
+        run_async(progress_service.disconnect())
+        run_async(engine.dispose())
+    except Exception as e:
+        logger.warning("Worker process cleanup failed: %s", e)
+    finally:
+        _loop.close()
+        _loop = None
@@ -0,0 +1,108 @@
+"""
+Тесты для адаптивного лимита конкурентности webhook
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.adaptive_limiter import AdaptiveLimiter
+from src.services.circuit_breaker import endpoint_host, is_endpoint_failure
+
+
+def test_limit_grows_on_healthy_responses():
+    """Тест аддитивного роста лимита"""
+    limiter = AdaptiveLimiter(max_limit=20, initial_limit=4)
+
+    async def run():
+        for _ in range(200):
+            await limiter.acquire()
+            limiter.release(latency=0.05, healthy=True)
+
+    asyncio.run(run())
+
+    assert 4 < limiter.limit <= 20
+    assert limiter.inflight == 0
+    print(f"✅ Limit grew to {limiter.limit:.1f}")
+
+
+def test_limit_halves_on_errors_and_slow_responses():
+    """Тест мультипликативного снижения лимита"""
+    limiter = AdaptiveLimiter(max_limit=20, initial_limit=16)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(latency=0.05, healthy=True)
+        await limiter.acquire()
+        limiter.release(latency=0.05, healthy=False)
+
+    asyncio.run(run())
+    assert 8 <= limiter.limit < 9
+
+    # Latency spike right after a decrease does not halve the limit again
+    limiter.inflight += 1
+    limiter.release(latency=5.0, healthy=True)
+    assert 8 <= limiter.limit < 9
+
+    limiter._last_decrease = 0.0
+    limiter.inflight += 1
+    limiter.release(latency=5.0, healthy=True)
+    assert 4 <= limiter.limit < 5
+    print("✅ Limit is halved on errors and latency spikes")
+
+
+def test_waiters_respect_limit():
+    """Тест: одновременно выполняется не больше limit запросов"""
+    limiter = AdaptiveLimiter(max_limit=2, initial_limit=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.inflight)
+        await asyncio.sleep(0.01)
+        limiter.release(latency=0.01, healthy=True)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert limiter.inflight == 0
+    print("✅ Concurrency stays within the limit")
+
+
+def test_endpoint_failure_classification():
+    """Тест: какие ответы считаются сбоем endpoint"""
+    assert is_endpoint_failure(None)
+    assert is_endpoint_failure(503)
+    assert is_endpoint_failure(429)
+    assert not is_endpoint_failure(200)
+    assert not is_endpoint_failure(404)
+    assert endpoint_host("https://erp.example.com:8443/hooks?x=1") == "erp.example.com:8443"
+    print("✅ Endpoint failures are classified")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running adaptive limiter tests...")
+    print("=" * 50)
+
+    try:
+        test_limit_grows_on_healthy_responses()
+        test_limit_halves_on_errors_and_slow_responses()
+        test_waiters_respect_limit()
+        test_endpoint_failure_classification()
+
+        print("=" * 50)
+        print("✅ All adaptive limiter tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
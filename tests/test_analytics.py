@@ -0,0 +1,178 @@
+"""
+Тесты для рейтингов рабочих центров и бригад
+"""
+
+import asyncio
+import os
+import sys
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import postgresql
+
+import src.api.analytics as analytics
+from src.api.analytics import _get_leaderboards, _rank
+from src.repositories.analytics import AnalyticsRepository
+
+
+class _Session:
+    """Captures the executed statement and returns prepared rows"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+class _Cache:
+    def __init__(self):
+        self.stored = {}
+
+    async def get(self, key):
+        return self.stored.get(key)
+
+    async def set(self, key, value, ttl=300):
+        self.stored[key] = value
+
+
+def _row(
+    work_center_id=None,
+    team=None,
+    batch_date=None,
+    shift=None,
+    shift_start=None,
+    aggregated_products=0,
+    hours=0.0,
+):
+    """GROUPING SETS row: work center or team, period total or one shift"""
+    return SimpleNamespace(
+        work_center_id=work_center_id,
+        work_center_name=f"Линия {work_center_id}" if work_center_id else None,
+        team=team,
+        batch_date=batch_date,
+        shift=shift,
+        wc_grouped=0 if work_center_id else 1,
+        team_grouped=0 if team else 1,
+        shift_grouped=0 if shift else 3,
+        shift_start=shift_start,
+        batches=2,
+        closed_batches=1,
+        total_products=100,
+        aggregated_products=aggregated_products,
+        hours=hours,
+    )
+
+
+def test_shift_performance_grouping_sets():
+    """Тест: итоги и смены обоих рейтингов одним запросом GROUPING SETS"""
+    session = _Session()
+    asyncio.run(AnalyticsRepository(session).get_shift_performance(date(2026, 1, 1)))
+    sql = " ".join(
+        str(
+            session.statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        ).split()
+    )
+
+    mv = "mv_shift_performance"
+    assert f"FROM {mv} WHERE {mv}.batch_date >= '2026-01-01'" in sql
+    assert (
+        "GROUP BY GROUPING SETS("
+        f"({mv}.work_center_id, {mv}.work_center_name), "
+        f"({mv}.work_center_id, {mv}.work_center_name, {mv}.batch_date, {mv}.shift), "
+        f"({mv}.team), "
+        f"({mv}.team, {mv}.batch_date, {mv}.shift))"
+    ) in sql
+    assert f"grouping({mv}.work_center_id) AS wc_grouped" in sql
+    assert f"grouping({mv}.team) AS team_grouped" in sql
+    assert f"grouping({mv}.batch_date, {mv}.shift) AS shift_grouped" in sql
+    print("✅ Leaderboards are read with one GROUPING SETS query")
+
+
+def test_leaderboards_from_grouping_rows():
+    """Тест: строки GROUPING SETS раскладываются по рейтингам, итоги бригад"""
+    day = date(2026, 1, 15)
+    morning = datetime(2026, 1, 15, 8, tzinfo=UTC)
+    evening = datetime(2026, 1, 15, 20, tzinfo=UTC)
+    rows = [
+        _row(work_center_id=1, aggregated_products=80, hours=8.0),
+        _row(work_center_id=2, aggregated_products=90, hours=6.0),
+        _row(work_center_id=1, batch_date=day, shift="1", shift_start=morning),
+        _row(team="А", aggregated_products=60, hours=6.0),
+        # Team shifts arrive out of order
+        _row(
+            team="А",
+            batch_date=day,
+            shift="2",
+            shift_start=evening,
+            aggregated_products=40,
+            hours=2.0,
+        ),
+        _row(
+            team="А",
+            batch_date=day,
+            shift="1",
+            shift_start=morning,
+            aggregated_products=20,
+            hours=4.0,
+        ),
+    ]
+
+    original_cache = analytics.cache_service
+    analytics.cache_service = _Cache()
+    try:
+        boards = asyncio.run(_get_leaderboards(_Session(rows), days=30))
+    finally:
+        analytics.cache_service = original_cache
+
+    work_centers = boards["work_centers"]
+    assert [entry["work_center_id"] for entry in work_centers] == [2, 1]
+    assert [entry["rank"] for entry in work_centers] == [1, 2]
+    assert work_centers[1]["last_shift"]["shift"] == "1"
+    assert work_centers[1]["shift_over_shift"] is None
+
+    (team,) = boards["teams"]
+    assert team["team"] == "А"
+    # Period totals come from the row without a shift
+    assert team["aggregated_products"] == 60
+    assert team["throughput_per_hour"] == 10.0
+    assert team["last_shift"]["shift"] == "2"
+    assert team["shift_over_shift"]["throughput_delta"] == 20.0 - 5.0
+    assert team["shift_over_shift"]["completion_rate_delta"] == 40.0 - 20.0
+    print("✅ Team and work center totals are built from grouping rows")
+
+
+def test_rank_ties():
+    """Тест: одинаковая производительность - один ранг, порядок по названию"""
+    entries = [
+        {"team": "В", "throughput_per_hour": 10.0, "shifts": []},
+        {"team": "А", "throughput_per_hour": 10.0, "shifts": []},
+        {"team": "Г", "throughput_per_hour": 12.0, "shifts": []},
+        {"team": "Б", "shifts": []},
+    ]
+
+    ranked = _rank(entries)
+
+    assert [(entry["team"], entry["rank"]) for entry in ranked] == [
+        ("Г", 1),
+        ("А", 2),
+        ("В", 2),
+        ("Б", 4),
+    ]
+    print("✅ Ties share a rank")
+
+
+if __name__ == "__main__":
+    print("🧪 Running analytics leaderboard tests...\n")
+
+    test_shift_performance_grouping_sets()
+    test_leaderboards_from_grouping_rows()
+    test_rank_ties()
+
+    print("\n✅ All analytics leaderboard tests passed!")
@@ -66,6 +66,26 @@ def test_webhooks_endpoints():
         print(f"⚠️  Could not import webhooks API: {e}")
 
 
+def test_webhook_delivery_cursor():
+    """Проверка курсора постраничной истории доставок"""
+    from datetime import UTC, datetime
+
+    from fastapi import HTTPException
+
+    from src.api.webhooks import _decode_cursor, _encode_cursor
+
+    created_at = datetime(2024, 1, 30, 12, 0, 0, 123456, tzinfo=UTC)
+    assert _decode_cursor(_encode_cursor(created_at, 42)) == (created_at, 42)
+
+    try:
+        _decode_cursor("not-a-cursor")
+        raise AssertionError("Invalid cursor accepted")
+    except HTTPException as e:
+        assert e.status_code == 400
+
+    print("✅ Delivery history cursor round-trips")
+
+
 def test_analytics_endpoints():
     """Проверка структуры endpoints для аналитики"""
     try:
@@ -90,6 +110,8 @@ def test_tasks_endpoints():
         assert tasks.router is not None
 
         routes = [route.path for route in tasks.router.routes]
+        assert "/api/v1/tasks/status" in routes
+        assert "/api/v1/tasks/{task_id}/stream" in routes
         print(f"✅ Tasks API has {len(routes)} endpoints")
 
     except ImportError as e:
@@ -123,6 +145,7 @@ if __name__ == "__main__":
         test_batches_endpoints()
         test_products_endpoints()
         test_webhooks_endpoints()
+        test_webhook_delivery_cursor()
         test_analytics_endpoints()
         test_tasks_endpoints()
         test_main_app()
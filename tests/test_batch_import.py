@@ -0,0 +1,198 @@
+"""
+Тесты для потокового импорта партий
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from sqlalchemy.exc import DBAPIError
+
+from src.tasks.import_export import (
+    IMPORT_COLUMNS,
+    insert_import_rows,
+    prepare_import_chunk,
+    read_import_chunks,
+    scan_import_work_centers,
+)
+
+
+def _row(**overrides):
+    row = {
+        "СтатусЗакрытия": False,
+        "ПредставлениеЗаданияНаСмену": "Задание",
+        "РабочийЦентр": "Линия 1",
+        "ИдентификаторРЦ": "WC-1",
+        "Смена": "1",
+        "Бригада": "А",
+        "НомерПартии": 101,
+        "ДатаПартии": "2026-01-15",
+        "Номенклатура": "Изделие",
+        "КодЕКН": "EKN",
+        "ДатаВремяНачалаСмены": "2026-01-15 08:00:00",
+        "ДатаВремяОкончанияСмены": "2026-01-15 20:00:00",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_prepare_import_chunk():
+    """Тест проверки и преобразования части файла"""
+    chunk = pd.DataFrame(
+        [
+            _row(),
+            _row(НомерПартии="abc"),
+            dict.fromkeys(IMPORT_COLUMNS),
+            _row(НомерПартии="102", СтатусЗакрытия="да", ДатаПартии=datetime(2026, 1, 16)),
+            _row(ИдентификаторРЦ="  "),
+            _row(ДатаВремяОкончанияСмены="завтра"),
+        ]
+    )
+
+    rows, errors = prepare_import_chunk(chunk, first_row=11)
+
+    assert [row["batch_number"] for row in rows] == [101, 102]
+    assert rows[0]["batch_date"] == date(2026, 1, 15)
+    assert rows[0]["work_center_identifier"] == "WC-1"
+    assert [row["row"] for row in rows] == [11, 14]
+    assert rows[0]["is_closed"] is False
+    assert rows[1]["is_closed"] is True
+    assert rows[1]["batch_date"] == date(2026, 1, 16)
+    assert rows[0]["shift_start"].hour == 8
+
+    # Empty row 13 is dropped without an error
+    assert [error["row"] for error in errors] == [12, 15, 16]
+    assert "НомерПартии" in errors[0]["error"]
+    print("✅ Import chunk validation works")
+
+
+def test_read_import_chunks_xlsx_and_csv():
+    """Тест чтения Excel и CSV частями"""
+    import openpyxl
+
+    header = list(IMPORT_COLUMNS)
+    rows = [_row(НомерПартии=number) for number in range(1, 6)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        xlsx_path = os.path.join(directory, "batches.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(header)
+        for row in rows:
+            sheet.append([row[column] for column in header])
+        workbook.save(xlsx_path)
+
+        csv_path = os.path.join(directory, "batches.csv")
+        pd.DataFrame(rows).to_csv(csv_path, index=False)
+
+        for path in (xlsx_path, csv_path):
+            chunks = list(read_import_chunks(path, chunk_size=2))
+            assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+            prepared = [prepare_import_chunk(chunk, 1)[0] for chunk in chunks]
+            assert [row["batch_number"] for part in prepared for row in part] == [1, 2, 3, 4, 5]
+
+        for path in (xlsx_path, csv_path):
+            assert scan_import_work_centers(path) == ({"WC-1": "Линия 1"}, 5)
+    print("✅ Import files are read in chunks")
+
+
+class _Session:
+    """begin_nested as a SAVEPOINT counter"""
+
+    def __init__(self):
+        self.savepoints = 0
+        self.rolled_back = 0
+
+    def begin_nested(self):
+        session = self
+
+        class _Savepoint:
+            async def __aenter__(self):
+                session.savepoints += 1
+
+            async def __aexit__(self, exc_type, exc, tb):
+                if exc_type:
+                    session.rolled_back += 1
+
+        return _Savepoint()
+
+
+class _AsyncpgError(Exception):
+    """Driver error as wrapped by the SQLAlchemy asyncpg dialect"""
+
+    def __init__(self, message, sqlstate):
+        super().__init__(f"<class 'asyncpg.exceptions.Error'>: {message}")
+        self.sqlstate = sqlstate
+        self.__cause__ = Exception(message)
+
+
+def _db_error(message, sqlstate):
+    # SQLAlchemy 2.0 with asyncpg raises plain DBAPIError for data errors
+    return DBAPIError.instance("INSERT", {}, _AsyncpgError(message, sqlstate), Exception)
+
+
+class _BatchRepository:
+    """create_many rejecting the whole INSERT if it has a bad row"""
+
+    def __init__(self, bad_numbers, sqlstate="22003"):
+        self.session = _Session()
+        self.bad_numbers = bad_numbers
+        self.sqlstate = sqlstate
+        self.inserted = []
+
+    async def create_many(self, rows):
+        assert all("row" not in row for row in rows)
+        if any(row["batch_number"] in self.bad_numbers for row in rows):
+            raise _db_error("value out of range", self.sqlstate)
+        self.inserted.extend(row["batch_number"] for row in rows)
+        return len(rows)
+
+
+def test_insert_import_rows_isolates_bad_rows():
+    """Тест: часть с ошибкой делится пополам до строк с ошибкой"""
+    repo = _BatchRepository(bad_numbers={5, 6})
+    rows = [{"row": number + 1, "batch_number": number} for number in range(16)]
+
+    inserted, errors = asyncio.run(insert_import_rows(repo, rows))
+
+    assert inserted == 14
+    assert sorted(repo.inserted) == [n for n in range(16) if n not in (5, 6)]
+    assert errors == [
+        {"row": 6, "error": "value out of range"},
+        {"row": 7, "error": "value out of range"},
+    ]
+    # Chunk, half, quarter and two pairs on the way to the two rows, then the rows
+    assert repo.session.rolled_back == 7
+    print("✅ Failing rows are isolated by savepoints")
+
+
+def test_insert_import_rows_raises_other_errors():
+    """Тест: ошибки не из-за данных (например, обрыв соединения) не делят часть"""
+    repo = _BatchRepository(bad_numbers={1}, sqlstate="08006")
+    rows = [{"row": number + 1, "batch_number": number} for number in range(4)]
+
+    try:
+        asyncio.run(insert_import_rows(repo, rows))
+    except DBAPIError as e:
+        assert e.orig.sqlstate == "08006"
+    else:
+        raise AssertionError("DBAPIError expected")
+
+    assert repo.session.rolled_back == 1
+    print("✅ Non-data errors abort the import")
+
+
+if __name__ == "__main__":
+    print("🧪 Running batch import tests...\n")
+
+    test_prepare_import_chunk()
+    test_read_import_chunks_xlsx_and_csv()
+    test_insert_import_rows_isolates_bad_rows()
+    test_insert_import_rows_raises_other_errors()
+
+    print("\n✅ All batch import tests passed!")
@@ -0,0 +1,93 @@
+"""
+Тесты для маршрутизации задач Celery по очередям
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.tasks  # noqa: F401  # registers tasks
+from src.celery_app import TASK_QUEUES, celery_app
+
+
+def route(task_name: str) -> str:
+    return celery_app.amqp.router.route({}, task_name)["queue"].name
+
+
+def test_task_queues():
+    """Тест: каждая задача попадает в очередь своего семейства"""
+    expected = {
+        "src.tasks.webhooks.send_webhook_delivery": "webhooks",
+        "src.tasks.webhooks.flush_webhook_buffers": "webhooks",
+        "src.tasks.scheduled.retry_failed_webhooks": "webhooks",
+        "src.tasks.aggregation.aggregate_products_batch": "aggregation",
+        "src.tasks.reports.generate_batch_report": "reports",
+        "src.tasks.import_export.export_batches_to_file": "reports",
+        "src.tasks.import_export.import_batches_from_file": "imports",
+        "src.tasks.scheduled.cleanup_old_files": "scheduled",
+    }
+    for task_name, queue in expected.items():
+        assert task_name in celery_app.tasks, task_name
+        assert route(task_name) == queue, f"{task_name} -> {route(task_name)}"
+
+    for task_name in celery_app.tasks:
+        if task_name.startswith("src."):
+            assert route(task_name) in TASK_QUEUES
+    print("✅ Tasks are routed to their queues")
+
+
+def test_beat_schedule_tasks_registered():
+    """Тест: все задачи расписания Celery Beat зарегистрированы"""
+    for entry in celery_app.conf.beat_schedule.values():
+        assert entry["task"] in celery_app.tasks, entry["task"]
+    print("✅ Beat schedule references registered tasks")
+
+
+def test_acks_late_tasks():
+    """Тест: acks_late только у идемпотентных задач"""
+    assert celery_app.tasks["src.tasks.webhooks.send_webhook_delivery"].acks_late
+    assert celery_app.tasks["src.tasks.aggregation.aggregate_products_batch"].acks_late
+    assert not celery_app.tasks["src.tasks.import_export.import_batches_from_file"].acks_late
+    assert not celery_app.tasks["src.tasks.reports.generate_batch_report"].acks_late
+    print("✅ acks_late is set on idempotent tasks only")
+
+
+# Beat entries running every second: a stale run is useless, the next one does its work
+EXPIRING_BEAT_ENTRIES = [
+    "flush-webhook-buffers",
+    "release-replayed-webhooks",
+    "retry-failed-webhooks",
+]
+
+
+def test_frequent_beat_runs_expire():
+    """Тест: частые задачи не накапливаются в очереди, пока воркеры недоступны"""
+    schedule = celery_app.conf.beat_schedule
+    for name in EXPIRING_BEAT_ENTRIES:
+        expires = schedule[name].get("options", {}).get("expires")
+        assert expires is not None, name
+        assert expires <= schedule[name]["schedule"], name
+    print("✅ Frequent beat runs expire")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running Celery routing tests...")
+    print("=" * 50)
+
+    try:
+        test_task_queues()
+        test_beat_schedule_tasks_registered()
+        test_acks_late_tasks()
+        test_frequent_beat_runs_expire()
+
+        print("=" * 50)
+        print("✅ All Celery routing tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
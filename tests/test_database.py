@@ -0,0 +1,88 @@
+"""
+Тесты для настроек пула соединений с БД
+"""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import settings
+from src.database import InstrumentedPool, PoolMetricsMixin, engine_options
+
+
+def test_pool_profiles():
+    """Тест профилей пула API и worker"""
+    api = engine_options("api")
+    worker = engine_options("worker")
+
+    assert api["poolclass"] is InstrumentedPool
+    assert api["pool_size"] == settings.db_api_pool_size
+    assert worker["pool_size"] == settings.db_worker_pool_size
+    assert worker["pool_size"] + worker["max_overflow"] < api["pool_size"] + api["max_overflow"]
+    assert api["pool_pre_ping"] == settings.db_pool_pre_ping
+    assert api["connect_args"]["prepared_statement_cache_size"] == settings.db_statement_cache_size
+
+    # API statements are bounded, worker statements are not by default
+    assert api["connect_args"]["server_settings"]["statement_timeout"] == str(
+        settings.db_api_statement_timeout_ms
+    )
+    assert "statement_timeout" not in worker["connect_args"]["server_settings"]
+    print("✅ API and worker pool profiles differ")
+
+
+def test_unknown_pool_profile():
+    """Тест неизвестного профиля пула"""
+    try:
+        engine_options("batch")
+    except ValueError:
+        print("✅ Unknown pool profile is rejected")
+    else:
+        raise AssertionError("Unknown profile accepted")
+
+
+def test_pool_metrics():
+    """Тест метрик пула: загрузка и время ожидания соединения"""
+
+    class MeteredPool(PoolMetricsMixin, QueuePool):
+        """Same metrics on a sync pool, no event loop needed"""
+
+    test_engine = create_engine("sqlite://", poolclass=MeteredPool, pool_size=1, max_overflow=1)
+
+    with test_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        stats = test_engine.pool.stats()
+        assert stats["checked_out"] == 1
+        assert stats["saturation"] == 0.5
+
+    stats = test_engine.pool.stats()
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 0
+    assert stats["wait_p50_ms"] is not None
+    assert stats["wait_max_ms"] >= stats["wait_p99_ms"]
+    print("✅ Pool saturation and checkout waits are recorded")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running database pool tests...")
+    print("=" * 50)
+
+    try:
+        test_pool_profiles()
+        test_unknown_pool_profile()
+        test_pool_metrics()
+
+        print("=" * 50)
+        print("✅ All database pool tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
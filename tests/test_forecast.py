@@ -0,0 +1,164 @@
+"""
+Тесты для прогноза завершения партии
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import postgresql
+
+from src.repositories.product import ProductRepository
+from src.services.forecast_service import compute_throughput, estimate_completion
+
+
+class _ScalarResult:
+    def __init__(self, values, chunk_size):
+        self.values = values
+        self.chunk_size = chunk_size
+
+    async def partitions(self):
+        for start in range(0, len(self.values), self.chunk_size):
+            yield self.values[start : start + self.chunk_size]
+
+
+class _StreamResult:
+    def __init__(self, scalars):
+        self._scalars = scalars
+
+    def scalars(self):
+        return self._scalars
+
+
+class _Session:
+    """Streams prepared scalar values in yield_per chunks, like a server-side cursor"""
+
+    def __init__(self, values):
+        self.values = values
+        self.statement = None
+
+    async def stream(self, statement):
+        self.statement = statement
+        chunk_size = statement.get_execution_options()["yield_per"]
+        return _StreamResult(_ScalarResult(self.values, chunk_size))
+
+
+def test_throughput_steady_pace():
+    """Тест постоянного темпа: 1 продукт каждые 30 секунд"""
+    timestamps = np.arange(0, 4 * 3600, 30, dtype=np.float64)
+
+    throughput = compute_throughput(timestamps)
+
+    assert throughput["samples"] == timestamps.size
+    assert abs(throughput["pace_per_hour"] - 120.0) < 1e-6
+    assert throughput["pace_std_per_hour"] == 0.0
+    assert throughput["break_hours"] == 0.0
+    print("✅ Steady pace throughput is correct")
+
+
+def test_throughput_ignores_breaks():
+    """Тест перерыва: часовой перерыв не снижает текущий темп"""
+    before = np.arange(0, 2 * 3600, 30, dtype=np.float64)
+    after = np.arange(3 * 3600, 5 * 3600, 30, dtype=np.float64)
+    timestamps = np.concatenate([before, after])
+
+    throughput = compute_throughput(timestamps)
+
+    assert abs(throughput["pace_per_hour"] - 120.0) < 1e-6
+    assert abs(throughput["break_hours"] - 1.0) < 0.01
+    print("✅ Breaks are excluded from pace")
+
+
+def test_estimate_completion_interval():
+    """Тест доверительного интервала ETA"""
+    rng = np.random.default_rng(42)
+    timestamps = np.sort(rng.uniform(0, 4 * 3600, size=500))
+
+    throughput = compute_throughput(timestamps)
+    now = datetime(2024, 1, 30, 12, 0, 0)
+    eta = estimate_completion(throughput, remaining=100, now=now)
+
+    assert eta["earliest_completion"] <= eta["estimated_completion"] <= eta["latest_completion"]
+    assert estimate_completion(throughput, remaining=0, now=now)["estimated_completion"] is None
+    print("✅ ETA confidence interval is ordered")
+
+
+def test_throughput_performance():
+    """Тест производительности: 1M меток времени быстрее 100 мс"""
+    rng = np.random.default_rng(0)
+    timestamps = np.sort(rng.uniform(0, 12 * 3600, size=1_000_000))
+
+    started = time.perf_counter()
+    compute_throughput(timestamps)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.1, f"Forecast took {elapsed * 1000:.1f} ms"
+    print(f"✅ 1M timestamps processed in {elapsed * 1000:.1f} ms")
+
+
+def test_aggregation_timestamps_query():
+    """Тест: продукция без времени аггрегации не попадает в прогноз"""
+    session = _Session([10.0, 20.0, 30.0])
+
+    timestamps = asyncio.run(ProductRepository(session).get_aggregation_timestamps(1))
+
+    assert timestamps.dtype == np.float64
+    assert timestamps.tolist() == [10.0, 20.0, 30.0]
+    sql = str(
+        session.statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "products.aggregated_at IS NOT NULL" in sql
+    assert "ORDER BY products.aggregated_at" in sql
+
+    empty = asyncio.run(ProductRepository(_Session([])).get_aggregation_timestamps(1))
+    assert empty.size == 0
+    assert compute_throughput(empty)["samples"] == 0
+    print("✅ Timestamps without aggregated_at are excluded")
+
+
+def test_fetch_and_throughput_performance():
+    """Тест производительности всего пути: чтение 1M меток из курсора и расчет"""
+    rng = np.random.default_rng(0)
+    values = np.sort(rng.uniform(0, 12 * 3600, size=1_000_000)).tolist()
+    session = _Session(values)
+
+    started = time.perf_counter()
+    timestamps = asyncio.run(ProductRepository(session).get_aggregation_timestamps(1))
+    compute_throughput(timestamps)
+    elapsed = time.perf_counter() - started
+
+    assert timestamps.size == 1_000_000
+    assert elapsed < 0.2, f"Fetch and forecast took {elapsed * 1000:.1f} ms"
+    print(f"✅ 1M timestamps fetched and processed in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running forecast tests...")
+    print("=" * 50)
+
+    try:
+        test_throughput_steady_pace()
+        test_throughput_ignores_breaks()
+        test_estimate_completion_interval()
+        test_throughput_performance()
+        test_aggregation_timestamps_query()
+        test_fetch_and_throughput_performance()
+
+        print("=" * 50)
+        print("✅ All forecast tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,123 @@
+"""
+Тесты для очистки MinIO по сроку хранения
+"""
+
+import os
+import sys
+from datetime import UTC, date, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.minio_service import (
+    DELETE_BATCH_SIZE,
+    MinIOService,
+    dated_object_name,
+)
+
+NOW = datetime(2026, 3, 15, 2, 0, tzinfo=UTC)
+
+
+class _Minio:
+    """list_objects / remove_objects over a dict of key -> last_modified"""
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+        self.listed = []
+        self.delete_requests = []
+
+    def list_objects(self, bucket_name, prefix=None, recursive=False):
+        prefix = prefix or ""
+        self.listed.append(prefix)
+        dirs = set()
+        for name in sorted(self.objects):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix) :]
+            if not recursive and "/" in rest:
+                dir_name = prefix + rest.split("/", 1)[0] + "/"
+                if dir_name not in dirs:
+                    dirs.add(dir_name)
+                    yield SimpleNamespace(object_name=dir_name, is_dir=True, last_modified=None)
+                continue
+            yield SimpleNamespace(object_name=name, is_dir=False, last_modified=self.objects[name])
+
+    def remove_objects(self, bucket_name, delete_object_list):
+        names = [obj._name for obj in delete_object_list]
+        self.delete_requests.append(names)
+        for name in names:
+            self.objects.pop(name, None)
+        return iter(())
+
+
+def _service(objects) -> MinIOService:
+    service = MinIOService.__new__(MinIOService)
+    service.client = _Minio(objects)
+    return service
+
+
+def test_dated_object_name():
+    """Тест префикса даты в имени объекта"""
+    assert dated_object_name("report.pdf", date(2026, 3, 5)) == "2026/03/05/report.pdf"
+    assert dated_object_name("report.pdf").count("/") == 3
+    print("✅ Date-prefixed object names work")
+
+
+def test_expired_files_skip_recent_days():
+    """Тест: истекшие дни удаляются целиком, свежие дни не листятся"""
+    old = NOW - timedelta(days=60)
+    service = _service(
+        {
+            "2025/12/31/a.xlsx": old,
+            "2026/01/10/b.xlsx": old,
+            "2026/02/13/c.xlsx": NOW - timedelta(days=30, hours=1),
+            "2026/02/14/d.xlsx": NOW - timedelta(days=29),
+            "2026/03/15/e.xlsx": NOW,
+            "legacy_old.xlsx": old,
+            "legacy_new.xlsx": NOW,
+            "manual/old.csv": old,
+        }
+    )
+
+    cutoff = NOW - timedelta(days=30)
+    expired = sorted(service.iter_expired_files("exports", cutoff))
+
+    assert expired == [
+        "2025/12/31/a.xlsx",
+        "2026/01/10/b.xlsx",
+        "2026/02/13/c.xlsx",
+        "legacy_old.xlsx",
+        "manual/old.csv",
+    ]
+    # Days and months after the cutoff day are never listed
+    assert "2026/03/" not in service.client.listed
+    assert "2026/02/14/" not in service.client.listed
+    print("✅ Expired files are found by date prefix")
+
+
+def test_delete_files_in_batches():
+    """Тест удаления пачками по DELETE_BATCH_SIZE ключей"""
+    old = NOW - timedelta(days=60)
+    names = [f"2026/01/01/file_{i}.csv" for i in range(DELETE_BATCH_SIZE * 2 + 5)]
+    service = _service(dict.fromkeys(names, old))
+
+    deleted = service.delete_files("exports", (name for name in names))
+
+    assert deleted == len(names)
+    assert [len(batch) for batch in service.client.delete_requests] == [
+        DELETE_BATCH_SIZE,
+        DELETE_BATCH_SIZE,
+        5,
+    ]
+    assert not service.client.objects
+    print("✅ Files are deleted in batches")
+
+
+if __name__ == "__main__":
+    print("🧪 Running MinIO cleanup tests...\n")
+
+    test_dated_object_name()
+    test_expired_files_skip_recent_days()
+    test_delete_files_in_batches()
+
+    print("\n✅ All MinIO cleanup tests passed!")
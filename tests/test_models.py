@@ -9,6 +9,7 @@ from datetime import date, datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.models.batch import Batch
+from src.models.dashboard_snapshot import DashboardSnapshot
 from src.models.product import Product
 from src.models.webhook import WebhookDelivery, WebhookSubscription
 from src.models.work_center import WorkCenter
@@ -92,6 +93,126 @@ def test_webhook_delivery_model():
     print("✅ WebhookDelivery model structure is correct")
 
 
+def test_dashboard_snapshot_model():
+    """Тест модели DashboardSnapshot и границ бакетов"""
+    from datetime import UTC, timedelta
+
+    from src.repositories.dashboard_snapshot import SNAPSHOT_TIERS, bucket_start
+
+    moment = datetime(2024, 1, 30, 14, 37, 12, tzinfo=UTC)
+    snapshot = DashboardSnapshot(
+        resolution="5m",
+        bucket_start=bucket_start(moment, SNAPSHOT_TIERS["5m"][0]),
+        total_batches=10,
+        active_batches=4,
+        total_products=1000,
+        aggregated_products=250,
+        aggregation_rate=25.0,
+    )
+
+    assert snapshot.bucket_start == datetime(2024, 1, 30, 14, 35, tzinfo=UTC)
+    assert bucket_start(moment, timedelta(hours=1)) == datetime(2024, 1, 30, 14, 0, tzinfo=UTC)
+    assert bucket_start(moment, timedelta(days=1)) == datetime(2024, 1, 30, tzinfo=UTC)
+    print("✅ DashboardSnapshot model structure is correct")
+
+
+def test_webhook_delivery_partitioning():
+    """Тест партиционирования журнала доставок по created_at"""
+    from src.repositories.webhook import add_months, delivery_partition_ddl
+
+    table = WebhookDelivery.__table__
+    primary_key = {column.name for column in table.primary_key.columns}
+
+    assert table.dialect_options["postgresql"]["partition_by"] == "RANGE (created_at)"
+    assert primary_key == {"id", "created_at"}
+    assert add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -3) == date(2023, 10, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert delivery_partition_ddl(date(2024, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS webhook_deliveries_p202412 PARTITION OF webhook_deliveries "
+        "FOR VALUES FROM ('2024-12-01T00:00:00+00:00') TO ('2025-01-01T00:00:00+00:00')"
+    )
+    print("✅ WebhookDelivery is partitioned by created_at")
+
+
+def test_move_default_partition_rows():
+    """Тест: строки партиции по умолчанию переносятся в партицию своего месяца"""
+    import asyncio
+    from types import SimpleNamespace
+
+    from src.repositories.webhook import WebhookRepository
+
+    class _Session:
+        """Records executed SQL"""
+
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement):
+            self.statements.append(str(statement))
+            return SimpleNamespace(rowcount=42)
+
+    session = _Session()
+    moved = asyncio.run(WebhookRepository(session).move_default_partition_rows(date(2024, 3, 1)))
+
+    assert moved == 42
+    detach, create, move, attach = session.statements
+    # The month partition cannot be created while the default one holds its rows
+    assert detach == "ALTER TABLE webhook_deliveries DETACH PARTITION webhook_deliveries_default"
+    assert create.startswith("CREATE TABLE IF NOT EXISTS webhook_deliveries_p202403 ")
+    assert move == (
+        "WITH moved AS (DELETE FROM webhook_deliveries_default "
+        "WHERE created_at >= '2024-03-01T00:00:00+00:00' "
+        "AND created_at < '2024-04-01T00:00:00+00:00' RETURNING *) "
+        "INSERT INTO webhook_deliveries_p202403 SELECT * FROM moved"
+    )
+    assert attach == (
+        "ALTER TABLE webhook_deliveries ATTACH PARTITION webhook_deliveries_default DEFAULT"
+    )
+    print("✅ Default partition rows are moved into their month")
+
+
+def test_batch_auto_close_query():
+    """Тест: автозакрытие - один UPDATE ... RETURNING по частичному индексу, SKIP LOCKED"""
+    import asyncio
+    from types import SimpleNamespace
+
+    from sqlalchemy.dialects import postgresql
+
+    from src.repositories.batch import BatchRepository
+
+    index = next(i for i in Batch.__table__.indexes if i.name == "idx_batch_open_shift_end")
+    assert [column.name for column in index.columns] == ["shift_end"]
+    assert str(index.dialect_options["postgresql"]["where"]) == "NOT is_closed"
+
+    class _Session:
+        """Captures the statement instead of running it"""
+
+        async def execute(self, statement):
+            self.statement = statement
+            return SimpleNamespace(all=lambda: [])
+
+    session = _Session()
+    assert asyncio.run(BatchRepository(session).close_expired_batches(limit=500)) == []
+    sql = " ".join(
+        str(
+            session.statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        ).split()
+    )
+
+    assert sql.startswith("UPDATE batches SET is_closed=true, closed_at=now()")
+    assert "WHERE batches.id IN (SELECT batches.id FROM batches" in sql
+    # ~ builds SQL NOT; Python `not` on a column would be evaluated in Python
+    assert "WHERE NOT batches.is_closed AND batches.shift_end < now()" in sql
+    assert "ORDER BY batches.shift_end LIMIT 500 FOR UPDATE SKIP LOCKED)" in sql
+    assert sql.endswith(
+        "RETURNING batches.id, batches.batch_number, batches.work_center_id, batches.closed_at"
+    )
+    print("✅ Auto-close filters open batches in SQL")
+
+
 if __name__ == "__main__":
     print("=" * 50)
     print("Running model structure tests...")
@@ -103,6 +224,10 @@ if __name__ == "__main__":
         test_product_model()
         test_webhook_subscription_model()
         test_webhook_delivery_model()
+        test_dashboard_snapshot_model()
+        test_webhook_delivery_partitioning()
+        test_move_default_partition_rows()
+        test_batch_auto_close_query()
 
         print("=" * 50)
         print("✅ All model tests passed!")
@@ -0,0 +1,186 @@
+"""
+Тесты для инкрементального экспорта продукции в Parquet
+"""
+
+import io
+import json
+import os
+import sys
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow.parquet as pq
+from minio.error import S3Error
+
+import src.tasks.import_export as import_export
+from src.repositories.product import ProductRepository
+from src.services.minio_service import MinIOService
+from src.tasks.import_export import PRODUCT_EVENTS_WATERMARK, export_product_events_to_parquet
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class _Minio:
+    """get_object / fput_object / put_object over a dict of (bucket, key) -> bytes"""
+
+    def __init__(self, get_error=None):
+        self.objects = {}
+        self.get_error = get_error
+
+    def get_object(self, bucket, object_name):
+        if self.get_error:
+            raise self.get_error
+        if (bucket, object_name) not in self.objects:
+            raise _s3_error("NoSuchKey")
+        return _Response(self.objects[(bucket, object_name)])
+
+    def fput_object(self, bucket_name, object_name, file_path, content_type=None):
+        with open(file_path, "rb") as f:
+            self.objects[(bucket_name, object_name)] = f.read()
+
+    def put_object(self, bucket_name, object_name, data, length, content_type=None):
+        self.objects[(bucket_name, object_name)] = data.read()
+
+    def presigned_get_object(self, bucket_name, object_name, expires):
+        return f"http://minio/{bucket_name}/{object_name}"
+
+
+def _s3_error(code):
+    return S3Error(code, code, "/analytics", "request", "host", None)
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+def _product(product_id, batch_date):
+    return SimpleNamespace(
+        product_id=product_id,
+        unique_code=f"CODE-{product_id}",
+        aggregated_at=datetime(2026, 1, 20, 12, 0, tzinfo=UTC),
+        created_at=datetime(2026, 1, 15, 8, 0, tzinfo=UTC),
+        batch_id=1,
+        batch_number=101,
+        batch_date=batch_date,
+        shift="1",
+        team="А",
+        nomenclature="Изделие",
+        ekn_code="EKN",
+        work_center_identifier="WC-1",
+        work_center_name="Линия 1",
+    )
+
+
+def _run_export(client, chunks):
+    """Run the task with fake storage and database, returns stream_aggregation_events calls"""
+    calls = []
+
+    async def stream(self, since, until, chunk_size=50_000):
+        calls.append((since, until))
+        for chunk in chunks:
+            yield chunk
+
+    storage = MinIOService.__new__(MinIOService)
+    storage.client = client
+    originals = (
+        import_export.minio_service,
+        import_export.AsyncSessionLocal,
+        ProductRepository.stream_aggregation_events,
+    )
+    import_export.minio_service = storage
+    import_export.AsyncSessionLocal = _Session
+    ProductRepository.stream_aggregation_events = stream
+    try:
+        result = export_product_events_to_parquet()
+    finally:
+        (
+            import_export.minio_service,
+            import_export.AsyncSessionLocal,
+            ProductRepository.stream_aggregation_events,
+        ) = originals
+    return result, calls
+
+
+def test_export_partitions_and_watermark():
+    """Тест: партиционирование по ДатаПартии и сдвиг водяного знака"""
+    client = _Minio()
+    day1, day2, day3 = date(2026, 1, 15), date(2026, 1, 16), date(2026, 1, 17)
+    chunks = [
+        [_product(1, day1), _product(2, day1), _product(3, day2)],
+        [_product(4, day2), _product(5, day3)],
+    ]
+
+    result, calls = _run_export(client, chunks)
+
+    # First run has no watermark and exports everything
+    assert calls[0][0] is None
+    assert result["exported_rows"] == 5
+
+    run_id = datetime.fromisoformat(result["watermark"]).strftime("%Y%m%d_%H%M%S")
+    assert result["files"] == [
+        f"product_events/batch_date={day}/part-{run_id}.parquet" for day in (day1, day2, day3)
+    ]
+
+    # A partition split across cursor chunks is one file with a row group per chunk
+    day2_file = pq.ParquetFile(io.BytesIO(client.objects[("analytics", result["files"][1])]))
+    assert day2_file.metadata.num_row_groups == 2
+    assert day2_file.read().column("product_id").to_pylist() == [3, 4]
+
+    watermark = json.loads(client.objects[("analytics", PRODUCT_EVENTS_WATERMARK)])
+    assert watermark["aggregated_at"] == result["watermark"]
+    print("✅ Product events are partitioned by batch date")
+
+
+def test_export_is_incremental():
+    """Тест: следующий запуск выгружает только продукцию после водяного знака"""
+    client = _Minio()
+    first, _ = _run_export(client, [[_product(1, date(2026, 1, 15))]])
+
+    second, calls = _run_export(client, [])
+
+    assert calls[0][0] == datetime.fromisoformat(first["watermark"])
+    assert second["exported_rows"] == 0
+    assert second["files"] == []
+    print("✅ Export continues from the watermark")
+
+
+def test_export_fails_when_watermark_unreadable():
+    """Тест: ошибка хранилища не считается отсутствием водяного знака"""
+    for error in (_s3_error("AccessDenied"), TimeoutError("read timed out")):
+        client = _Minio(get_error=error)
+        try:
+            _run_export(client, [[_product(1, date(2026, 1, 15))]])
+        except Exception:
+            pass
+        else:
+            raise AssertionError("Export must fail when the watermark cannot be read")
+        assert client.objects == {}
+    print("✅ Storage errors do not trigger a full re-export")
+
+
+if __name__ == "__main__":
+    print("🧪 Running Parquet export tests...\n")
+
+    test_export_partitions_and_watermark()
+    test_export_is_incremental()
+    test_export_fails_when_watermark_unreadable()
+
+    print("\n✅ All Parquet export tests passed!")
@@ -0,0 +1,256 @@
+"""
+Тесты для потока прогресса партий (Server-Sent Events)
+"""
+
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.api.analytics as analytics
+from src.database import get_db
+from src.services.progress_service import ProgressService, format_sse
+
+
+class _PubSub:
+    """Pub/sub connection reading prepared raw messages"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+        self.redis.subscribed.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        if not self.redis.messages:
+            await asyncio.sleep(timeout)
+            return None
+        return {"type": "message", "data": self.redis.messages.pop(0)}
+
+    async def unsubscribe(self, channel):
+        self.redis.unsubscribed.append(channel)
+
+    async def close(self):
+        self.redis.closed += 1
+
+
+class _Redis:
+    def __init__(self, messages=(), fail=False):
+        self.messages = list(messages)
+        self.fail = fail
+        self.published = []
+        self.subscribed = []
+        self.unsubscribed = []
+        self.closed = 0
+
+    async def publish(self, channel, message):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        self.published.append((channel, json.loads(message)))
+
+    def pubsub(self):
+        return _PubSub(self)
+
+
+def _service(redis):
+    service = ProgressService()
+    service.redis_client = redis
+    return service
+
+
+def test_format_sse():
+    """Тест формата сообщений SSE"""
+    assert format_sse({"a": 1}) == 'data: {"a": 1}\n\n'
+    assert format_sse({"a": 1}, event="closed") == 'event: closed\ndata: {"a": 1}\n\n'
+    # Dates and other values are serialized with str()
+    assert format_sse({"at": datetime(2026, 1, 15, 8)}) == 'data: {"at": "2026-01-15 08:00:00"}\n\n'
+    print("✅ SSE messages are formatted")
+
+
+def test_publish_batch_progress():
+    """Тест: прогресс публикуется в каналы партии и рабочего центра"""
+    redis = _Redis()
+
+    asyncio.run(
+        _service(redis).publish_batch_progress(
+            batch_id=1,
+            work_center_id=2,
+            event="aggregated",
+            stats={"total": 10},
+            aggregated_delta=3,
+        )
+    )
+
+    assert [channel for channel, _ in redis.published] == [
+        "progress:batch:1",
+        "progress:work_center:2",
+    ]
+    message = redis.published[0][1]
+    assert message["event"] == "aggregated"
+    assert message["aggregated_delta"] == 3
+    assert message["total"] == 10
+    print("✅ Batch progress is published to both channels")
+
+
+def test_publish_batch_progress_ignores_redis_errors():
+    """Тест: недоступность Redis не ломает уже сохраненное изменение"""
+    asyncio.run(
+        _service(_Redis(fail=True)).publish_batch_progress(
+            batch_id=1, work_center_id=2, event="closed", stats={}, is_closed=True
+        )
+    )
+    print("✅ Redis errors are logged, not raised")
+
+
+def test_listen_messages_and_heartbeats():
+    """Тест: сообщения канала, пропуск битых и None при тишине"""
+    redis = _Redis(messages=['{"event": "aggregated"}', "not json", '{"event": "closed"}'])
+    service = _service(redis)
+
+    async def scenario():
+        received = []
+        stream = service.listen("progress:batch:1", timeout=0.01)
+        async for message in stream:
+            received.append(message)
+            if len(received) == 3:
+                break
+        await stream.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+
+    assert received == [{"event": "aggregated"}, {"event": "closed"}, None]
+    assert redis.subscribed == ["progress:batch:1"]
+    # Leaving the stream unsubscribes and closes the connection
+    assert redis.unsubscribed == ["progress:batch:1"]
+    assert redis.closed == 1
+    print("✅ listen yields messages and heartbeats")
+
+
+class _Session:
+    async def close(self):
+        pass
+
+
+class _BatchRepository:
+    def __init__(self, session):
+        pass
+
+    async def get_by_id(self, batch_id):
+        if batch_id != 1:
+            return None
+        return SimpleNamespace(id=1, work_center_id=2, is_closed=False)
+
+
+class _ProductRepository:
+    def __init__(self, session):
+        pass
+
+    async def get_statistics(self, batch_id):
+        return {"total_products": 10, "aggregated": 4}
+
+
+class _WorkCenterRepository:
+    def __init__(self, session):
+        pass
+
+    async def get_by_id(self, work_center_id):
+        return SimpleNamespace(id=2) if work_center_id == 2 else None
+
+
+class _ProgressService(ProgressService):
+    """listen yields prepared messages of the channel and ends"""
+
+    def __init__(self, messages):
+        super().__init__()
+        self.messages = messages
+        self.channels = []
+
+    async def listen(self, channel, timeout=15.0):
+        self.channels.append(channel)
+        for message in self.messages:
+            yield message
+
+
+def _stream(path, messages):
+    app = FastAPI()
+    app.include_router(analytics.router)
+
+    async def override_get_db():
+        yield _Session()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    service = _ProgressService(messages)
+    names = ("BatchRepository", "ProductRepository", "WorkCenterRepository", "progress_service")
+    originals = {name: getattr(analytics, name) for name in names}
+    analytics.BatchRepository = _BatchRepository
+    analytics.ProductRepository = _ProductRepository
+    analytics.WorkCenterRepository = _WorkCenterRepository
+    analytics.progress_service = service
+    try:
+        return TestClient(app).get(path), service
+    finally:
+        for name, value in originals.items():
+            setattr(analytics, name, value)
+
+
+def test_batch_stream_endpoint():
+    """Тест: поток партии начинается со снимка, затем сообщения и heartbeat"""
+    response, service = _stream(
+        "/api/v1/analytics/batches/1/stream", [{"event": "aggregated", "aggregated": 5}, None]
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert service.channels == ["progress:batch:1"]
+    assert response.text == (
+        "event: snapshot\n"
+        'data: {"batch_id": 1, "work_center_id": 2, "is_closed": false, '
+        '"total_products": 10, "aggregated": 4}\n\n'
+        "event: aggregated\n"
+        'data: {"event": "aggregated", "aggregated": 5}\n\n'
+        ": keep-alive\n\n"
+    )
+
+    response, _ = _stream("/api/v1/analytics/batches/7/stream", [])
+    assert response.status_code == 404
+    print("✅ Batch progress stream works")
+
+
+def test_work_center_stream_endpoint():
+    """Тест: поток рабочего центра без снимка"""
+    response, service = _stream(
+        "/api/v1/analytics/work-centers/2/stream", [{"event": "closed", "batch_id": 1}]
+    )
+
+    assert response.status_code == 200
+    assert service.channels == ["progress:work_center:2"]
+    assert response.text == 'event: closed\ndata: {"event": "closed", "batch_id": 1}\n\n'
+
+    response, _ = _stream("/api/v1/analytics/work-centers/7/stream", [])
+    assert response.status_code == 404
+    print("✅ Work center progress stream works")
+
+
+if __name__ == "__main__":
+    print("🧪 Running progress stream tests...\n")
+
+    test_format_sse()
+    test_publish_batch_progress()
+    test_publish_batch_progress_ignores_redis_errors()
+    test_listen_messages_and_heartbeats()
+    test_batch_stream_endpoint()
+    test_work_center_stream_endpoint()
+
+    print("\n✅ All progress stream tests passed!")
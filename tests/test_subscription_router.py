@@ -0,0 +1,130 @@
+"""
+Тесты для кэша маршрутизации webhook подписок
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.subscription_router import SubscriptionRouter
+
+
+class FakeResult:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def all(self):
+        return [(subscription_id, "single") for subscription_id in self.ids]
+
+
+class FakeSession:
+    """Сессия, которая считает запросы к БД"""
+
+    def __init__(self, ids, on_execute=None):
+        self.ids = ids
+        self.queries = 0
+        self.on_execute = on_execute
+
+    async def execute(self, query):
+        self.queries += 1
+        if self.on_execute:
+            self.on_execute()
+        return FakeResult(list(self.ids))
+
+
+def subscription_ids(routes):
+    return tuple(route.subscription_id for route in routes)
+
+
+def make_router(ttl=300):
+    router = SubscriptionRouter(ttl=ttl)
+    # No Redis listener in tests
+    router._ensure_listener = lambda: None
+    return router
+
+
+def test_routes_are_cached():
+    """Тест: повторные события не обращаются к БД"""
+    router = make_router()
+    session = FakeSession([1, 2])
+
+    async def run():
+        for _ in range(100):
+            routes = await router.get_routes(session, "batch_created")
+            assert subscription_ids(routes) == (1, 2)
+
+    asyncio.run(run())
+
+    assert session.queries == 1
+    print("✅ Routes are served from memory")
+
+
+def test_invalidate_reloads_routes():
+    """Тест: инвалидация перестраивает маршруты"""
+    router = make_router()
+    session = FakeSession([1])
+
+    async def run():
+        await router.get_routes(session, "batch_created")
+        session.ids = [1, 3]
+        router.invalidate()
+        return await router.get_routes(session, "batch_created")
+
+    assert subscription_ids(asyncio.run(run())) == (1, 3)
+    assert session.queries == 2
+    print("✅ Invalidation rebuilds routes")
+
+
+def test_stale_load_is_not_cached():
+    """Тест: маршрут, загруженный до инвалидации, не сохраняется"""
+    router = make_router()
+    session = FakeSession([1], on_execute=router.invalidate)
+
+    async def run():
+        await router.get_routes(session, "batch_created")
+        session.on_execute = None
+        await router.get_routes(session, "batch_created")
+
+    asyncio.run(run())
+
+    assert session.queries == 2
+    print("✅ Routes loaded during invalidation are discarded")
+
+
+def test_ttl_expires_routes():
+    """Тест: TTL страхует от потерянных сообщений"""
+    router = make_router(ttl=0)
+    session = FakeSession([])
+
+    async def run():
+        await router.get_routes(session, "batch_closed")
+        await router.get_routes(session, "batch_closed")
+
+    asyncio.run(run())
+
+    assert session.queries == 2
+    print("✅ Expired routes are reloaded")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running subscription router tests...")
+    print("=" * 50)
+
+    try:
+        test_routes_are_cached()
+        test_invalidate_reloads_routes()
+        test_stale_load_is_not_cached()
+        test_ttl_expires_routes()
+
+        print("=" * 50)
+        print("✅ All subscription router tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,96 @@
+"""
+Тесты для дедупликации запуска задач
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_dedup_service import TaskDedupService
+
+
+class _Redis:
+    """SET NX / GET / DELETE in memory"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+class _Task:
+    name = "src.tasks.reports.generate_batch_report"
+
+    def __init__(self):
+        self.submitted = []
+
+    def apply_async(self, args, task_id=None):
+        self.submitted.append((task_id, args))
+
+
+def test_lock_key_normalization():
+    """Тест: ключ не зависит от порядка полей фильтра, Idempotency-Key - отдельный ключ"""
+    key = TaskDedupService.lock_key
+    name = "src.tasks.import_export.export_batches_to_file"
+
+    assert key(name, [{"a": 1, "b": 2}, "csv"]) == key(name, [{"b": 2, "a": 1}, "csv"])
+    assert key(name, [{"a": 1}, "csv"]) != key(name, [{"a": 1}, "excel"])
+    assert key(name, [], "client-key") == key(name, [{"a": 1}], "client-key")
+    assert key(name, [], "client-key") != key("other", [], "client-key")
+    print("✅ Lock keys are normalized")
+
+
+def test_duplicate_submission_returns_existing_task():
+    """Тест: повторный запуск возвращает task_id первой задачи"""
+    service = TaskDedupService()
+    service.redis_client = _Redis()
+    task = _Task()
+
+    async def run():
+        first = await service.submit(task, [1, "excel", None])
+        second = await service.submit(task, [1, "excel", None])
+        other = await service.submit(task, [1, "pdf", None])
+        keyed = await service.submit(task, [2, "pdf", None], idempotency_key="k1")
+        keyed_again = await service.submit(task, [3, "pdf", None], idempotency_key="k1")
+        return first, second, other, keyed, keyed_again
+
+    first, second, other, keyed, keyed_again = asyncio.run(run())
+
+    assert first[1] is False
+    assert second == (first[0], True)
+    assert other[1] is False and other[0] != first[0]
+    assert keyed_again == (keyed[0], True)
+    assert [task_id for task_id, _ in task.submitted] == [first[0], other[0], keyed[0]]
+    print("✅ Duplicate submissions reuse the existing task")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running task deduplication tests...")
+    print("=" * 50)
+
+    try:
+        test_lock_key_normalization()
+        test_duplicate_submission_returns_existing_task()
+
+        print("=" * 50)
+        print("✅ All task deduplication tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
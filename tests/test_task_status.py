@@ -0,0 +1,101 @@
+"""
+Тесты для статусов задач Celery
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.celery_app import celery_app
+from src.services.task_status_service import TaskStatusService, task_status
+
+
+class _Pipeline:
+    def __init__(self, store: dict):
+        self.store = store
+        self.keys = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, key):
+        self.keys.append(key)
+
+    async def execute(self):
+        return [self.store.get(key) for key in self.keys]
+
+
+class _ResultBackend:
+    """Result backend keys in memory; pipeline counts round trips"""
+
+    def __init__(self, store: dict):
+        self.store = store
+        self.pipelines = 0
+
+    def pipeline(self, transaction: bool = True):
+        self.pipelines += 1
+        return _Pipeline(self.store)
+
+
+def test_task_status_shape():
+    """Тест формата статуса задачи"""
+    assert task_status("t1", "PENDING") == {"task_id": "t1", "status": "PENDING", "result": None}
+    assert task_status("t1", "PROGRESS", {"current": 5})["result"] == {"current": 5}
+    assert task_status("t1", "FAILURE", ValueError("boom"))["result"] == {"error": "boom"}
+    print("✅ Task status shape is correct")
+
+
+def test_bulk_statuses_single_round_trip():
+    """Тест: статусы сотен задач читаются одним pipeline"""
+    backend = celery_app.backend
+    store = {}
+    for index in range(300):
+        task_id = f"task-{index}"
+        store[backend.get_key_for_task(task_id)] = backend.encode(
+            {"task_id": task_id, "status": "SUCCESS", "result": {"n": index}}
+        )
+    store[backend.get_key_for_task("task-progress")] = backend.encode(
+        {"task_id": "task-progress", "status": "PROGRESS", "result": {"current": 1}}
+    )
+
+    service = TaskStatusService()
+    service.redis_client = _ResultBackend(store)
+    task_ids = ["task-progress", "task-unknown"] + [f"task-{index}" for index in range(300)]
+
+    statuses = asyncio.run(service.get_statuses(task_ids))
+
+    assert service.redis_client.pipelines == 1
+    assert [status["task_id"] for status in statuses] == task_ids
+    assert statuses[0] == {
+        "task_id": "task-progress",
+        "status": "PROGRESS",
+        "result": {"current": 1},
+    }
+    assert statuses[1]["status"] == "PENDING"
+    assert statuses[-1]["result"] == {"n": 299}
+    print("✅ 302 task statuses read in one pipeline")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running task status tests...")
+    print("=" * 50)
+
+    try:
+        test_task_status_shape()
+        test_bulk_statuses_single_round_trip()
+
+        print("=" * 50)
+        print("✅ All task status tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
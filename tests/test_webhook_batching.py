@@ -0,0 +1,115 @@
+"""
+Тесты для пакетной доставки webhook событий (delivery_mode="batch")
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import postgresql
+
+from src.repositories.webhook import WebhookRepository
+
+
+class _Session:
+    """Records executed statements as SQL with literal values"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(
+            str(
+                statement.compile(
+                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+                )
+            )
+        )
+
+
+class _Repository(WebhookRepository):
+    """Buffers and buffered events in memory, SQL of the marking UPDATE recorded"""
+
+    def __init__(self, buffers, events):
+        super().__init__(_Session())
+        self.buffers = buffers
+        self.events = events
+        self.created = []
+
+    async def get_due_buffers(self):
+        return self.buffers
+
+    async def take_buffered_deliveries(self, subscription_id, limit):
+        taken = self.events[subscription_id][:limit]
+        self.events[subscription_id] = self.events[subscription_id][limit:]
+        return taken
+
+    async def create_delivery(self, subscription_id, event_type, body, status="pending"):
+        delivery = SimpleNamespace(
+            id=100 + len(self.created),
+            subscription_id=subscription_id,
+            event_type=event_type,
+            body=body,
+            status=status,
+        )
+        self.created.append(delivery)
+        return delivery
+
+
+def _event(delivery_id):
+    return SimpleNamespace(id=delivery_id, body=b'{"id":%d}' % delivery_id)
+
+
+def test_coalesce_buffered_deliveries():
+    """Тест: буфер собирается в пачки по max_events событий"""
+    repo = _Repository(
+        buffers=[SimpleNamespace(subscription_id=1, buffered=5, max_events=2)],
+        events={1: [_event(i) for i in range(1, 6)]},
+    )
+
+    batch_ids = asyncio.run(repo.coalesce_buffered_deliveries())
+
+    assert batch_ids == [100, 101, 102]
+    assert [batch.body for batch in repo.created] == [
+        b'[{"id":1},{"id":2}]',
+        b'[{"id":3},{"id":4}]',
+        b'[{"id":5}]',
+    ]
+    assert all(batch.event_type == "batch" and batch.status == "pending" for batch in repo.created)
+
+    # Included events are linked to their batch delivery
+    assert len(repo.session.statements) == 3
+    first = repo.session.statements[0]
+    assert "status='batched'" in first
+    assert "batch_delivery_id=100" in first
+    assert "IN (1, 2)" in first
+    print("✅ Buffered events are coalesced into batches")
+
+
+def test_coalesce_stops_when_events_taken_elsewhere():
+    """Тест: события, забранные другим процессом (SKIP LOCKED), не зацикливают сборку"""
+    repo = _Repository(
+        buffers=[
+            SimpleNamespace(subscription_id=1, buffered=4, max_events=10),
+            SimpleNamespace(subscription_id=2, buffered=3, max_events=10),
+        ],
+        events={1: [_event(1)], 2: []},
+    )
+
+    batch_ids = asyncio.run(repo.coalesce_buffered_deliveries())
+
+    assert batch_ids == [100]
+    assert repo.created[0].body == b'[{"id":1}]'
+    print("✅ Coalescing skips events locked by other dispatchers")
+
+
+if __name__ == "__main__":
+    print("🧪 Running webhook batching tests...\n")
+
+    test_coalesce_buffered_deliveries()
+    test_coalesce_stops_when_events_taken_elsewhere()
+
+    print("\n✅ All webhook batching tests passed!")
@@ -0,0 +1,156 @@
+"""
+Тесты для нагрузочного теста webhook доставок (scripts/webhook_benchmark.py)
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.webhook_benchmark import Receiver, build_report, main, percentile
+from src.config import settings
+from src.services.webhook_service import webhook_service
+
+
+def _call(receiver):
+    """One request to the ASGI receiver; returns the response status"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(receiver({"type": "http"}, receive, send))
+    return messages[0]["status"]
+
+
+def test_receiver_statuses():
+    """Тест: приемник отвечает 200, доля ошибок - 500, зависания считаются"""
+    ok = Receiver(latency_ms=0, jitter_ms=0, error_rate=0, timeout_rate=0, hang_seconds=0)
+    failing = Receiver(latency_ms=0, jitter_ms=0, error_rate=1, timeout_rate=0, hang_seconds=0)
+    hanging = Receiver(latency_ms=0, jitter_ms=0, error_rate=0, timeout_rate=1, hang_seconds=0)
+
+    assert [_call(ok), _call(ok)] == [200, 200]
+    assert (ok.requests, ok.errors, ok.timeouts) == (2, 0, 0)
+    assert _call(failing) == 500
+    assert (failing.requests, failing.errors) == (1, 1)
+    assert _call(hanging) == 200
+    assert (hanging.requests, hanging.timeouts) == (1, 1)
+    print("✅ Receiver answers with configured errors and timeouts")
+
+
+def test_percentile():
+    """Тест перцентилей задержки"""
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+
+    assert percentile([], 0.5) is None
+    assert percentile(values, 0.0) == 0.1
+    assert percentile(values, 0.5) == 0.3
+    assert percentile(values, 0.99) == 0.5
+    assert percentile(values, 1.0) == 0.5
+    print("✅ Percentiles are taken from sorted values")
+
+
+def test_build_report():
+    """Тест отчета: доставки в секунду, задержки в мс, усиление повторов"""
+    receiver = Receiver(latency_ms=0, jitter_ms=0, error_rate=0, timeout_rate=0, hang_seconds=0)
+    receiver.requests, receiver.errors = 15, 5
+
+    report = build_report(
+        "service", 10, 9, 2.0, [0.01, 0.02, 0.03], receiver, send_latencies=[0.004]
+    )
+
+    assert report["failed"] == 1
+    assert report["deliveries_per_second"] == 4.5
+    assert report["latency_p50_ms"] == 20.0
+    assert report["latency_p99_ms"] == 30.0
+    assert report["send_p50_ms"] == report["send_p99_ms"] == 4.0
+    assert report["retry_amplification"] == 1.5
+
+    empty = build_report("task", 0, 0, 0.0, [], receiver)
+    assert empty["deliveries_per_second"] is None
+    assert empty["retry_amplification"] is None
+    assert empty["latency_p50_ms"] is None
+    assert "send_p50_ms" not in empty
+    print("✅ Benchmark report is built")
+
+
+def test_service_mode_run():
+    """Тест: короткий прогон service режима с подменой отправки и одним повтором"""
+    sent = []
+
+    async def send_webhook(url, body, secret_key, timeout=None):
+        sent.append(url)
+        # First attempt of every delivery to subscription 0 fails and is retried
+        if url.endswith("/hooks/0") and sent.count(url) <= 10:
+            return False, 500, None, "Internal Server Error"
+        return True, 200, '{"ok": true}', None
+
+    original_retry_base = settings.webhook_retry_base_seconds
+    webhook_service.send_webhook = send_webhook
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            main(
+                [
+                    "--mode",
+                    "service",
+                    "--events",
+                    "10",
+                    "--subscriptions",
+                    "2",
+                    "--retry-base",
+                    "0.01",
+                    "--json",
+                ]
+            )
+    finally:
+        del webhook_service.send_webhook
+        settings.webhook_retry_base_seconds = original_retry_base
+
+    report = json.loads(output.getvalue())
+    assert report["mode"] == "service"
+    assert report["deliveries"] == report["succeeded"] == 20
+    assert report["failed"] == 0
+    assert len(sent) == 30
+    assert report["latency_p50_ms"] is not None
+    assert report["send_p99_ms"] is not None
+    # Sending is stubbed, the receiver gets no requests
+    assert report["receiver_requests"] == 0
+    print("✅ Service mode runs end to end")
+
+
+def test_service_mode_does_not_need_minio():
+    """Тест: webhook_service импортируется без подключения к MinIO"""
+    code = (
+        "import sys\n"
+        "import scripts.webhook_benchmark\n"
+        "from src.services.webhook_service import webhook_service\n"
+        "assert 'src.services.minio_service' not in sys.modules\n"
+    )
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True, timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    print("✅ Webhook service loads without MinIO")
+
+
+if __name__ == "__main__":
+    print("🧪 Running webhook benchmark tests...\n")
+
+    test_receiver_statuses()
+    test_percentile()
+    test_build_report()
+    test_service_mode_run()
+    test_service_mode_does_not_need_minio()
+
+    print("\n✅ All webhook benchmark tests passed!")
@@ -0,0 +1,70 @@
+"""
+Тесты для общего HTTP клиента webhook доставок
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.webhook_service import WebhookService
+
+
+def test_client_reused_within_loop():
+    """Тест: один клиент (и пул соединений) на event loop"""
+    service = WebhookService()
+
+    async def scenario():
+        first = service.get_client()
+        second = service.get_client()
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first is second
+    assert first.is_closed
+    print("✅ Client is reused within a loop")
+
+
+def test_client_recreated_for_another_loop():
+    """Тест: в другом event loop создается новый клиент, старый закрывается на своем"""
+    service = WebhookService()
+
+    # Old loop still runs in another thread: the replaced client is closed there
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+
+        async def get_client():
+            return service.get_client()
+
+        old = asyncio.run_coroutine_threadsafe(get_client(), old_loop).result(timeout=5)
+        new = asyncio.run(get_client())
+
+        assert new is not old
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), old_loop).result(timeout=5)
+        assert old.is_closed
+        assert not new.is_closed
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join(timeout=5)
+        old_loop.close()
+
+    # Client of a finished loop cannot be awaited any more and is dropped
+    latest = asyncio.run(get_client())
+    assert latest is not new
+    assert not new.is_closed
+    print("✅ Client is recreated for another loop")
+
+
+if __name__ == "__main__":
+    print("🧪 Running webhook client tests...\n")
+
+    test_client_reused_within_loop()
+    test_client_recreated_for_another_loop()
+
+    print("\n✅ All webhook client tests passed!")
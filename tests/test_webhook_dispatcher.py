@@ -0,0 +1,243 @@
+"""
+Тесты для диспетчера webhook доставок
+"""
+
+import asyncio
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.services.webhook_dispatcher as webhook_dispatcher
+from src.services.webhook_dispatcher import WebhookDispatcher
+
+
+class _Database:
+    """State shared by all sessions: pending deliveries, written results"""
+
+    def __init__(self, deliveries, subscriptions):
+        self.pending = list(deliveries)
+        self.subscriptions = {subscription.id: subscription for subscription in subscriptions}
+        self.updates = []
+        self.parked = []
+        self.fail_updates = 0
+        self.fail_schedules = 0
+        self.commits = 0
+        self.on_update = None
+
+
+class _Session:
+    def __init__(self, database):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def commit(self):
+        self.database.commits += 1
+
+
+class _WebhookRepository:
+    def __init__(self, session):
+        self.database = session.database
+
+    async def coalesce_buffered_deliveries(self):
+        if self.database.fail_schedules:
+            self.database.fail_schedules -= 1
+            raise ConnectionError("database unavailable")
+        return []
+
+    async def release_due_retries(self, limit):
+        return []
+
+    async def get_hosts_with_deliveries(self, status):
+        return []
+
+    async def claim_pending_deliveries(self, limit, claim_timeout):
+        claimed, self.database.pending = (
+            self.database.pending[:limit],
+            self.database.pending[limit:],
+        )
+        return claimed
+
+    async def get_subscriptions_by_ids(self, subscription_ids):
+        return [self.database.subscriptions[i] for i in subscription_ids]
+
+    async def bulk_update_deliveries(self, results):
+        if self.database.fail_updates:
+            self.database.fail_updates -= 1
+            raise ConnectionError("database unavailable")
+        self.database.updates.append(list(results))
+        if self.database.on_update:
+            self.database.on_update()
+
+    async def park_deliveries(self, delivery_ids):
+        self.database.parked.extend(delivery_ids)
+
+    async def release_host_deliveries(self, host, status, limit=None):
+        return []
+
+
+class _WebhookService:
+    """Endpoints answer 200 unless their URL contains "down" """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_webhook(self, url, body, secret_key, timeout):
+        self.sent.append(url)
+        if "down" in url:
+            return False, 503, "unavailable", "HTTP 503"
+        return True, 200, "ok", None
+
+    def next_attempt_at(self, attempt, retry_count):
+        if attempt > retry_count:
+            return None
+        return datetime.now(UTC) + timedelta(seconds=5)
+
+    async def close(self):
+        pass
+
+
+class _CircuitBreaker:
+    async def allow(self, host):
+        return True
+
+    async def record(self, host, healthy):
+        return False
+
+
+def _subscription(subscription_id, url, retry_count=3, is_active=True):
+    return SimpleNamespace(
+        id=subscription_id,
+        url=url,
+        secret_key="secret",
+        timeout=5,
+        retry_count=retry_count,
+        is_active=is_active,
+    )
+
+
+def _delivery(delivery_id, subscription_id, attempts=0):
+    return SimpleNamespace(
+        id=delivery_id, subscription_id=subscription_id, body=b"{}", attempts=attempts
+    )
+
+
+def _run(database, coro_factory):
+    """Run a coroutine with the dispatcher module bound to fakes"""
+    service = _WebhookService()
+    names = ("AsyncSessionLocal", "WebhookRepository", "webhook_service", "circuit_breaker")
+    originals = {name: getattr(webhook_dispatcher, name) for name in names}
+    webhook_dispatcher.AsyncSessionLocal = lambda: _Session(database)
+    webhook_dispatcher.WebhookRepository = _WebhookRepository
+    webhook_dispatcher.webhook_service = service
+    webhook_dispatcher.circuit_breaker = _CircuitBreaker()
+    try:
+        return asyncio.run(coro_factory()), service
+    finally:
+        for name, value in originals.items():
+            setattr(webhook_dispatcher, name, value)
+
+
+def _database():
+    return _Database(
+        deliveries=[
+            _delivery(1, subscription_id=1),
+            _delivery(2, subscription_id=2),
+            _delivery(3, subscription_id=3, attempts=1),
+            _delivery(4, subscription_id=4),
+        ],
+        subscriptions=[
+            _subscription(1, "https://ok.example.com/hook"),
+            _subscription(2, "https://down.example.com/hook"),
+            _subscription(3, "https://down.example.com/other", retry_count=1),
+            _subscription(4, "https://ok.example.com/off", is_active=False),
+        ],
+    )
+
+
+def test_claim_send_and_bulk_update():
+    """Тест: захват пачки, отправка и одна запись результатов"""
+    database = _database()
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(batch_size=10, concurrency=10, poll_interval=0.01)
+        claimed = await dispatcher._claim()
+        await asyncio.wait(dispatcher._inflight)
+        await dispatcher._flush_results()
+        return claimed
+
+    claimed, service = _run(database, scenario)
+
+    assert claimed == 4
+    # Inactive subscription is not called
+    assert sorted(service.sent) == [
+        "https://down.example.com/hook",
+        "https://down.example.com/other",
+        "https://ok.example.com/hook",
+    ]
+    assert len(database.updates) == 1
+    statuses = {result["delivery_id"]: result["status"] for result in database.updates[0]}
+    assert statuses == {1: "success", 2: "failed", 3: "dead", 4: "dead"}
+    print("✅ Deliveries are claimed, sent and written in bulk")
+
+
+def test_failed_flush_keeps_results():
+    """Тест: результаты не теряются, если запись в БД не удалась"""
+    database = _database()
+    database.fail_updates = 1
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(batch_size=10, concurrency=10, poll_interval=0.01)
+        await dispatcher._claim()
+        await asyncio.wait(dispatcher._inflight)
+        try:
+            await dispatcher._flush_results()
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("ConnectionError expected")
+        assert len(dispatcher._results) == 4
+
+        await dispatcher._flush_results()
+        assert dispatcher._results == []
+
+    _run(database, scenario)
+
+    assert len(database.updates) == 1
+    assert sorted(result["delivery_id"] for result in database.updates[0]) == [1, 2, 3, 4]
+    print("✅ Results survive a failed bulk update")
+
+
+def test_run_survives_database_errors():
+    """Тест: ошибка одной итерации не останавливает диспетчер"""
+    database = _database()
+    database.fail_schedules = 2
+    database.fail_updates = 1
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(batch_size=10, concurrency=10, poll_interval=0.01)
+        database.on_update = dispatcher.stop
+        await asyncio.wait_for(dispatcher.run(), timeout=5)
+
+    _run(database, scenario)
+
+    assert database.fail_schedules == 0
+    assert sorted(result["delivery_id"] for result in database.updates[0]) == [1, 2, 3, 4]
+    print("✅ Dispatcher keeps running after database errors")
+
+
+if __name__ == "__main__":
+    print("🧪 Running webhook dispatcher tests...\n")
+
+    test_claim_send_and_bulk_update()
+    test_failed_flush_keeps_results()
+    test_run_survives_database_errors()
+
+    print("\n✅ All webhook dispatcher tests passed!")
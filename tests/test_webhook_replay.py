@@ -0,0 +1,162 @@
+"""
+Тесты для повторной отправки webhook доставок (replay)
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+import src.services.endpoint_throttle as throttle_module
+from src.api import webhooks
+from src.database import get_db
+from src.services.endpoint_throttle import EndpointThrottle
+
+
+class _Session:
+    """Records executed statements as SQL with literal values"""
+
+    def __init__(self, rowcount=3):
+        self.rowcount = rowcount
+        self.statements = []
+        self.committed = False
+
+    async def execute(self, statement):
+        self.statements.append(
+            str(
+                statement.compile(
+                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+                )
+            )
+        )
+        return SimpleNamespace(rowcount=self.rowcount)
+
+    async def commit(self):
+        self.committed = True
+
+
+def _client(session):
+    app = FastAPI()
+    app.include_router(webhooks.router)
+
+    async def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_replay_endpoint():
+    """Тест: replay по фильтрам с новым лимитом попыток"""
+    session = _Session(rowcount=3)
+    response = _client(session).post(
+        "/api/v1/webhooks/deliveries/replay",
+        json={
+            "subscription_id": 7,
+            "event_type": "batch_closed",
+            "created_from": "2026-01-01T00:00:00",
+            "statuses": ["dead", "failed"],
+        },
+    )
+
+    assert response.status_code == 202
+    assert response.json() == {"replayed": 3}
+    assert session.committed
+
+    (sql,) = session.statements
+    assert "status IN ('dead', 'failed')" in sql
+    assert "subscription_id = 7" in sql
+    assert "event_type = 'batch_closed'" in sql
+    assert "created_at >= '2026-01-01 00:00:00'" in sql
+    assert "status='replaying'" in sql
+    assert "attempts=0" in sql
+    assert "next_attempt_at=NULL" in sql
+    print("✅ Replay marks filtered deliveries")
+
+
+def test_replay_endpoint_validation():
+    """Тест: неверный диапазон дат и статусы отклоняются без запроса к БД"""
+    session = _Session()
+    client = _client(session)
+
+    response = client.post(
+        "/api/v1/webhooks/deliveries/replay",
+        json={"created_from": "2026-02-01T00:00:00", "created_to": "2026-01-01T00:00:00"},
+    )
+    assert response.status_code == 400
+
+    response = client.post("/api/v1/webhooks/deliveries/replay", json={"statuses": ["success"]})
+    assert response.status_code == 422
+
+    assert session.statements == []
+    print("✅ Invalid replay requests are rejected")
+
+
+class _AcquireScript:
+    """ACQUIRE_SCRIPT semantics over a dict of window key -> used slots"""
+
+    def __init__(self):
+        self.used = {}
+
+    async def __call__(self, keys, args):
+        requested, rate = (int(arg) for arg in args)
+        used = self.used.get(keys[0], 0)
+        granted = min(requested, rate - used)
+        if granted <= 0:
+            return 0
+        self.used[keys[0]] = used + granted
+        return granted
+
+
+def test_endpoint_throttle_rate_per_host():
+    """Тест: не больше rate_per_second доставок в секунду на хост"""
+    script = _AcquireScript()
+    throttle = EndpointThrottle(rate_per_second=10)
+    throttle.get_client = lambda: None
+    throttle._acquire_script = script
+
+    original_time = throttle_module.time.time
+    now = [1_000.2]
+    throttle_module.time.time = lambda: now[0]
+    try:
+
+        async def scenario():
+            granted = [
+                await throttle.acquire("a.example.com", requested=6),
+                await throttle.acquire("a.example.com"),
+                await throttle.acquire("a.example.com"),
+                # Other hosts have their own budget
+                await throttle.acquire("b.example.com"),
+            ]
+            # Next second starts a new window
+            now[0] = 1_001.0
+            granted.append(await throttle.acquire("a.example.com"))
+            return granted
+
+        granted = asyncio.run(scenario())
+    finally:
+        throttle_module.time.time = original_time
+
+    assert granted == [6, 4, 0, 10, 10]
+    assert set(script.used) == {
+        "webhook:replay:a.example.com:1000",
+        "webhook:replay:b.example.com:1000",
+        "webhook:replay:a.example.com:1001",
+    }
+    print("✅ Endpoint throttle limits replays per host and second")
+
+
+if __name__ == "__main__":
+    print("🧪 Running webhook replay tests...\n")
+
+    test_replay_endpoint()
+    test_replay_endpoint_validation()
+    test_endpoint_throttle_rate_per_host()
+
+    print("\n✅ All webhook replay tests passed!")
@@ -0,0 +1,146 @@
+"""
+Тесты для расписания повторных попыток webhook
+"""
+
+import asyncio
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import postgresql
+
+import src.tasks.webhooks as webhook_tasks
+from src.config import settings
+from src.repositories.webhook import WebhookRepository
+from src.services.webhook_service import webhook_service
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    """Тест экспоненциальной задержки с разбросом"""
+    now = datetime(2024, 1, 30, 12, 0, 0, tzinfo=UTC)
+    base = settings.webhook_retry_base_seconds
+
+    for attempts in range(1, 6):
+        nominal = min(settings.webhook_retry_max_seconds, base * 2 ** (attempts - 1))
+        for _ in range(50):
+            delay = webhook_service.next_attempt_at(attempts, retry_count=10, now=now) - now
+            assert timedelta(seconds=nominal / 2) <= delay <= timedelta(seconds=nominal)
+
+    print("✅ Backoff is exponential with jitter")
+
+
+def test_backoff_is_capped():
+    """Тест ограничения максимальной задержки"""
+    now = datetime(2024, 1, 30, 12, 0, 0, tzinfo=UTC)
+
+    delay = webhook_service.next_attempt_at(30, retry_count=100, now=now) - now
+
+    assert delay <= timedelta(seconds=settings.webhook_retry_max_seconds)
+    print("✅ Backoff is capped")
+
+
+def test_no_retry_after_retry_count():
+    """Тест: повторы прекращаются после retry_count попыток подписки"""
+    assert webhook_service.next_attempt_at(2, retry_count=3) is not None
+    assert webhook_service.next_attempt_at(3, retry_count=3) is None
+    assert webhook_service.next_attempt_at(1, retry_count=1) is None
+    print("✅ Retries stop at subscription retry_count")
+
+
+class _StatementSession:
+    """Captures the executed statement"""
+
+    def __init__(self):
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [1, 2]))
+
+
+def test_release_due_retries_only_failed():
+    """Тест: в очередь возвращаются только неудачные доставки с наступившим временем"""
+    session = _StatementSession()
+
+    released = asyncio.run(WebhookRepository(session).release_due_retries(limit=100))
+
+    assert released == [1, 2]
+    sql = " ".join(
+        str(
+            session.statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        ).split()
+    )
+    assert (
+        "WHERE webhook_deliveries.status = 'failed' AND webhook_deliveries.next_attempt_at <= now()"
+    ) in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    print("✅ Only due failed deliveries are released")
+
+
+class _Session:
+    """Subscription of the delivery was deleted after the claim"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def begin(self):
+        pass
+
+    async def get(self, model, ident):
+        return None
+
+    async def rollback(self):
+        pass
+
+
+class _WebhookRepository:
+    def __init__(self, session):
+        pass
+
+    async def get_delivery(self, delivery_id):
+        return SimpleNamespace(id=delivery_id, subscription_id=7, status="pending", attempts=0)
+
+
+def test_deleted_subscription_is_not_retried():
+    """Тест: удаленная подписка завершает задачу без Celery retry"""
+    originals = (webhook_tasks.AsyncSessionLocal, webhook_tasks.WebhookRepository)
+    webhook_tasks.AsyncSessionLocal = _Session
+    webhook_tasks.WebhookRepository = _WebhookRepository
+    try:
+        result = webhook_tasks.send_webhook_delivery(1)
+    finally:
+        webhook_tasks.AsyncSessionLocal, webhook_tasks.WebhookRepository = originals
+
+    assert result == {"success": False, "error": "Subscription not found"}
+    print("✅ Deliveries of deleted subscriptions are not retried")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running webhook retry tests...")
+    print("=" * 50)
+
+    try:
+        test_backoff_grows_exponentially_with_jitter()
+        test_backoff_is_capped()
+        test_no_retry_after_retry_count()
+        test_release_due_retries_only_failed()
+        test_deleted_subscription_is_not_retried()
+
+        print("=" * 50)
+        print("✅ All webhook retry tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
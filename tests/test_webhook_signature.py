@@ -0,0 +1,83 @@
+"""
+Тесты для сериализации и подписи webhook payload
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.webhook_service import WebhookService, webhook_service
+
+
+def test_signature_matches_sent_bytes():
+    """Тест: подпись вычисляется над теми же байтами, что отправляются"""
+    payload = webhook_service.create_webhook_payload(
+        "batch_created", {"batch_id": 1, "team": "Бригада №1"}
+    )
+    body = webhook_service.serialize_payload(payload)
+
+    expected = hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+
+    assert webhook_service.generate_signature(body, "secret") == expected
+    assert webhook_service.generate_signature(body, "other") != expected
+    assert json.loads(body) == payload
+    print("✅ Signature is byte-exact")
+
+
+def test_signer_cache_is_bounded():
+    """Тест: кэш HMAC по секретам ограничен, вытесняются давно не использованные"""
+    service = WebhookService()
+    service.SIGNER_CACHE_SIZE = 2
+    body = b'{"event":"batch_created"}'
+
+    service.generate_signature(body, "first")
+    service.generate_signature(body, "second")
+    service.generate_signature(body, "first")
+    signature = service.generate_signature(body, "third")
+
+    assert list(service._signers) == ["first", "third"]
+    assert signature == hmac.new(b"third", body, hashlib.sha256).hexdigest()
+    # An evicted secret is derived again
+    assert service.generate_signature(body, "second") == (
+        hmac.new(b"second", body, hashlib.sha256).hexdigest()
+    )
+    assert list(service._signers) == ["third", "second"]
+    print("✅ Signer cache keeps recently used secrets only")
+
+
+def test_batch_body_is_joined_event_bodies():
+    """Тест: тело пакетной доставки - массив тел событий без повторной сериализации"""
+    bodies = [
+        webhook_service.serialize_payload({"event": "product_aggregated", "data": {"id": i}})
+        for i in range(3)
+    ]
+    batch_body = b"[" + b",".join(bodies) + b"]"
+
+    assert json.loads(batch_body) == [json.loads(body) for body in bodies]
+    assert batch_body == webhook_service.serialize_payload([json.loads(b) for b in bodies])
+    print("✅ Batch body equals canonical array serialization")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running webhook signature tests...")
+    print("=" * 50)
+
+    try:
+        test_signature_matches_sent_bytes()
+        test_signer_cache_is_bounded()
+        test_batch_body_is_joined_event_bodies()
+
+        print("=" * 50)
+        print("✅ All webhook signature tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,97 @@
+"""
+Тесты для event loop процесса Celery worker
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.worker import (
+    ProgressThrottle,
+    get_loop,
+    init_worker_process,
+    run_async,
+    shutdown_worker_process,
+)
+
+
+def test_tasks_share_process_loop():
+    """Тест: задачи выполняются на одном event loop процесса"""
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = run_async(current_loop())
+    second = run_async(current_loop())
+
+    assert first is second
+    assert first is get_loop()
+    assert not first.is_closed()
+    print("✅ Tasks share one event loop")
+
+
+def test_worker_process_lifecycle():
+    """Тест: новый процесс получает свой loop, при остановке loop закрывается"""
+    from src.services.cache_service import cache_service
+    from src.services.progress_service import progress_service
+
+    inherited = get_loop()
+    # Clients created by the parent are bound to its loop
+    cache_service.redis_client = object()
+    progress_service.redis_client = object()
+
+    init_worker_process()
+    assert cache_service.redis_client is None
+    assert progress_service.redis_client is None
+    loop = get_loop()
+    assert loop is not inherited
+
+    shutdown_worker_process()
+    assert loop.is_closed()
+
+    # Next task outside a prefork worker starts a new loop
+    assert run_async(asyncio.sleep(0, result=42)) == 42
+    assert get_loop() is not loop
+    print("✅ Worker process loop lifecycle is correct")
+
+
+def test_progress_throttle():
+    """Тест: прогресс сохраняется не чаще интервала, финальный - всегда"""
+    import src.worker as worker
+
+    reported = []
+    original = worker.report_progress
+    worker.report_progress = lambda task, **meta: reported.append(meta)
+    try:
+        progress = ProgressThrottle(task=None, interval=60)
+        assert progress(current=1)
+        assert not progress(current=2)
+        assert progress(force=True, current=3)
+    finally:
+        worker.report_progress = original
+
+    assert reported == [{"current": 1}, {"current": 3}]
+    print("✅ Progress updates are throttled")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Running worker tests...")
+    print("=" * 50)
+
+    try:
+        test_tasks_share_process_loop()
+        test_worker_process_lifecycle()
+        test_progress_throttle()
+
+        print("=" * 50)
+        print("✅ All worker tests passed!")
+        print("=" * 50)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)